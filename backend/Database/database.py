@@ -8,9 +8,11 @@ Key components:
 - Helper functions: Simplified access to database and collections
 """
 import os  # For accessing environment variables
-from pymongo import MongoClient  # MongoDB client library
+from pymongo import MongoClient, ASCENDING, DESCENDING  # MongoDB client library and index directions
+from motor.motor_asyncio import AsyncIOMotorClient  # Async MongoDB client for the async API endpoints
 from dotenv import load_dotenv  # For loading environment variables from .env file
 import logging  # For logging database operations and errors
+import asyncio  # For detecting the running event loop
 from typing import Optional  # Type hints for better code documentation
 
 # Configure logging to track database operations and errors
@@ -28,6 +30,22 @@ load_dotenv()
 MONGODB_URI = os.getenv('MONGODB_URI', 'mongodb://localhost:27017')  # MongoDB connection string
 MONGODB_DB_NAME = os.getenv('MONGODB_DB_NAME', 'cougarwise')  # Database name
 
+# TLS (Transport Layer Security) encrypts the connection to a remote server.
+# tlsAllowInvalidCertificates=True allows self-signed certificates (not recommended for production).
+# A local server is reached over loopback, where a plain mongod doesn't accept TLS and it
+# would only add handshake and encryption overhead.
+IS_LOCAL_MONGODB = any(host in MONGODB_URI for host in ("localhost", "127.0.0.1"))
+TLS_OPTIONS = {} if IS_LOCAL_MONGODB else {"tls": True, "tlsAllowInvalidCertificates": True}
+
+# Connection pool settings shared by the sync and async clients. Both clients live for
+# the whole process, so requests reuse pooled connections instead of opening new ones.
+POOL_OPTIONS = {
+    "maxPoolSize": int(os.getenv('MONGODB_MAX_POOL_SIZE', 100)),  # Most connections open at once
+    "minPoolSize": int(os.getenv('MONGODB_MIN_POOL_SIZE', 10)),  # Connections kept warm between bursts
+    "maxIdleTimeMS": 30000,  # Close connections idle longer than this
+    "serverSelectionTimeoutMS": 5000,  # Fail fast when the server is unreachable
+}
+
 class Database:
     """
     Database connection manager for CougarWise application.
@@ -47,6 +65,9 @@ class Database:
     _instance = None  # Single instance of the Database class
     _client = None  # MongoDB client connection
     _db = None  # Database reference
+    _async_client = None  # Motor client used by async endpoints, created on first use
+    _async_loop = None  # Event loop the Motor client belongs to
+    _async_collections = {}  # Motor collection handles reused across requests, keyed by (database, collection)
     
     @classmethod
     def get_instance(cls):
@@ -97,12 +118,8 @@ class Database:
             # Log connection attempt
             logger.info(f"Connecting to MongoDB at {MONGODB_URI}")
             
-            # Create MongoDB client with TLS settings
-            # TLS (Transport Layer Security) encrypts the connection
-            # tlsAllowInvalidCertificates=True allows self-signed certificates (not recommended for production)
-            self._client = MongoClient(MONGODB_URI, 
-                                      tls=True, 
-                                      tlsAllowInvalidCertificates=True)
+            # Create MongoDB client with TLS settings (TLS is only used for remote servers)
+            self._client = MongoClient(MONGODB_URI, **TLS_OPTIONS, **POOL_OPTIONS)
             
             # Get reference to the specified database
             self._db = self._client[db_name]
@@ -161,6 +178,54 @@ class Database:
             self.connect()
         return self._db[collection_name]
     
+    def get_async_db(self):
+        """
+        Get the database through the async (Motor) client.
+        
+        Async endpoints should use this instead of get_db so that database
+        round-trips don't block the event loop. The Motor client is created
+        lazily with the same connection settings as the synchronous client.
+        
+        Returns:
+            motor.motor_asyncio.AsyncIOMotorDatabase: The MongoDB database instance
+        """
+        # Motor clients are tied to the event loop they were first used on, so make
+        # a new client if we're now running on a different loop (e.g. a new test client)
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            loop = None
+        if self._async_client is None or self._async_loop is not loop:
+            if self._async_client is not None:
+                self._async_client.close()
+            self._async_client = AsyncIOMotorClient(MONGODB_URI, **TLS_OPTIONS, **POOL_OPTIONS)
+            self._async_loop = loop
+            # Handles from the old client can't be reused with the new one
+            self._async_collections = {}
+        # Read the database name on every call so tests can switch databases
+        db_name = os.getenv('MONGODB_DB_NAME', MONGODB_DB_NAME)
+        return self._async_client[db_name]
+    
+    def get_async_collection(self, collection_name: str):
+        """
+        Get a specific collection through the async (Motor) client.
+        
+        Args:
+            collection_name (str): Name of the collection to retrieve
+            
+        Handles are cached per database and collection name, so every request
+        reuses the same collection object instead of building a new one.
+        
+        Returns:
+            motor.motor_asyncio.AsyncIOMotorCollection: The specified MongoDB collection
+        """
+        db = self.get_async_db()
+        key = (db.name, collection_name)
+        collection = self._async_collections.get(key)
+        if collection is None:
+            collection = self._async_collections[key] = db[collection_name]
+        return collection
+    
     def close(self):
         """
         Close the database connection.
@@ -177,6 +242,11 @@ class Database:
             logger.info("Database connection closed")
             self._client = None
             self._db = None
+        if self._async_client:
+            self._async_client.close()
+            self._async_client = None
+            self._async_loop = None
+            self._async_collections = {}
 
 # Collection names
 class Collections:
@@ -197,6 +267,8 @@ class Collections:
     NOTIFICATIONS = "Notifications"  # User notifications
     SPENDING_ANALYSIS = "SpendingAnalysis"  # Spending pattern analysis
     CHATBOT = "Chatbot"  # Chatbot conversation history
+    MONTHLY_CATEGORY_TOTALS = "MonthlyCategoryTotals"  # Per-user monthly spending totals by category
+    MONTHLY_TOTALS_REFRESHES = "MonthlyTotalsRefreshes"  # Which months' totals have been rebuilt
 
 # Helper functions for common database operations
 # These functions simplify database access throughout the application
@@ -228,6 +300,116 @@ def get_collection(collection_name: str):
     """
     return Database.get_instance().get_collection(collection_name)
 
+# Indexes backing the application's most frequent queries, as (collection, keys, options)
+INDEXES = [
+    (Collections.USERS, [("email", ASCENDING)], {"unique": True}),  # Signup/login lookups by email
+    # Login lookups by username; only users that have one are indexed
+    (Collections.USERS, [("username", ASCENDING)], {"unique": True, "partialFilterExpression": {"username": {"$type": "string"}}}),
+    (Collections.TRANSACTIONS, [("user_id", ASCENDING), ("category", ASCENDING)], {}),  # Per-user category spending
+    (Collections.TRANSACTIONS, [("user_id", ASCENDING), ("categoryLower", ASCENDING)], {}),  # Case-insensitive category lookups
+    (Collections.TRANSACTIONS, [("user_id", ASCENDING), ("date", DESCENDING)], {}),  # Per-user history, newest first
+    (Collections.TRANSACTIONS, [("user_id", ASCENDING), ("type", ASCENDING), ("date", ASCENDING)], {}),  # Per-user totals by type
+    # Goals by owner (older goals are moved from user_id to userId by migrate_goal_owners.py)
+    (Collections.FINANCIAL_GOALS, [("userId", ASCENDING)], {"partialFilterExpression": {"userId": {"$exists": True}}}),
+    # One budget per user, category and period; older category breakdowns keyed by userId are left out
+    (Collections.CATEGORY_BREAKDOWN, [("user_id", ASCENDING), ("category", ASCENDING), ("period", ASCENDING)],
+     {"unique": True, "partialFilterExpression": {"user_id": {"$exists": True}}}),
+    # One rolled-up total per user, month and category
+    (Collections.MONTHLY_CATEGORY_TOTALS, [("user_id", ASCENDING), ("year", ASCENDING), ("month", ASCENDING), ("category", ASCENDING)],
+     {"unique": True}),
+]
+
+# Names of the databases where ensure_indexes has created the unique indexes on Users
+_unique_user_indexes = set()
+
+def ensure_indexes():
+    """
+    Create the indexes used by the application's hot queries.
+    
+    create_index is idempotent, so this is cheap to call on every startup.
+    Each index is created independently so that one failure (for example a
+    unique index over existing duplicate data) doesn't prevent the others.
+    Whether the unique user indexes were created is recorded for
+    has_unique_user_indexes.
+    
+    Returns:
+        list: Names of the indexes that exist after the call
+    """
+    db_name = os.getenv('MONGODB_DB_NAME', MONGODB_DB_NAME)
+    created = []
+    user_indexes_ready = True
+    for collection_name, keys, options in INDEXES:
+        try:
+            created.append(get_collection(collection_name).create_index(keys, **options))
+        except Exception as e:
+            logger.error(f"Failed to create index {keys} on {collection_name}: {str(e)}")
+            if collection_name == Collections.USERS and options.get("unique"):
+                user_indexes_ready = False
+    if user_indexes_ready:
+        _unique_user_indexes.add(db_name)
+    else:
+        _unique_user_indexes.discard(db_name)
+    return created
+
+def has_unique_user_indexes():
+    """
+    Check whether the unique username and email indexes exist on the current database.
+    
+    Only indexes created by ensure_indexes in this process are known, so this
+    is False until it has succeeded.
+    
+    Returns:
+        bool: True if duplicate users are rejected by the database
+    """
+    return os.getenv('MONGODB_DB_NAME', MONGODB_DB_NAME) in _unique_user_indexes
+
+def migrate_goal_owners():
+    """
+    Move the owner of older goals from user_id to userId.
+    
+    Goals used to be stored with either field, which forced every goal lookup
+    to match both. This is a one-off data migration run by migrate_goal_owners.py,
+    not at startup. Only goals that still have user_id are touched, so running it
+    again is a no-op. A goal that somehow has both fields keeps its userId.
+    
+    Returns:
+        int: Number of goals that were migrated
+    """
+    result = get_collection(Collections.FINANCIAL_GOALS).update_many(
+        {"user_id": {"$exists": True}},
+        [{"$set": {"userId": {"$ifNull": ["$userId", "$user_id"]}}}, {"$unset": "user_id"}]
+    )
+    if result.modified_count:
+        logger.info(f"Moved {result.modified_count} goals from user_id to userId")
+    return result.modified_count
+
+def get_async_db():
+    """
+    Get the database instance through the async (Motor) client.
+    
+    Use this from async endpoints; every operation on the returned
+    database must be awaited.
+    
+    Returns:
+        motor.motor_asyncio.AsyncIOMotorDatabase: The MongoDB database instance
+    """
+    return Database.get_instance().get_async_db()
+
+def get_async_collection(collection_name: str):
+    """
+    Get a specific collection through the async (Motor) client.
+    
+    Use this from async endpoints; every operation on the returned
+    collection must be awaited.
+    
+    Args:
+        collection_name (str): Name of the collection to retrieve
+        
+    Returns:
+        motor.motor_asyncio.AsyncIOMotorCollection: The specified MongoDB collection
+    """
+    return Database.get_instance().get_async_collection(collection_name)
+
 def close_db_connection():
     """
     Close the database connection.
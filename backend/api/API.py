@@ -4,11 +4,25 @@ import sys
 import os
 from fastapi import FastAPI, APIRouter, Request, Body, HTTPException, Depends
 from bson import ObjectId
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import DuplicateKeyError, PyMongoError
+from bson.errors import InvalidId
 from pydantic import BaseModel
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Iterable, Tuple
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import Response, StreamingResponse
 from datetime import datetime, timedelta
 import json
+import re
+import asyncio
+import hmac
+import hashlib
+import logging
+import bcrypt
+import orjson
+from cachetools import TTLCache
+from functools import lru_cache
 
 # Add path to backend directory to import AI modules
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -25,9 +39,11 @@ except ImportError:
 
 # Import database API router and database connection
 from .database_api import router as db_router
-from Database.database import get_db, get_collection, Collections
+from .responses import ORJSONResponse
+from Database.database import get_db, get_collection, get_async_collection, Collections, ensure_indexes
 
-app = FastAPI()
+# Serialize responses with orjson rather than the standard library encoder
+app = FastAPI(default_response_class=ORJSONResponse)
 
 # Configure CORS
 frontend_url = os.getenv('FRONTEND_URL', 'https://cougar-wise.vercel.app')
@@ -39,9 +55,52 @@ app.add_middleware(
     allow_headers=["*"],  # Allows all headers
 )
 
+# Compress larger responses such as transaction and goal lists; small ones aren't worth it.
+# Starlette leaves server-sent event streams uncompressed, so events still arrive as they're sent.
+app.add_middleware(GZipMiddleware, minimum_size=1024, compresslevel=5)
+
 # Include database API router
 app.include_router(db_router)
 
+logger = logging.getLogger(__name__)
+
+@app.exception_handler(PyMongoError)
+async def database_error_handler(request: Request, exc: PyMongoError):
+    """
+    Turn database failures into a 503 instead of a per-endpoint 500.
+    The traceback is logged so slow or failing queries stay visible.
+    """
+    logger.exception("Database error on %s %s", request.method, request.url.path, exc_info=exc)
+    return ORJSONResponse(status_code=503, content={"detail": "Database unavailable"})
+
+@app.exception_handler(DuplicateKeyError)
+async def duplicate_key_handler(request: Request, exc: DuplicateKeyError):
+    """
+    Report a write rejected by a unique index as a 409 conflict.
+    DuplicateKeyError is a PyMongoError, but the database is fine and retrying
+    won't help, so it must not become the 503 from database_error_handler.
+    (Handlers are matched on the most specific exception class, so this one wins.)
+    """
+    return ORJSONResponse(status_code=409, content={"detail": "A matching record already exists"})
+
+@app.exception_handler(InvalidId)
+async def invalid_id_handler(request: Request, exc: InvalidId):
+    """
+    Reject malformed ObjectIds that slip past parse_object_id with a 400.
+    """
+    return ORJSONResponse(status_code=400, content={"detail": "Invalid ID"})
+
+@app.on_event("startup")
+def create_indexes():
+    """
+    Make sure the indexes behind the hot user and transaction queries exist.
+    Failures are logged rather than raised so the API can still start without the database.
+    """
+    try:
+        ensure_indexes()
+    except Exception as e:
+        print(f"Could not prepare the database: {str(e)}")
+
 # Database dependency
 def get_db_dependency():
     """
@@ -99,6 +158,7 @@ class UserProfile(BaseModel):
     age: Optional[int] = None  # Student's age (optional)
     gender: Optional[str] = None  # Student's gender (optional)
     preferred_payment_method: Optional[str] = None  # Preferred payment method (optional)
+    user_id: Optional[str] = None  # ID of the user, used to pull their transaction history (optional)
 
 class FinancialGoals(BaseModel):
     """
@@ -157,8 +217,6 @@ class SpendingInsightResponse(BaseModel):
     insights: List[str]
     recommendations: List[str]
 
-newuser = Student()
-
 def create_user(email, username, firstname, lastname):
     """
     Create a user dictionary from provided information.
@@ -172,12 +230,13 @@ def create_user(email, username, firstname, lastname):
     Returns:
         Dictionary containing user information
     """
-    newuser.lastname = lastname
-    newuser.username = username
-    newuser.email = email
-    newuser.firstname = firstname
-
-    return dict(newuser)
+    # Build a fresh dict per call rather than mutating a shared model instance
+    return {
+        "firstname": firstname,
+        "lastname": lastname,
+        "username": username,
+        "email": email
+    }
 
 
 students = {
@@ -243,7 +302,7 @@ def addUser(email, username: str, firstname: str, lastname: str):
 
     # Check if an email exists from the collection of users
     collection = get_collection(Collections.USERS)
-    if collection.count_documents({'email': data['email']}) > 0:
+    if collection.find_one({'email': data['email']}, projection={'_id': 1}) is not None:
         user_exists = True
         print("Customer Exists")
         return {"message": "Customer Exists", "detail": "User already exists"}
@@ -253,7 +312,7 @@ def addUser(email, username: str, firstname: str, lastname: str):
         "email": data['email'],
         "username": data['username'],
         "name": f"{data['firstname']} {data['lastname']}",
-        "password": "defaultpassword",  # In a real app, this should be hashed
+        "password": hash_password("defaultpassword"),
         "createdAt": datetime.now()
     })
     
@@ -275,26 +334,9 @@ async def create_item(request: Request, student: Student):
         Dictionary containing the ID of the created item
     """
     db = request.app.mongodb["collection_name"]
-    result = await db.insert_one(student.dict())
+    result = await db.insert_one(student.model_dump())
     return {"id": str(result.inserted_id)}
 
-@app.put("/{id}")
-async def update_item(request: Request, id: str, student: Student):
-    """
-    Update an item by ID.
-    
-    Args:
-        request: The HTTP request object
-        id: The ID of the item to update
-        student: The updated student data
-        
-    Returns:
-        Dictionary containing the number of updated items
-    """
-    db = request.app.mongodb["collection_name"]
-    result = await db.update_one({"_id": ObjectId(id)}, {"$set": student.dict()})
-    return {"updated_count": result.modified_count}
-
 #Real one - Put/update email
 @app.put("/customer/{email}")
 async def update_item(request: Request, email: str, student: Student):
@@ -310,238 +352,537 @@ async def update_item(request: Request, email: str, student: Student):
         Dictionary containing the number of updated items
     """
     db = request.app.mongodb["collection_name"] #change collection name to DB name
-    result = await db.update_one({"email": email}, {"$set": student.dict()})
+    result = await db.update_one({"email": email}, {"$set": student.model_dump()})
     return {"updated_count": result.modified_count}
 
 
-#Real one - Put/update firstname
-@app.put("/{firstname}") #add httpexectpion
-async def update_item(request: Request, firstname: str, student: Student):
+# User lookup endpoints
+# A single route per method that filters on whichever fields are supplied as query
+# parameters, e.g. GET /users?username=jdoe or DELETE /users?email=jdoe@example.com
+
+def parse_object_id(value: str, name: str) -> ObjectId:
     """
-    Update a user by firstname.
+    Convert a path or query parameter to an ObjectId, rejecting malformed IDs up front.
     
     Args:
-        request: The HTTP request object
-        firstname: The firstname of the user to update
-        student: The updated student data
+        value: The ID as a string
+        name: What the ID identifies, used in the error message (e.g. "user")
         
     Returns:
-        Dictionary containing the number of updated items
+        The parsed ObjectId
+        
+    Raises:
+        HTTPException: If the value is not a valid ObjectId
     """
-    db = request.app.mongodb["collection_name"] #change collection name to DB name
-    result = await db.update_one({"firstname": firstname}, {"$set": student.dict()})
-    return {"updated_count": result.modified_count}
-
+    if not ObjectId.is_valid(value):
+        raise HTTPException(status_code=400, detail=f"Invalid {name} ID")
+    return ObjectId(value)
 
-@app.put("/{lastname}")#add httpexecption
-async def update_item(request: Request, lastname: str, student: Student):
+def build_user_filter(username=None, email=None, firstname=None, lastname=None, id=None):
     """
-    Update a user by lastname.
+    Build a MongoDB filter from the user lookup query parameters.
     
     Args:
-        request: The HTTP request object
-        lastname: The lastname of the user to update
-        student: The updated student data
+        username: Username to match (optional)
+        email: Email to match (optional)
+        firstname: First name to match (optional)
+        lastname: Last name to match (optional)
+        id: Document ID to match (optional)
         
     Returns:
-        Dictionary containing the number of updated items
+        Dictionary containing a filter on every supplied field
+        
+    Raises:
+        HTTPException: If no filter was supplied or the ID is not a valid ObjectId
     """
-    db = request.app.mongodb["collection_name"] #change collection name to DB name
-    result = await db.update_one({"lastname": lastname}, {"$set": student.dict()})
-    return {"updated_count": result.modified_count}    
-
-
-@app.put("/{username}")#add httpexpection
-async def update_item(request: Request, username: str, student: Student):
+    filters = {"username": username, "email": email, "firstname": firstname, "lastname": lastname}
+    query = {k: v for k, v in filters.items() if v}
+    
+    if id:
+        query["_id"] = parse_object_id(id, "user")
+    
+    if not query:
+        raise HTTPException(status_code=400, detail="At least one filter is required")
+    return query
+
+@app.get("/users")
+async def read_user(
+    username: Optional[str] = None,
+    email: Optional[str] = None,
+    firstname: Optional[str] = None,
+    lastname: Optional[str] = None,
+    id: Optional[str] = None
+):
     """
-    Update a user by username.
+    Get a user matching the supplied username, email, firstname, lastname and/or ID.
     
     Args:
-        request: The HTTP request object
-        username: The username of the user to update
-        student: The updated student data
+        username: Username of the user to retrieve (optional)
+        email: Email of the user to retrieve (optional)
+        firstname: First name of the user to retrieve (optional)
+        lastname: Last name of the user to retrieve (optional)
+        id: ID of the user to retrieve (optional)
         
     Returns:
-        Dictionary containing the number of updated items
+        User information
+        
+    Raises:
+        HTTPException: If no filter was supplied or no user matches
     """
-    db = request.app.mongodb["collection_name"] #change collection name to DB name
-    result = await db.update_one({"username": str}, {"$set": student.dict()})
-    return {"updated_count": result.modified_count}
-
-
-# the one I base it off of
-@app.put("/{id}")
-async def update_item(request: Request, id: str, student: Student):
+    query = build_user_filter(username, email, firstname, lastname, id)
+    collection = get_async_collection(Collections.USERS)
+    user = await collection.find_one(query, {"password": 0})
+    if user is None:
+        raise HTTPException(status_code=404, detail="Person not found")
+    
+    user["_id"] = str(user["_id"])
+    return user
+
+@app.put("/users")
+async def update_user(
+    student: Student,
+    username: Optional[str] = None,
+    email: Optional[str] = None,
+    firstname: Optional[str] = None,
+    lastname: Optional[str] = None,
+    id: Optional[str] = None
+):
     """
-    Base update endpoint that other update endpoints are based on.
+    Update the user matching the supplied username, email, firstname, lastname and/or ID.
     
     Args:
-        request: The HTTP request object
-        id: The ID of the item to update
-        student: The updated student data
+        student: The updated student data (only non-None fields are applied)
+        username: Username of the user to update (optional)
+        email: Email of the user to update (optional)
+        firstname: First name of the user to update (optional)
+        lastname: Last name of the user to update (optional)
+        id: ID of the user to update (optional)
         
     Returns:
         Dictionary containing the number of updated items
     """
-    db = request.app.mongodb["collection_name"]
-    result = await db.update_one({"_id": ObjectId(id)}, {"$set": student.dict()})
+    query = build_user_filter(username, email, firstname, lastname, id)
+    update_data = student.model_dump(exclude_none=True)
+    if not update_data:
+        return {"updated_count": 0}
+    
+    collection = get_async_collection(Collections.USERS)
+    result = await collection.update_one(query, {"$set": update_data})
     return {"updated_count": result.modified_count}
 
-
-#########################################################################################################
-########################################  ALL OF THE GETS   #############################################
-#########################################################################################################
-@app.get("/{username}")
-async def read_items(request: Request, username: str):
+@app.delete("/users")
+async def delete_user(
+    username: Optional[str] = None,
+    email: Optional[str] = None,
+    firstname: Optional[str] = None,
+    lastname: Optional[str] = None,
+    id: Optional[str] = None
+):
     """
-    Get a user by username.
+    Delete the user matching the supplied username, email, firstname, lastname and/or ID.
     
     Args:
-        request: The HTTP request object
-        username: The username of the user to retrieve
+        username: Username of the user to delete (optional)
+        email: Email of the user to delete (optional)
+        firstname: First name of the user to delete (optional)
+        lastname: Last name of the user to delete (optional)
+        id: ID of the user to delete (optional)
         
     Returns:
-        User information or None if not found
+        Dictionary containing the number of deleted items
     """
-    db = request.app.mongodb["collection_name"] #change to name of collection
-    items = await db.find_one({"username": username})
-  #  if items is None:
-     #   raise HTTPExeption(status_code=404, detail="Person not found")
-    return items
+    query = build_user_filter(username, email, firstname, lastname, id)
+    collection = get_async_collection(Collections.USERS)
+    result = await collection.delete_one(query)
+    return {"deleted_count": result.deleted_count}
+
+# AI Assistant Endpoints
 
+# Per-user cache of aggregated finance data used by the AI endpoints.
+# Entries expire after a minute and are dropped as soon as the user records a new transaction.
+finance_summary_cache = TTLCache(maxsize=10_000, ttl=60)
 
-@app.get("/{lastname}")
-async def read_items(request: Request, lastname: str):
+# Per-user cache of the read-only analytics results (spending analysis, insights and the
+# budget template breakdown). Each user maps to a dict of their results keyed by
+# (endpoint, *parameters), so a user's results can all be dropped with one pop.
+# A user's results expire two minutes after the first is cached and are dropped as soon
+# as the user's transactions or budgets change.
+analytics_cache = TTLCache(maxsize=10_000, ttl=120)
+
+def get_user_cache_entry(cache, user_id, key):
     """
-    Get a user by lastname.
+    Look up one of a user's results in a per-user cache.
     
     Args:
-        request: The HTTP request object
-        lastname: The lastname of the user to retrieve
+        cache: A cache mapping user IDs to dicts of their results
+        user_id: ID of the user
+        key: Key of the result within the user's entries
         
     Returns:
-        User information or None if not found
+        The cached result, or None if it isn't cached
+    """
+    entries = cache.get(user_id)
+    return entries.get(key) if entries is not None else None
+
+def set_user_cache_entry(cache, user_id, key, value):
     """
-    db = request.app.mongodb["collection_name"] #change to name of collection
-    items = await db.find_one({"lastname": lastname})
-   # if items is None:
-     #   raise HTTPExeption(status_code=404, detail="Person not found")
-    return items
+    Store one of a user's results in a per-user cache.
+    
+    Args:
+        cache: A cache mapping user IDs to dicts of their results
+        user_id: ID of the user
+        key: Key of the result within the user's entries
+        value: The result to cache
+    """
+    entries = cache.get(user_id)
+    if entries is None:
+        entries = cache[user_id] = {}
+    entries[key] = value
+
+# Profile fields used when adding a user's details to an AI query
+USER_CONTEXT_PROJECTION = {"name": 1, "email": 1, "year_in_school": 1, "major": 1}
+
+# Spending categories recognised in AI queries, and the phrases that mark a query as
+# asking about one of them. Built once at import rather than on every request.
+SPENDING_CATEGORIES = ("food", "rent", "groceries", "dining", "housing", "transportation",
+                       "utilities", "entertainment", "education", "health", "shopping")
+SPENDING_PATTERNS = {
+    category: (
+        f"spent on {category}",
+        f"spending on {category}",
+        f"{category} expenses",
+        f"how much {category}",
+        f"how much on {category}",
+        f"how much for {category}",
+        f"how much did i spend on {category}",
+        f"how much money i spent on {category}",
+        f"how much have i spent on {category}",
+        f"money spent on {category}"
+    )
+    for category in SPENDING_CATEGORIES
+}
 
+# Month abbreviations used when formatting ISO dates in responses (same output as strftime('%b'))
+MONTH_ABBREVIATIONS = ("Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec")
 
-@app.get("/{firstname}")
-async def read_items(request: Request, firstname: str):
+def is_expense_transaction(transaction_type: Optional[str], category: Optional[str]) -> bool:
     """
-    Get a user by firstname.
+    Decide whether a transaction counts as an expense for category spending.
+    
+    A transaction is an expense if it is typed as one (in any case) or if it
+    has a non-blank category. This is the same rule the MongoDB pipelines use.
     
     Args:
-        request: The HTTP request object
-        firstname: The firstname of the user to retrieve
+        transaction_type: The transaction's type field, if any
+        category: The transaction's category, if any
         
     Returns:
-        User information or None if not found
+        True if the transaction is an expense
     """
-    db = request.app.mongodb["collection_name"] #change to name of collection
-    items = await db.find_one({"firstname": firstname})
-   # if items is None:
-    #    raise HTTPExeption(status_code=404, detail="Person not found")
-    return items
-
+    return bool(category and category.strip()) or (transaction_type or '').lower() == 'expense'
 
-@app.get("/{email}")
-async def read_items(request: Request, email: str):
+def summarize_finances(transactions: Iterable[Dict[str, Any]]) -> Tuple[float, float, Dict[str, float]]:
     """
-    Get a user by email.
+    Aggregate a user's transactions in a single pass.
+    
+    Transactions with a type field are classified by it. Untyped transactions
+    with a category are treated as expenses; anything else is classified by the
+    sign of its amount. Every expense (typed or categorised) also contributes
+    its absolute amount to the category breakdown.
     
     Args:
-        request: The HTTP request object
-        email: The email of the user to retrieve
+        transactions: Iterable of transaction documents
         
     Returns:
-        User information or None if not found
+        Tuple of (total_income, total_expenses, category_spending)
     """
-    db = request.app.mongodb["collection_name"] #change to name of collection
-    items = await db.find_one({"email": email})
-   # if items is None:
-    #    raise HTTPExeption(status_code=404, detail="Person not found")
-    return items
-
+    total_income = 0
+    total_expenses = 0
+    category_spending = {}
+    
+    for t in transactions:
+        amount = t.get('amount', 0)
+        category = (t.get('category') or '').strip()
+        transaction_type = t.get('type')
+        
+        # If transaction has a type field, use it
+        if transaction_type is not None:
+            if transaction_type == 'income':
+                total_income += amount
+            elif transaction_type == 'expense':
+                total_expenses += amount
+        # If transaction has a category, consider it an expense
+        elif category:
+            total_expenses += amount
+        # If no type and no category, use amount sign (positive = income, negative = expense)
+        elif amount < 0:
+            total_expenses += abs(amount)
+        else:
+            total_income += amount
+        
+        # For expenses, add the positive amount to the category breakdown
+        if is_expense_transaction(transaction_type, category):
+            category = category or 'Uncategorized'
+            category_spending[category] = category_spending.get(category, 0) + abs(amount)
+    
+    return total_income, total_expenses, category_spending
 
-@app.get("/{id}")
-async def read_items(request: Request, id: str):
+async def get_finance_summary(user_id):
+    """
+    Get the aggregated income, expenses and category spending for a user.
+    
+    Results are cached per user for a short time so repeated AI queries
+    don't re-run the same transaction aggregation against MongoDB.
+    
+    Args:
+        user_id: ID of the user whose transactions to aggregate
+        
+    Returns:
+        Tuple of (total_income, total_expenses, category_spending)
     """
-    Get a user by ID.
+    summary = finance_summary_cache.get(user_id)
+    if summary is not None:
+        return summary
+    
+    # Only fetch the fields the summary needs
+    transactions_collection = get_async_collection(Collections.TRANSACTIONS)
+    transactions = await transactions_collection.find(
+        {"user_id": user_id}, {"_id": 0, "amount": 1, "category": 1, "type": 1}
+    ).to_list(length=None)
+    summary = summarize_finances(transactions)
+    finance_summary_cache[user_id] = summary
+    return summary
+
+async def get_user_with_finance_summary(user_id):
+    """
+    Get a user's profile together with their aggregated finance data.
+    
+    When the finance summary isn't cached, the user document and their
+    transactions are fetched in a single aggregate call using $lookup,
+    instead of a find_one followed by a separate transactions query.
     
     Args:
-        request: The HTTP request object
-        id: The ID of the user to retrieve
+        user_id: ID of the user to fetch
         
     Returns:
-        User information or None if not found
+        Tuple of (user document or None, (total_income, total_expenses, category_spending))
     """
-    db = request.app.mongodb["collection_name"] #change to name of collection
-    items = await db.find_one({"id": id})
-   # if items is None:
-    #    raise HTTPExeption(status_code=404, detail="Person not found")
-    return items
-
+    users_collection = get_async_collection(Collections.USERS)
+    summary = finance_summary_cache.get(user_id)
+    if summary is not None:
+        return await users_collection.find_one({"_id": ObjectId(user_id)}, USER_CONTEXT_PROJECTION), summary
+    
+    # Transactions store user_id as a string, so match against the stringified _id
+    pipeline = [
+        {"$match": {"_id": ObjectId(user_id)}},
+        {"$limit": 1},
+        {"$project": USER_CONTEXT_PROJECTION},
+        {"$lookup": {
+            "from": Collections.TRANSACTIONS,
+            "let": {"user_id": {"$toString": "$_id"}},
+            "pipeline": [
+                {"$match": {"$expr": {"$eq": ["$user_id", "$$user_id"]}}},
+                {"$project": {"_id": 0, "amount": 1, "category": 1, "type": 1}}
+            ],
+            "as": "transactions"
+        }}
+    ]
+    users = await users_collection.aggregate(pipeline).to_list(length=1)
+    user = users[0] if users else None
+    if user is None:
+        return None, summarize_finances([])
+    
+    summary = summarize_finances(user.pop("transactions"))
+    finance_summary_cache[user_id] = summary
+    return user, summary
 
-@app.get("/")
-async def read_items(request: Request):
+async def get_budget_breakdown(user_id):
     """
-    Get all items from the collection.
+    Get a user's spending by category and income by source, grouped server-side.
+    
+    A single aggregate call groups the user's transactions inside MongoDB, so only
+    the per-category totals cross the wire. Spending follows the same rules as
+    summarize_finances: expense-typed transactions and anything with a category.
+    Income is income-typed transactions, plus untyped, uncategorised positive amounts.
     
     Args:
-        request: The HTTP request object
+        user_id: ID of the user whose transactions to group
         
     Returns:
-        List of items (limited to 100)
+        Tuple of (category_spending, income_sources) dictionaries
     """
-    db = request.app.mongodb["collection_name"]#change collection name
-    items = await db.find({}).to_list(100)
-    for item in items:
-        item["_custid"] = str(item["_custid"])
-    return items
-
-
+    cache_key = ("budget_breakdown",)
+    breakdown = get_user_cache_entry(analytics_cache, user_id, cache_key)
+    if breakdown is not None:
+        return breakdown
+    
+    transactions_collection = get_async_collection(Collections.TRANSACTIONS)
+    pipeline = [
+        # Match first so the user_id index is used
+        {"$match": {"user_id": user_id}},
+        {"$project": {
+            "_id": 0,
+            "amount": {"$abs": {"$ifNull": ["$amount", 0]}},
+            "is_positive": {"$gt": [{"$ifNull": ["$amount", 0]}, 0]},
+            "has_type": {"$ne": [{"$type": "$type"}, "missing"]},
+            "type": {"$toLower": {"$ifNull": ["$type", ""]}},
+            "category": {"$trim": {"input": {"$ifNull": ["$category", ""]}}}
+        }},
+        {"$facet": {
+            "spending": [
+                {"$match": {"$or": [{"type": "expense"}, {"category": {"$ne": ""}}]}},
+                {"$group": {"_id": "$category", "total": {"$sum": "$amount"}}}
+            ],
+            "income": [
+                {"$match": {"$or": [
+                    {"type": "income"},
+                    {"has_type": False, "category": "", "is_positive": True}
+                ]}},
+                {"$group": {"_id": "$category", "total": {"$sum": "$amount"}}}
+            ]
+        }}
+    ]
+    results = await transactions_collection.aggregate(pipeline).to_list(length=1)
+    result = results[0] if results else {"spending": [], "income": []}
+    
+    category_spending = {group["_id"] or 'Uncategorized': group["total"] for group in result["spending"]}
+    income_sources = {group["_id"] or 'Other Income': group["total"] for group in result["income"]}
+    set_user_cache_entry(analytics_cache, user_id, cache_key, (category_spending, income_sources))
+    return category_spending, income_sources
 
+# Per-user cache of the formatted spending answers returned by /ai/query, mapping each
+# user to their answers by category, so repeated questions like "how much did I spend
+# on food" skip the lookup and formatting.
+category_response_cache = TTLCache(maxsize=4096, ttl=30)
 
+# Number of example transactions included in an answer about a spending category
+CATEGORY_EXAMPLE_LIMIT = 3
 
+def invalidate_finance_caches(user_id):
+    """
+    Drop every cached finance result for a user.
+    
+    Args:
+        user_id: ID of the user whose cached data is now stale
+    """
+    finance_summary_cache.pop(user_id, None)
+    category_response_cache.pop(user_id, None)
+    analytics_cache.pop(user_id, None)
 
-@app.delete("/{id}")
-async def delete_item(request: Request, id: str):
+async def format_category_response(user_id, category):
     """
-    Delete an item by ID.
+    Build the answer to a question about spending in a single category.
+    
+    Answers are cached per (user, category) for a short time and dropped
+    as soon as the user records a new transaction.
     
     Args:
-        request: The HTTP request object
-        id: The ID of the item to delete
+        user_id: ID of the user asking
+        category: The spending category asked about
         
     Returns:
-        Dictionary containing the number of deleted items
+        Response text describing the user's spending in the category
     """
-    db = request.app.mongodb["collection_name"]
-    result = await db.delete_one({"_id": ObjectId(id)})
-    return {"deleted_count": result.deleted_count}
-
+    response_text = get_user_cache_entry(category_response_cache, user_id, category)
+    if response_text is not None:
+        return response_text
+    
+    # Get detailed spending data for this category
+    spending_data = await get_category_spending(user_id, category)
+    
+    # Format a detailed response about this category
+    if spending_data.get("transaction_count", 0) > 0:
+        response_text = f"Based on your transaction history, you've spent ${spending_data['total_spent']:.2f} on {category.capitalize()} "
+        response_text += f"during the period {spending_data['time_period']}. "
+        response_text += f"This represents {spending_data['percentage']:.1f}% of your total expenses. "
+        
+        # Add transaction examples if available
+        if len(spending_data.get('transactions', [])) > 0:
+            response_text += f"Your {category} spending includes "
+            transaction_samples = spending_data['transactions'][:CATEGORY_EXAMPLE_LIMIT]
+            examples = []
+            for t in transaction_samples:
+                # Dates are ISO strings ("YYYY-MM-DDTHH:MM:SS"); format them as "Mon DD" by slicing
+                date_str = t.get('date')
+                month = date_str[5:7] if isinstance(date_str, str) and 'T' in date_str else ""
+                if month.isdigit() and 1 <= int(month) <= 12 and date_str[8:10].isdigit():
+                    formatted_date = f"{MONTH_ABBREVIATIONS[int(month) - 1]} {date_str[8:10]}"
+                else:
+                    formatted_date = "Unknown date"
+                    
+                examples.append(f"${abs(t.get('amount', 0)):.2f} on {t.get('description', 'Unknown')} ({formatted_date})")
+            
+            response_text += ", ".join(examples)
+            remaining = spending_data['transaction_count'] - len(transaction_samples)
+            if remaining > 0:
+                response_text += f", and {remaining} more transactions."
+            else:
+                response_text += "."
+    else:
+        response_text = f"Based on your transaction history, you haven't recorded any spending on {category.capitalize()} yet."
+        # Don't cache the answer if the lookup itself failed
+        if "error" in spending_data:
+            return response_text
+    
+    set_user_cache_entry(category_response_cache, user_id, category, response_text)
+    return response_text
 
-@app.delete("/{username}")
-async def delete_item(request: Request, username: str):
+async def prepare_user_query(user_query: UserQuery) -> Optional[str]:
     """
-    Delete a user by username.
+    Enrich a user query with the user's profile and finances, and answer it
+    directly if it asks about spending in a single category.
     
     Args:
-        request: The HTTP request object
-        username: The username of the user to delete
+        user_query: Object containing the query and user context (updated in place)
         
     Returns:
-        Dictionary containing the number of deleted items
-    """
-    db = request.app.mongodb["collection_name"]
-    result = await db.delete_one({"username": str})
-    return {"deleted_count": result.deleted_count}
-
-# AI Assistant Endpoints
+        The answer text if the query can be answered from the user's own
+        transactions, otherwise None (the AI assistant should answer it)
+    """
+    # Get user data from database if user_id is provided
+    user_data = {}
+    user_id = None
+    if user_query.user_context and 'user_id' in user_query.user_context:
+        user_id = user_query.user_context['user_id']
+        # Fetch user profile data and aggregated transaction data in one round-trip
+        user, (total_income, total_expenses, category_spending) = await get_user_with_finance_summary(user_id)
+        
+        if user:
+            user_data['profile'] = {
+                'name': user.get('name', ''),
+                'email': user.get('email', ''),
+                'year_in_school': user.get('year_in_school', ''),
+                'major': user.get('major', '')
+            }
+            
+            # Add financial data to user context
+            user_data['finances'] = {
+                'total_income': total_income,
+                'total_expenses': total_expenses,
+                'category_spending': category_spending
+            }
+            
+            # Update user_context with the retrieved data
+            if not user_query.user_context:
+                user_query.user_context = {}
+            user_query.user_context.update(user_data)
+    
+    # Check if the query is about food spending or specific categories
+    query_lower = user_query.query.lower()
+    
+    # Enhanced pattern matching for spending queries; a single pass finds the category asked about
+    detected_category = next(
+        (category for category in SPENDING_CATEGORIES
+         if any(pattern in query_lower for pattern in SPENDING_PATTERNS[category])),
+        None
+    )
+    is_spending_query = detected_category is not None
+    
+    # If this is a spending query and we have a user_id, get specific category spending data
+    if is_spending_query and user_id:
+        # Build (or reuse) the detailed response about this category
+        return await format_category_response(user_id, detected_category)
+    return None
 
 @app.post("/ai/query")
 async def process_query(user_query: UserQuery):
@@ -563,187 +904,61 @@ async def process_query(user_query: UserQuery):
         raise HTTPException(status_code=503, detail="AI features are not available")
     
     try:
-        # Get user data from database if user_id is provided
-        user_data = {}
-        user_id = None
-        if user_query.user_context and 'user_id' in user_query.user_context:
-            user_id = user_query.user_context['user_id']
-            # Fetch user profile data
-            users_collection = get_collection(Collections.USERS)
-            user = users_collection.find_one({"_id": ObjectId(user_id)})
-            
-            if user:
-                user_data['profile'] = {
-                    'name': user.get('name', ''),
-                    'email': user.get('email', ''),
-                    'year_in_school': user.get('year_in_school', ''),
-                    'major': user.get('major', '')
-                }
-                
-                # Fetch transaction data
-                transactions_collection = get_collection(Collections.TRANSACTIONS)
-                transactions = list(transactions_collection.find({"user_id": user_id}))
-                
-                # Calculate financial metrics
-                total_income = 0
-                total_expenses = 0
-                
-                # Categorize transactions with or without type field
-                for t in transactions:
-                    amount = t.get('amount', 0)
-                    
-                    # If transaction has a type field, use it
-                    if 'type' in t:
-                        if t['type'] == 'income':
-                            total_income += amount
-                        elif t['type'] == 'expense':
-                            total_expenses += amount
-                    # Otherwise infer type from amount or category
-                    else:
-                        # If transaction has a category, consider it an expense
-                        if t.get('category', '').strip() != '':
-                            total_expenses += amount
-                        # If no type and no category, use amount sign (positive = income, negative = expense)
-                        elif amount < 0:
-                            total_expenses += abs(amount)
-                        else:
-                            total_income += amount
-                
-                # Get category breakdown
-                category_spending = {}
-                for t in transactions:
-                    # Determine if this is an expense
-                    is_expense = False
-                    
-                    # Check if we have a transaction type field
-                    if "type" in t:
-                        is_expense = t["type"].lower() == "expense"
-                    # If no type field or type is not "expense", use category and amount
-                    if not is_expense:
-                        # Any transaction with a category is considered an expense
-                        category = t.get('category', '').strip()
-                        is_expense = category != ""
-                    
-                    # For expenses, add to the category breakdown
-                    if is_expense:
-                        category = t.get('category', 'Uncategorized')
-                        if not category or category.strip() == "":
-                            category = 'Uncategorized'
-                        
-                        # Convert to positive for easier understanding
-                        amount = abs(t.get('amount', 0))
-                        
-                        if category in category_spending:
-                            category_spending[category] += amount
-                        else:
-                            category_spending[category] = amount
-                
-                # Add financial data to user context
-                user_data['finances'] = {
-                    'total_income': total_income,
-                    'total_expenses': total_expenses,
-                    'category_spending': category_spending
-                }
-                
-                # Update user_context with the retrieved data
-                if not user_query.user_context:
-                    user_query.user_context = {}
-                user_query.user_context.update(user_data)
-        
-        # Check if the query is about food spending or specific categories
-        query_lower = user_query.query.lower()
-        spending_categories = ["food", "rent", "groceries", "dining", "housing", "transportation", 
-                            "utilities", "entertainment", "education", "health", "shopping"]
-        
-        # Enhanced pattern matching for spending queries
-        is_spending_query = any(
-            pattern in query_lower 
-            for category in spending_categories
-            for pattern in [
-                f"spent on {category}", 
-                f"spending on {category}", 
-                f"{category} expenses",
-                f"how much {category}",
-                f"how much on {category}",
-                f"how much for {category}",
-                f"how much did i spend on {category}",
-                f"how much money i spent on {category}",
-                f"how much have i spent on {category}",
-                f"money spent on {category}"
-            ]
-        )
-        
-        # If this is a spending query and we have a user_id, get specific category spending data
-        if is_spending_query and user_id:
-            # Detect which category the user is asking about
-            detected_category = None
-            for category in spending_categories:
-                patterns = [
-                    f"spent on {category}", 
-                    f"spending on {category}", 
-                    f"{category} expenses",
-                    f"how much {category}",
-                    f"how much on {category}",
-                    f"how much for {category}",
-                    f"how much did i spend on {category}",
-                    f"how much money i spent on {category}",
-                    f"how much have i spent on {category}",
-                    f"money spent on {category}"
-                ]
-                
-                if any(pattern in query_lower for pattern in patterns):
-                    detected_category = category
-                    break
-            
-            if detected_category:
-                # Get detailed spending data for this category
-                spending_data = get_category_spending(user_id, detected_category)
-                
-                # Format a detailed response about this category
-                if spending_data.get("transaction_count", 0) > 0:
-                    response_text = f"Based on your transaction history, you've spent ${spending_data['total_spent']:.2f} on {detected_category.capitalize()} "
-                    response_text += f"during the period {spending_data['time_period']}. "
-                    response_text += f"This represents {spending_data['percentage']:.1f}% of your total expenses. "
-                    
-                    # Add transaction examples if available
-                    if len(spending_data.get('transactions', [])) > 0:
-                        response_text += f"Your {detected_category} spending includes "
-                        transaction_samples = spending_data['transactions'][:3]  # Show up to 3 examples
-                        examples = []
-                        for t in transaction_samples:
-                            date_str = t.get('date')
-                            try:
-                                if isinstance(date_str, str) and 'T' in date_str:
-                                    date_obj = datetime.fromisoformat(date_str.split('T')[0])
-                                    formatted_date = date_obj.strftime('%b %d')
-                                else:
-                                    formatted_date = "Unknown date"
-                            except:
-                                formatted_date = "Unknown date"
-                                
-                            examples.append(f"${abs(t.get('amount', 0)):.2f} on {t.get('description', 'Unknown')} ({formatted_date})")
-                        
-                        response_text += ", ".join(examples)
-                        if len(spending_data['transactions']) > 3:
-                            response_text += f", and {len(spending_data['transactions']) - 3} more transactions."
-                        else:
-                            response_text += "."
-                    
-                    return {
-                        "status": "success",
-                        "response": response_text
-                    }
-                else:
-                    return {
-                        "status": "success",
-                        "response": f"Based on your transaction history, you haven't recorded any spending on {detected_category.capitalize()} yet."
-                    }
+        category_response = await prepare_user_query(user_query)
+        if category_response is not None:
+            return ORJSONResponse(content={
+                "status": "success",
+                "response": category_response
+            })
         
         # For regular queries, or if no category-specific data is found, use the AI assistant
         result = ai_assistant.process_user_query(user_query.query, user_query.user_context)
-        return result
+        return ORJSONResponse(content=result)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error processing query: {str(e)}")
+
+@app.post("/ai/query/stream")
+async def stream_query(user_query: UserQuery):
+    """
+    Process a user query using the AI assistant, streaming the answer as it is generated.
+    The response is a server-sent event stream: each event carries a JSON object with
+    a "chunk" of the answer, an "error" event is sent if generation fails, and the
+    stream ends with a "done" event.
+    
+    Args:
+        user_query: Object containing the query and user context
+        
+    Returns:
+        Streaming response of server-sent events, or the complete answer as JSON
+        if the query was answered from the user's own transactions
+        
+    Raises:
+        HTTPException: If AI features are not available or an error occurs
+    """
+    if not AI_AVAILABLE:
+        raise HTTPException(status_code=503, detail="AI features are not available")
+    
+    try:
+        category_response = await prepare_user_query(user_query)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error processing query: {str(e)}")
+    
+    # Answers computed from the database are already complete, so send them as-is
+    if category_response is not None:
+        return ORJSONResponse(content={
+            "status": "success",
+            "response": category_response
+        })
+    
+    def event_stream():
+        try:
+            for chunk in ai_assistant.stream_user_query(user_query.query, user_query.user_context):
+                yield f"data: {json.dumps({'chunk': chunk})}\n\n"
+        except Exception as e:
+            yield f"event: error\ndata: {json.dumps({'error': str(e)})}\n\n"
+        yield "event: done\ndata: {}\n\n"
+    
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
 
 @app.post("/ai/spending-advice")
 async def get_spending_advice(user_data: UserProfile):
@@ -765,57 +980,25 @@ async def get_spending_advice(user_data: UserProfile):
         raise HTTPException(status_code=503, detail="AI features are not available")
     
     try:
-        # Convert to dict for easier manipulation
-        user_profile = user_data.dict()
+        # Convert to dict for easier manipulation (model_dump returns a fresh dict)
+        user_profile = user_data.model_dump()
         
         # Get user_id if provided
         user_id = user_profile.get('user_id')
         
         # If user_id is provided, fetch additional data from database
         if user_id:
-            # Fetch user's transactions
-            transactions_collection = get_collection(Collections.TRANSACTIONS)
-            transactions = list(transactions_collection.find({"user_id": user_id}))
-            
-            # Calculate financial metrics
-            total_income = sum(t['amount'] for t in transactions if t.get('type') == 'income')
-            total_expenses = sum(t['amount'] for t in transactions if t.get('type') == 'expense')
-            
-            # Get category breakdown
-            category_spending = {}
-            for t in transactions:
-                # Determine if this is an expense
-                is_expense = False
-                
-                # Check if we have a transaction type field
-                if "type" in t:
-                    is_expense = t["type"].lower() == "expense"
-                # If no type field or type is not "expense", use category and amount
-                if not is_expense:
-                    # Any transaction with a category is considered an expense
-                    category = t.get('category', '').strip()
-                    is_expense = category != ""
-                
-                # For expenses, add to the category breakdown
-                if is_expense:
-                    category = t.get('category', 'Uncategorized')
-                    if not category or category.strip() == "":
-                        category = 'Uncategorized'
-                    
-                    # Convert to positive for easier understanding
-                    amount = abs(t.get('amount', 0))
-                    
-                    if category in category_spending:
-                        category_spending[category] += amount
-                    else:
-                        category_spending[category] = amount
+            # Fetch aggregated transaction data
+            total_income, total_expenses, category_spending = await get_finance_summary(user_id)
             
             # Get the top spending category
             top_category = max(category_spending.items(), key=lambda x: x[1]) if category_spending else ('None', 0)
             
             # Fetch budget data
-            budgets_collection = get_collection(Collections.CATEGORY_BREAKDOWN)
-            budgets = list(budgets_collection.find({"user_id": user_id}))
+            budgets_collection = get_async_collection(Collections.CATEGORY_BREAKDOWN)
+            budgets = await budgets_collection.find(
+                {"user_id": user_id}, {"_id": 0, "category": 1, "amount": 1, "period": 1, "spent": 1}
+            ).to_list(length=None)
             
             # Add to user profile data
             user_profile['financial_data'] = {
@@ -828,7 +1011,7 @@ async def get_spending_advice(user_data: UserProfile):
             }
         
         result = ai_assistant.get_spending_advice(user_profile)
-        return result
+        return ORJSONResponse(content=result)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error getting spending advice: {str(e)}")
 
@@ -852,72 +1035,16 @@ async def get_budget_template(user_profile: UserProfile):
         raise HTTPException(status_code=503, detail="AI features are not available")
     
     try:
-        # Convert to dict for easier manipulation
-        user_data = user_profile.dict()
+        # Convert to dict for easier manipulation (model_dump returns a fresh dict)
+        user_data = user_profile.model_dump()
         
         # Get user_id if provided
         user_id = user_data.get('user_id')
         
         # If user_id is provided, fetch additional data from database
         if user_id:
-            # Fetch user's transactions
-            transactions_collection = get_collection(Collections.TRANSACTIONS)
-            transactions = list(transactions_collection.find({"user_id": user_id}))
-            
-            # Calculate spending by category
-            category_spending = {}
-            for t in transactions:
-                # Determine if this is an expense
-                is_expense = False
-                
-                # Check if we have a transaction type field
-                if "type" in t:
-                    is_expense = t["type"].lower() == "expense"
-                # If no type field or type is not "expense", use category and amount
-                if not is_expense:
-                    # Any transaction with a category is considered an expense
-                    category = t.get('category', '').strip()
-                    is_expense = category != ""
-                
-                # For expenses, add to the category breakdown
-                if is_expense:
-                    category = t.get('category', 'Uncategorized')
-                    if not category or category.strip() == "":
-                        category = 'Uncategorized'
-                    
-                    # Convert to positive for easier understanding
-                    amount = abs(t.get('amount', 0))
-                    
-                    if category in category_spending:
-                        category_spending[category] += amount
-                    else:
-                        category_spending[category] = amount
-            
-            # Calculate income sources
-            income_sources = {}
-            for t in transactions:
-                # Determine if this is income
-                is_income = False
-                
-                # Check if we have a transaction type field
-                if "type" in t:
-                    is_income = t["type"].lower() == "income"
-                # If no type field, use amount (positive = income)
-                elif t.get('amount', 0) > 0 and not t.get('category', '').strip():
-                    is_income = True
-                
-                # For income, add to the income sources
-                if is_income:
-                    source = t.get('category', 'Other Income')
-                    if not source or source.strip() == "":
-                        source = 'Other Income'
-                    
-                    amount = abs(t.get('amount', 0))
-                    
-                    if source in income_sources:
-                        income_sources[source] += amount
-                    else:
-                        income_sources[source] = amount
+            # Calculate spending by category and income sources inside MongoDB
+            category_spending, income_sources = await get_budget_breakdown(user_id)
             
             # Add to financial_data if it exists, or create it
             if 'financial_data' not in user_data:
@@ -929,7 +1056,7 @@ async def get_budget_template(user_profile: UserProfile):
             })
         
         result = ai_assistant.generate_budget_template(user_data)
-        return result
+        return ORJSONResponse(content=result)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error generating budget template: {str(e)}")
 
@@ -953,8 +1080,9 @@ async def analyze_financial_goals(goals_data: FinancialGoals):
         raise HTTPException(status_code=503, detail="AI features are not available")
     
     try:
-        # Create a copy to avoid modifying the original
-        goals = goals_data.goals.copy()
+        # The goals list is only ever replaced, never mutated, so it doesn't need copying.
+        # The context is updated below, so copy it to avoid modifying the request model.
+        goals = goals_data.goals
         user_context = goals_data.user_context.copy() if goals_data.user_context else {}
         
         # Get user_id if provided
@@ -962,9 +1090,19 @@ async def analyze_financial_goals(goals_data: FinancialGoals):
         
         # If user_id is provided, fetch actual goals from database
         if user_id:
-            # Fetch user's financial goals
-            goals_collection = get_collection(Collections.FINANCIAL_GOALS)
-            user_goals = list(goals_collection.find({"userId": user_id}))
+            # Fetch user's financial goals and their income/expense totals concurrently.
+            # The totals are computed in a single server-side pass over the user's transactions.
+            goals_collection = get_async_collection(Collections.FINANCIAL_GOALS)
+            transactions_collection = get_async_collection(Collections.TRANSACTIONS)
+            user_goals, type_totals = await asyncio.gather(
+                goals_collection.find(
+                    {"userId": user_id}, {"_id": 0, "name": 1, "targetAmount": 1, "currentAmount": 1, "category": 1}
+                ).to_list(length=None),
+                transactions_collection.aggregate([
+                    {"$match": {"user_id": user_id, "type": {"$in": ["income", "expense"]}}},
+                    {"$group": {"_id": "$type", "total": {"$sum": "$amount"}}}
+                ]).to_list(length=None)
+            )
             
             if user_goals:
                 # Use actual goals from database
@@ -981,13 +1119,10 @@ async def analyze_financial_goals(goals_data: FinancialGoals):
                     for goal in user_goals
                 ]
                 
-            # Fetch user's transactions for financial context
-            transactions_collection = get_collection(Collections.TRANSACTIONS)
-            transactions = list(transactions_collection.find({"user_id": user_id}))
-            
             # Calculate income and expenses
-            total_income = sum(t['amount'] for t in transactions if t.get('type') == 'income')
-            total_expenses = sum(t['amount'] for t in transactions if t.get('type') == 'expense')
+            totals_by_type = {group['_id']: group['total'] for group in type_totals}
+            total_income = totals_by_type.get('income', 0)
+            total_expenses = totals_by_type.get('expense', 0)
             monthly_savings = total_income - total_expenses
             
             # Add financial details to context
@@ -998,7 +1133,7 @@ async def analyze_financial_goals(goals_data: FinancialGoals):
             })
         
         result = ai_assistant.analyze_financial_goals(goals, user_context)
-        return result
+        return ORJSONResponse(content=result)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error analyzing financial goals: {str(e)}")
 
@@ -1010,11 +1145,61 @@ async def read_items():
     Returns:
         Dictionary containing a message
     """
-    # Use the get_collection function instead of request.app.mongodb
-    collection = get_collection(Collections.USERS)
-    count = collection.count_documents({})
+    # Use the get_async_collection function instead of request.app.mongodb
+    collection = get_async_collection(Collections.USERS)
+    # Read the count from collection metadata instead of scanning every document
+    count = await collection.estimated_document_count()
     return {"message": f"Found {count} users in the database"}
 
+# Password hashing
+# bcrypt only uses the first 72 bytes of a password and newer releases reject
+# anything longer, so truncate explicitly to keep hashing and checking consistent
+BCRYPT_MAX_PASSWORD_BYTES = 72
+
+def hash_password(password: str) -> str:
+    """
+    Hash a password with bcrypt for storage.
+    
+    Args:
+        password: The plaintext password
+        
+    Returns:
+        The bcrypt hash as a string
+    """
+    return bcrypt.hashpw(password.encode()[:BCRYPT_MAX_PASSWORD_BYTES], bcrypt.gensalt()).decode()
+
+def is_password_hashed(stored_password: str) -> bool:
+    """
+    Check whether a stored password is a bcrypt hash.
+    
+    Accounts created before passwords were hashed still have plaintext passwords.
+    
+    Args:
+        stored_password: The password value from the user document
+        
+    Returns:
+        True if the value is a bcrypt hash
+    """
+    return stored_password.startswith(("$2a$", "$2b$", "$2y$"))
+
+def verify_password(password: str, stored_password: Optional[str]) -> bool:
+    """
+    Check a submitted password against the stored one in constant time.
+    
+    Args:
+        password: The password submitted by the user
+        stored_password: The bcrypt hash (or legacy plaintext password) from the user document
+        
+    Returns:
+        True if the password matches
+    """
+    if not stored_password:
+        return False
+    if is_password_hashed(stored_password):
+        return bcrypt.checkpw(password.encode()[:BCRYPT_MAX_PASSWORD_BYTES], stored_password.encode())
+    # Legacy plaintext password; compare_digest doesn't short-circuit on the first mismatch
+    return hmac.compare_digest(password.encode(), stored_password.encode())
+
 # Authentication endpoints
 @app.post("/api/auth/login", response_model=LoginResponse)
 async def login(login_data: LoginRequest):
@@ -1029,10 +1214,13 @@ async def login(login_data: LoginRequest):
     """
     try:
         # Get the users collection
-        users_collection = get_collection(Collections.USERS)
+        users_collection = get_async_collection(Collections.USERS)
         
         # Find the user by username
-        user = users_collection.find_one({"username": login_data.username})
+        user = await users_collection.find_one(
+            {"username": login_data.username},
+            {"username": 1, "password": 1, "firstName": 1, "lastName": 1, "email": 1}
+        )
         
         if not user:
             return {
@@ -1040,13 +1228,20 @@ async def login(login_data: LoginRequest):
                 "message": "Invalid username or password"
             }
         
-        # Validate password (in a production app, compare hashed passwords)
-        if user["password"] != login_data.password:
+        # Validate password; bcrypt is slow on purpose, so keep it off the event loop
+        if not await asyncio.to_thread(verify_password, login_data.password, user.get("password")):
             return {
                 "success": False,
                 "message": "Invalid username or password"
             }
         
+        # Replace a legacy plaintext password with its hash now that we know it
+        if not is_password_hashed(user["password"]):
+            await users_collection.update_one(
+                {"_id": user["_id"]},
+                {"$set": {"password": await asyncio.to_thread(hash_password, login_data.password)}}
+            )
+        
         return {
             "success": True,
             "message": "Login successful",
@@ -1070,6 +1265,21 @@ class RegisterRequest(BaseModel):
     firstName: str
     lastName: str
 
+def registration_conflict(username_taken: bool) -> Dict[str, Any]:
+    """
+    Build the response for a registration whose username or email is taken.
+    
+    Args:
+        username_taken: True if the username clashed, False if the email did
+        
+    Returns:
+        Unsuccessful login response with the matching message
+    """
+    return {
+        "success": False,
+        "message": "Username already exists" if username_taken else "Email already exists"
+    }
+
 @app.post("/api/auth/register", response_model=LoginResponse)
 async def register(register_data: RegisterRequest):
     """
@@ -1083,34 +1293,31 @@ async def register(register_data: RegisterRequest):
     """
     try:
         # Get the users collection
-        users_collection = get_collection(Collections.USERS)
-        
-        # Check if username already exists
-        if users_collection.find_one({"username": register_data.username}):
-            return {
-                "success": False,
-                "message": "Username already exists"
-            }
+        users_collection = get_async_collection(Collections.USERS)
         
-        # Check if email already exists
-        if users_collection.find_one({"email": register_data.email}):
-            return {
-                "success": False,
-                "message": "Email already exists"
-            }
+        # Check if the username or email already exists in one round-trip
+        existing_user = await users_collection.find_one(
+            {"$or": [{"username": register_data.username}, {"email": register_data.email}]},
+            {"username": 1, "email": 1}
+        )
+        if existing_user:
+            return registration_conflict(existing_user.get("username") == register_data.username)
         
         # Create new user document
         new_user = {
             "username": register_data.username,
             "email": register_data.email,
-            "password": register_data.password,  # In production, hash the password
+            "password": await asyncio.to_thread(hash_password, register_data.password),
             "firstName": register_data.firstName,
             "lastName": register_data.lastName,
             "createdAt": datetime.now()
         }
         
-        # Insert the new user
-        result = users_collection.insert_one(new_user)
+        # Insert the new user; the unique indexes catch a concurrent registration
+        try:
+            result = await users_collection.insert_one(new_user)
+        except DuplicateKeyError as e:
+            return registration_conflict("username" in (e.details or {}).get("keyPattern", {}))
         
         return {
             "success": True,
@@ -1139,41 +1346,47 @@ async def create_transaction(transaction: TransactionRequest):
     Returns:
         Created transaction information
     """
-    try:
-        # Get the transactions collection
-        transactions_collection = get_collection(Collections.TRANSACTIONS)
-        
-        # Create transaction document
-        transaction_data = transaction.model_dump()
-        
-        # Ensure we have a date (default to now if not provided)
-        if transaction_data.get("date") is None:
-            transaction_data["date"] = datetime.now()
-        
-        # Insert the transaction
-        result = transactions_collection.insert_one(transaction_data)
-        
-        # Update associated budget if the category has a budget
-        await update_budget_for_transaction(transaction_data)
+    # Get the transactions collection
+    transactions_collection = get_async_collection(Collections.TRANSACTIONS)
+    
+    # Create transaction document
+    transaction_data = transaction.model_dump()
+    
+    # Ensure we have a date (default to now if not provided)
+    if transaction_data.get("date") is None:
+        transaction_data["date"] = datetime.now()
+    
+    # Store a normalised copy of the category so lookups can match it exactly
+    transaction_data["categoryLower"] = transaction_data["category"].strip().lower()
+    
+    # Insert the transaction
+    result = await transactions_collection.insert_one(transaction_data)
+    
+    # Drop the cached finance data so the AI endpoints see the new transaction
+    invalidate_finance_caches(transaction_data["user_id"])
+    
+    # Update associated budget if the category has a budget
+    await update_budget_for_transaction(transaction_data)
+    
+    # Add the transaction to the user's rolled-up monthly totals
+    await update_monthly_totals_for_transaction(transaction_data)
+    
+    # Create a copy of the transaction data for response
+    response_data = transaction_data.copy()
+    # Add the ID of the inserted document
+    response_data["id"] = str(result.inserted_id)
+    # Convert date to ISO format string for JSON response
+    if isinstance(response_data["date"], datetime):
+        response_data["date"] = response_data["date"].isoformat()
         
-        # Create a copy of the transaction data for response
-        response_data = transaction_data.copy()
-        # Add the ID of the inserted document
-        response_data["id"] = str(result.inserted_id)
-        # Convert date to ISO format string for JSON response
-        if isinstance(response_data["date"], datetime):
-            response_data["date"] = response_data["date"].isoformat()
-            
-        return response_data
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to create transaction: {str(e)}")
+    return response_data
 
 async def update_budget_for_transaction(transaction):
     """
     Update the budget for a transaction's category.
     
     This helper function updates the appropriate budget when a transaction is created.
-    It finds the budget for the transaction's category and updates the current amount.
+    It increments the spent total of the budget for the transaction's category.
     
     Args:
         transaction: Transaction data
@@ -1182,72 +1395,261 @@ async def update_budget_for_transaction(transaction):
         None
     """
     try:
-        # Find budget with matching user ID and category
-        budgets_collection = get_collection(Collections.CATEGORY_BREAKDOWN)
-        budget = budgets_collection.find_one({
-            "user_id": transaction["user_id"],
-            "category": transaction["category"]
-        })
-        
-        # If no budget exists for this category, there's nothing to update
-        if not budget:
-            return
-        
-        # Now we actually update the budget to maintain a running total
-        # We'll add a field called 'spent' to track accumulated spending
-        
-        # Initialize spent field if it doesn't exist
-        spent = budget.get('spent', 0)
-        
         # Add the absolute amount of the transaction to the spent total
         # We use absolute value because transactions could be negative for expenses
         # Budget tracking needs positive values regardless of transaction type
         amount = abs(transaction["amount"])
-        updated_spent = spent + amount
         
-        # Update the budget with the new spent amount
-        budgets_collection.update_one(
-            {"_id": budget["_id"]},
-            {"$set": {"spent": updated_spent}}
+        # Increment the running total atomically in a single round-trip; $inc creates the
+        # 'spent' field if it doesn't exist, and nothing happens if no budget matches
+        budgets_collection = get_async_collection(Collections.CATEGORY_BREAKDOWN)
+        await budgets_collection.update_one(
+            {"user_id": transaction["user_id"], "category": transaction["category"]},
+            {"$inc": {"spent": amount}}
         )
         
     except Exception as e:
         # Log the error but don't fail the transaction creation
         print(f"Error updating budget for transaction: {str(e)}")
 
+async def update_monthly_totals_for_transaction(transaction):
+    """
+    Add a transaction to the user's monthly spending totals.
+    
+    The monthly totals collection keeps one document per user, month and category
+    with two running sums, so month-aligned analysis can read a few pre-summed
+    totals instead of re-aggregating the month's transactions:
+    - expense_total: absolute amounts of expenses (typed as expense, or categorised)
+    - spent: absolute amounts of negative transactions
+    
+    Each document also lists the transactions it counts (entries), and the update
+    only applies if this transaction isn't listed yet. That makes it idempotent:
+    a retry, or a rebuild by refresh_monthly_category_totals that already counted
+    the transaction, doesn't count it twice.
+    
+    Args:
+        transaction: Transaction data (must include its _id and a date)
+        
+    Returns:
+        None
+    """
+    try:
+        amount = transaction["amount"]
+        category = transaction["category"]
+        date = transaction["date"]
+        
+        # Same expense rule as the spending analysis
+        is_expense = is_expense_transaction(transaction.get("type"), category)
+        entry = {
+            "id": transaction["_id"],
+            "expense_total": abs(amount) if is_expense else 0,
+            "spent": abs(amount) if amount < 0 else 0
+        }
+        
+        totals_collection = get_async_collection(Collections.MONTHLY_CATEGORY_TOTALS)
+        try:
+            await totals_collection.update_one(
+                {"user_id": transaction["user_id"], "year": date.year, "month": date.month,
+                 "category": category, "entries.id": {"$ne": entry["id"]}},
+                {"$push": {"entries": entry},
+                 "$inc": {"expense_total": entry["expense_total"], "spent": entry["spent"]}},
+                upsert=True
+            )
+        except DuplicateKeyError:
+            # The month's document already counts this transaction, so the upsert
+            # tried to insert a second one; nothing to do
+            pass
+    except Exception as e:
+        # Log the error but don't fail the transaction creation
+        print(f"Error updating monthly totals for transaction: {str(e)}")
+
+# How long a worker may take to rebuild a month before another worker may take over
+MONTH_REFRESH_LEASE = timedelta(minutes=5)
+
+# Months this process has seen marked as rebuilt in the database. A rebuilt month
+# stays rebuilt, so this only saves the lookup; the database record is what counts.
+refreshed_months = set()
+
+async def refresh_monthly_category_totals(year, month):
+    """
+    Rebuild every user's monthly totals for one month from their transactions.
+    
+    The month's transactions are grouped by user and category and written into
+    the monthly totals collection with $merge. This backfills transactions recorded
+    before the totals existed (or by other writers), after which
+    update_monthly_totals_for_transaction keeps them current.
+    
+    An existing document keeps the entries it has that the rebuild didn't see
+    (transactions added while it ran), and its totals are recomputed from the
+    combined entries, so a concurrent update is never overwritten.
+    
+    Args:
+        year: Calendar year
+        month: Calendar month (1-12)
+        
+    Returns:
+        None
+    """
+    month_start = datetime(year, month, 1)
+    next_month_start = datetime(year + month // 12, month % 12 + 1, 1)
+    
+    transactions_collection = get_async_collection(Collections.TRANSACTIONS)
+    pipeline = [
+        # $merge needs every key field set, so skip transactions without a string
+        # user_id and category (such as those stored with userId by the /db routes)
+        {"$match": {
+            "date": {"$gte": month_start, "$lt": next_month_start},
+            "user_id": {"$type": "string"},
+            "category": {"$type": "string"}
+        }},
+        {"$project": {
+            "user_id": 1,
+            "category": 1,
+            # Same expense rule as the spending analysis: typed as an expense, or categorised
+            "expense_total": {"$cond": [
+                {"$or": [
+                    {"$eq": [{"$toLower": {"$ifNull": ["$type", ""]}}, "expense"]},
+                    {"$ne": [{"$trim": {"input": {"$ifNull": ["$category", ""]}}}, ""]}
+                ]},
+                {"$abs": "$amount"},
+                0
+            ]},
+            # Negative amounts are what the insights count as spending
+            "spent": {"$cond": [{"$lt": ["$amount", 0]}, {"$abs": "$amount"}, 0]}
+        }},
+        {"$group": {
+            "_id": {"user_id": "$user_id", "category": "$category"},
+            "entries": {"$push": {"id": "$_id", "expense_total": "$expense_total", "spent": "$spent"}},
+            "expense_total": {"$sum": "$expense_total"},
+            "spent": {"$sum": "$spent"}
+        }},
+        {"$project": {
+            "_id": 0,
+            "user_id": "$_id.user_id",
+            "year": {"$literal": year},
+            "month": {"$literal": month},
+            "category": "$_id.category",
+            "entries": 1,
+            "expense_total": 1,
+            "spent": 1
+        }},
+        {"$merge": {
+            "into": Collections.MONTHLY_CATEGORY_TOTALS,
+            "on": ["user_id", "year", "month", "category"],
+            # Combine the rebuilt entries with any the document has that the rebuild
+            # didn't see, then recompute the totals from them
+            "whenMatched": [
+                {"$set": {"entries": {"$concatArrays": [
+                    "$$new.entries",
+                    {"$filter": {
+                        "input": {"$ifNull": ["$entries", []]},
+                        "as": "entry",
+                        "cond": {"$not": [{"$in": ["$$entry.id", "$$new.entries.id"]}]}
+                    }}
+                ]}}},
+                {"$set": {"expense_total": {"$sum": "$entries.expense_total"}, "spent": {"$sum": "$entries.spent"}}}
+            ],
+            "whenNotMatched": "insert"
+        }}
+    ]
+    await transactions_collection.aggregate(pipeline).to_list(length=None)
+
+async def ensure_month_refreshed(year, month):
+    """
+    Rebuild a month's totals once, across every API process.
+    
+    A process claims the month by upserting its record in the monthly totals
+    refreshes collection. The upsert only matches a record whose rebuild never
+    finished and whose lease has expired, so while another process holds the
+    claim (or once the month is rebuilt) it fails with a duplicate key instead.
+    
+    Args:
+        year: Calendar year
+        month: Calendar month (1-12)
+        
+    Returns:
+        None
+    """
+    key = f"{year:04d}-{month:02d}"
+    refreshes_collection = get_async_collection(Collections.MONTHLY_TOTALS_REFRESHES)
+    now = datetime.now()
+    try:
+        await refreshes_collection.update_one(
+            {"_id": key, "refreshedAt": {"$exists": False}, "startedAt": {"$lt": now - MONTH_REFRESH_LEASE}},
+            {"$set": {"startedAt": now}},
+            upsert=True
+        )
+    except DuplicateKeyError:
+        # Already rebuilt, or another process is rebuilding it now
+        record = await refreshes_collection.find_one({"_id": key}, {"refreshedAt": 1})
+        if record and record.get("refreshedAt"):
+            refreshed_months.add((year, month))
+        return
+    
+    try:
+        await refresh_monthly_category_totals(year, month)
+    except Exception:
+        # Release the claim so the next read retries the rebuild
+        await refreshes_collection.delete_one({"_id": key, "refreshedAt": {"$exists": False}})
+        raise
+    await refreshes_collection.update_one({"_id": key}, {"$set": {"refreshedAt": datetime.now()}})
+    refreshed_months.add((year, month))
+
+async def get_monthly_category_totals(user_id, year, month):
+    """
+    Get a user's rolled-up spending totals for one month.
+    
+    Args:
+        user_id: ID of the user
+        year: Calendar year
+        month: Calendar month (1-12)
+        
+    Returns:
+        List of documents with category, expense_total and spent fields
+    """
+    # Rebuild the month from the transactions the first time it is read
+    if (year, month) not in refreshed_months:
+        await ensure_month_refreshed(year, month)
+    
+    totals_collection = get_async_collection(Collections.MONTHLY_CATEGORY_TOTALS)
+    return await totals_collection.find(
+        {"user_id": user_id, "year": year, "month": month},
+        {"_id": 0, "category": 1, "expense_total": 1, "spent": 1}
+    ).to_list(length=None)
+
 @app.get("/api/transactions/user/{user_id}", response_model=List[TransactionResponse])
 async def get_user_transactions(user_id: str):
     """
     Get all transactions for a specific user.
+    The list is streamed as a JSON array while the cursor is read, so large
+    histories are never held in memory all at once.
     
     Args:
         user_id: ID of the user
         
     Returns:
-        List of transactions
+        Streaming JSON array of transactions
     """
-    try:
-        # Get the transactions collection
-        transactions_collection = get_collection(Collections.TRANSACTIONS)
-        
-        # Find transactions for the user
-        transactions = list(transactions_collection.find({"user_id": user_id}))
-        
-        # Format the response
-        response_data = []
-        for transaction in transactions:
-            # Convert MongoDB _id to string
+    # Get the transactions collection
+    transactions_collection = get_async_collection(Collections.TRANSACTIONS)
+    
+    # Find transactions for the user, fetching only the fields in the response
+    cursor = transactions_collection.find(
+        {"user_id": user_id}, {"user_id": 1, "amount": 1, "category": 1, "description": 1, "date": 1}
+    )
+    
+    async def stream_transactions():
+        # Emit the JSON array one transaction at a time as documents arrive from the cursor
+        yield b"["
+        separator = b""
+        async for transaction in cursor:
+            # Convert MongoDB _id to string; orjson writes datetimes in ISO format itself
             transaction["id"] = str(transaction.pop("_id"))
-            
-            # Ensure date is in ISO format
-            if isinstance(transaction["date"], datetime):
-                transaction["date"] = transaction["date"].isoformat()
-                
-            response_data.append(transaction)
-        
-        return response_data
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to get transactions: {str(e)}")
+            yield separator + orjson.dumps(transaction)
+            separator = b","
+        yield b"]"
+    
+    return StreamingResponse(stream_transactions(), media_type="application/json")
 
 @app.post("/api/budgets", response_model=BudgetResponse)
 async def create_budget(budget: BudgetRequest):
@@ -1260,49 +1662,49 @@ async def create_budget(budget: BudgetRequest):
     Returns:
         Created budget information
     """
-    try:
-        # Get the budgets collection (using CATEGORY_BREAKDOWN as the collection)
-        budgets_collection = get_collection(Collections.CATEGORY_BREAKDOWN)
+    # Get the budgets collection (using CATEGORY_BREAKDOWN as the collection)
+    budgets_collection = get_async_collection(Collections.CATEGORY_BREAKDOWN)
+    
+    # Check if budget already exists for this category and user
+    existing_budget = await budgets_collection.find_one({
+        "user_id": budget.user_id,
+        "category": budget.category,
+        "period": budget.period
+    }, {"created_at": 1})
+    
+    if existing_budget:
+        # Update existing budget
+        await budgets_collection.update_one(
+            {"_id": existing_budget["_id"]},
+            {"$set": {"amount": budget.amount}}
+        )
         
-        # Check if budget already exists for this category and user
-        existing_budget = budgets_collection.find_one({
+        # Format the response
+        response_data = {
+            "id": str(existing_budget["_id"]),
             "user_id": budget.user_id,
             "category": budget.category,
-            "period": budget.period
-        })
+            "amount": budget.amount,
+            "period": budget.period,
+            "created_at": existing_budget.get("created_at", datetime.now()).isoformat()
+        }
+    else:
+        # Create new budget document
+        budget_data = budget.model_dump()
+        budget_data["created_at"] = datetime.now()
         
-        if existing_budget:
-            # Update existing budget
-            budgets_collection.update_one(
-                {"_id": existing_budget["_id"]},
-                {"$set": {"amount": budget.amount}}
-            )
-            
-            # Format the response
-            response_data = {
-                "id": str(existing_budget["_id"]),
-                "user_id": budget.user_id,
-                "category": budget.category,
-                "amount": budget.amount,
-                "period": budget.period,
-                "created_at": existing_budget.get("created_at", datetime.now()).isoformat()
-            }
-        else:
-            # Create new budget document
-            budget_data = budget.model_dump()
-            budget_data["created_at"] = datetime.now()
-            
-            # Insert the budget
-            result = budgets_collection.insert_one(budget_data)
-            
-            # Format the response
-            response_data = budget_data.copy()
-            response_data["id"] = str(result.inserted_id)
-            response_data["created_at"] = response_data["created_at"].isoformat()
+        # Insert the budget
+        result = await budgets_collection.insert_one(budget_data)
         
-        return response_data
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to create budget: {str(e)}")
+        # Format the response
+        response_data = budget_data.copy()
+        response_data["id"] = str(result.inserted_id)
+        response_data["created_at"] = response_data["created_at"].isoformat()
+    
+    # Cached insights compare spending against the old budgets
+    invalidate_finance_caches(budget.user_id)
+    
+    return response_data
 
 @app.get("/api/budgets/user/{user_id}", response_model=List[BudgetResponse])
 async def get_user_budgets(user_id: str):
@@ -1315,28 +1717,28 @@ async def get_user_budgets(user_id: str):
     Returns:
         List of budgets
     """
-    try:
-        # Get the budgets collection
-        budgets_collection = get_collection(Collections.CATEGORY_BREAKDOWN)
-        
-        # Find budgets for the user
-        budgets = list(budgets_collection.find({"user_id": user_id}))
-        
-        # Format the response
-        response_data = []
-        for budget in budgets:
-            # Add spent field if it doesn't exist
-            if 'spent' not in budget:
-                budget['spent'] = 0
-                
-            budget["id"] = str(budget.pop("_id"))
-            if isinstance(budget.get("created_at"), datetime):
-                budget["created_at"] = budget["created_at"].isoformat()
-            response_data.append(budget)
-        
-        return response_data
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to get budgets: {str(e)}")
+    # Get the budgets collection
+    budgets_collection = get_async_collection(Collections.CATEGORY_BREAKDOWN)
+    
+    # Find budgets for the user
+    budgets = await budgets_collection.find(
+        {"user_id": user_id},
+        {"user_id": 1, "category": 1, "amount": 1, "period": 1, "spent": 1, "created_at": 1}
+    ).to_list(length=None)
+    
+    # Format the response
+    response_data = []
+    for budget in budgets:
+        # Add spent field if it doesn't exist
+        if 'spent' not in budget:
+            budget['spent'] = 0
+            
+        budget["id"] = str(budget.pop("_id"))
+        if isinstance(budget.get("created_at"), datetime):
+            budget["created_at"] = budget["created_at"].isoformat()
+        response_data.append(budget)
+    
+    return response_data
 
 @app.put("/api/budgets/{budget_id}", response_model=BudgetResponse)
 async def update_budget(budget_id: str, budget: BudgetRequest):
@@ -1350,45 +1752,41 @@ async def update_budget(budget_id: str, budget: BudgetRequest):
     Returns:
         Updated budget information
     """
-    try:
-        # Get the budgets collection
-        budgets_collection = get_collection(Collections.CATEGORY_BREAKDOWN)
-        
-        # Check if budget exists
-        existing_budget = budgets_collection.find_one({"_id": ObjectId(budget_id)})
-        if not existing_budget:
-            raise HTTPException(status_code=404, detail="Budget not found")
-        
-        # Update budget document
-        budget_data = budget.model_dump()
-        
-        # Update the budget
-        budgets_collection.update_one(
-            {"_id": ObjectId(budget_id)},
-            {"$set": {
-                "category": budget_data["category"],
-                "amount": budget_data["amount"],
-                "period": budget_data["period"],
-                "updated_at": datetime.now()
-            }}
-        )
-        
-        # Get the updated budget
-        updated_budget = budgets_collection.find_one({"_id": ObjectId(budget_id)})
-        
-        # Format the response
-        response_data = {
-            "id": str(updated_budget["_id"]),
-            "user_id": updated_budget["user_id"],
-            "category": updated_budget["category"],
-            "amount": updated_budget["amount"],
-            "period": updated_budget["period"],
-            "created_at": updated_budget.get("created_at", datetime.now()).isoformat()
-        }
-        
-        return response_data
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to update budget: {str(e)}")
+    # Validate the ID once up front so a malformed one is a 400, not a 500
+    budget_oid = parse_object_id(budget_id, "budget")
+    
+    # Get the budgets collection
+    budgets_collection = get_async_collection(Collections.CATEGORY_BREAKDOWN)
+    
+    # Update budget document
+    budget_data = budget.model_dump()
+    
+    # Update the budget and get the updated document back in one round-trip
+    updated_budget = await budgets_collection.find_one_and_update(
+        {"_id": budget_oid},
+        {"$set": {
+            "category": budget_data["category"],
+            "amount": budget_data["amount"],
+            "period": budget_data["period"],
+            "updated_at": datetime.now()
+        }},
+        return_document=ReturnDocument.AFTER
+    )
+    if not updated_budget:
+        raise HTTPException(status_code=404, detail="Budget not found")
+    invalidate_finance_caches(updated_budget["user_id"])
+    
+    # Format the response
+    response_data = {
+        "id": str(updated_budget["_id"]),
+        "user_id": updated_budget["user_id"],
+        "category": updated_budget["category"],
+        "amount": updated_budget["amount"],
+        "period": updated_budget["period"],
+        "created_at": updated_budget.get("created_at", datetime.now()).isoformat()
+    }
+    
+    return response_data
 
 @app.delete("/api/budgets/{budget_id}")
 async def delete_budget(budget_id: str):
@@ -1401,21 +1799,48 @@ async def delete_budget(budget_id: str):
     Returns:
         Success message
     """
-    try:
-        # Get the budgets collection
-        budgets_collection = get_collection(Collections.CATEGORY_BREAKDOWN)
-        
-        # Check if budget exists
-        existing_budget = budgets_collection.find_one({"_id": ObjectId(budget_id)})
-        if not existing_budget:
-            raise HTTPException(status_code=404, detail="Budget not found")
-        
-        # Delete the budget
-        budgets_collection.delete_one({"_id": ObjectId(budget_id)})
+    # Validate the ID once up front so a malformed one is a 400, not a 500
+    budget_oid = parse_object_id(budget_id, "budget")
+    
+    # Get the budgets collection
+    budgets_collection = get_async_collection(Collections.CATEGORY_BREAKDOWN)
+    
+    # Delete the budget, checking that it existed in the same round-trip
+    deleted_budget = await budgets_collection.find_one_and_delete({"_id": budget_oid}, {"user_id": 1})
+    if not deleted_budget:
+        raise HTTPException(status_code=404, detail="Budget not found")
+    invalidate_finance_caches(deleted_budget.get("user_id"))
+    
+    return {"success": True, "message": "Budget deleted successfully"}
+
+# Start of each analysis period, given the current time. Anything else is monthly.
+PERIOD_STARTS = {
+    "daily": lambda now: datetime(now.year, now.month, now.day),
+    # Start from the beginning of the week (Monday)
+    "weekly": lambda now: datetime(now.year, now.month, now.day) - timedelta(days=now.weekday()),
+    "monthly": lambda now: datetime(now.year, now.month, 1),
+    "yearly": lambda now: datetime(now.year, 1, 1),
+}
+
+def get_period_bounds(period: str, now: datetime, start_date: Optional[str] = None,
+                      end_date: Optional[str] = None) -> Tuple[datetime, datetime]:
+    """
+    Get the date range covered by an analysis period.
+    
+    An explicit start and end date take priority over the period.
+    
+    Args:
+        period: Analysis period (daily, weekly, monthly, yearly)
+        now: The current time, read once per request
+        start_date: Start date for custom period (ISO format)
+        end_date: End date for custom period (ISO format)
         
-        return {"success": True, "message": "Budget deleted successfully"}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to delete budget: {str(e)}")
+    Returns:
+        Tuple of (start, end) datetimes
+    """
+    if start_date and end_date:
+        return datetime.fromisoformat(start_date), datetime.fromisoformat(end_date)
+    return PERIOD_STARTS.get(period, PERIOD_STARTS["monthly"])(now), now
 
 # Financial analysis endpoints
 @app.get("/api/analysis/spending/{user_id}", response_model=SpendingAnalysisResponse)
@@ -1437,81 +1862,65 @@ async def get_spending_analysis(
     Returns:
         Spending analysis data
     """
-    try:
-        # Get the transactions collection
-        transactions_collection = get_collection(Collections.TRANSACTIONS)
-        
-        # Set date range based on period
-        now = datetime.now()
-        if start_date and end_date:
-            start = datetime.fromisoformat(start_date)
-            end = datetime.fromisoformat(end_date)
-        elif period == "daily":
-            start = datetime(now.year, now.month, now.day, 0, 0, 0)
-            end = now
-        elif period == "weekly":
-            # Start from the beginning of the week (Monday)
-            days_since_monday = now.weekday()
-            start = datetime(now.year, now.month, now.day, 0, 0, 0) - timedelta(days=days_since_monday)
-            end = now
-        elif period == "yearly":
-            start = datetime(now.year, 1, 1, 0, 0, 0)
-            end = now
-        else:  # Default to monthly
-            start = datetime(now.year, now.month, 1, 0, 0, 0)
-            end = now
-        
-        # Query transactions within the date range
-        query = {
-            "user_id": user_id,
-            "date": {"$gte": start, "$lte": end}
+    cache_key = ("spending_analysis", period, start_date, end_date)
+    cached = get_user_cache_entry(analytics_cache, user_id, cache_key)
+    if cached is not None:
+        return cached
+    
+    # Get the transactions collection
+    transactions_collection = get_async_collection(Collections.TRANSACTIONS)
+    
+    # Set date range based on period
+    now = datetime.now()
+    start, end = get_period_bounds(period, now, start_date, end_date)
+    
+    if not (start_date and end_date) and period not in ("daily", "weekly", "yearly"):
+        # The current month is already rolled up per category
+        monthly_totals = await get_monthly_category_totals(user_id, now.year, now.month)
+        category_breakdown = {
+            total["category"]: total["expense_total"]
+            for total in monthly_totals
+            if total.get("expense_total")
         }
-        
-        transactions = list(transactions_collection.find(query))
+        total_spending = sum(category_breakdown.values())
+    else:
+        # Otherwise total the expenses within the date range by category inside MongoDB.
+        # A transaction is an expense if it is typed as one or has a (non-blank) category.
+        pipeline = [
+            {"$match": {
+                "user_id": user_id,
+                "date": {"$gte": start, "$lte": end},
+                "$or": [
+                    {"type": {"$regex": "^expense$", "$options": "i"}},
+                    {"category": {"$regex": "\\S"}}
+                ]
+            }},
+            # Convert to positive for easier understanding
+            {"$group": {"_id": "$category", "total": {"$sum": {"$abs": "$amount"}}}},
+            {"$group": {
+                "_id": None,
+                "by_category": {"$push": {"k": "$_id", "v": "$total"}},
+                "total": {"$sum": "$total"}
+            }}
+        ]
+        results = await transactions_collection.aggregate(pipeline).to_list(length=1)
+        result = results[0] if results else None
         
         # Calculate total spending and category breakdown
-        total_spending = 0
-        category_breakdown = {}
-        
-        for transaction in transactions:
-            amount = transaction["amount"]
-            category = transaction["category"]
-            
-            # Determine if this is an expense based on amount, type, and category
-            is_expense = False
-            
-            # Check if we have a transaction type field
-            if "type" in transaction:
-                is_expense = transaction["type"].lower() == "expense"
-            # If no type field or type is not "expense", use category and amount
-            if not is_expense:
-                # Consider all categorized transactions as expenses
-                # Changed: Any transaction with a category is considered an expense, not just negative amounts
-                is_expense = category and category.strip() != ""
-            
-            # For expenses, add to the category breakdown
-            if is_expense:
-                # Convert to positive for easier understanding
-                amount = abs(amount)
-                total_spending += amount
-                
-                if category in category_breakdown:
-                    category_breakdown[category] += amount
-                else:
-                    category_breakdown[category] = amount
-        
-        # Format the response
-        response_data = {
-            "total_spending": total_spending,
-            "category_breakdown": category_breakdown,
-            "period": period,
-            "start_date": start.isoformat(),
-            "end_date": end.isoformat()
-        }
-        
-        return response_data
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to get spending analysis: {str(e)}")
+        total_spending = result["total"] if result else 0
+        category_breakdown = {d["k"]: d["v"] for d in result["by_category"]} if result else {}
+    
+    # Format the response
+    response_data = {
+        "total_spending": total_spending,
+        "category_breakdown": category_breakdown,
+        "period": period,
+        "start_date": start.isoformat(),
+        "end_date": end.isoformat()
+    }
+    
+    set_user_cache_entry(analytics_cache, user_id, cache_key, response_data)
+    return response_data
 
 @app.get("/api/analysis/insights/{user_id}", response_model=SpendingInsightResponse)
 async def get_spending_insights(user_id: str):
@@ -1524,81 +1933,80 @@ async def get_spending_insights(user_id: str):
     Returns:
         Spending insights and recommendations
     """
-    try:
-        # Get the transactions and budgets collections
-        transactions_collection = get_collection(Collections.TRANSACTIONS)
-        budgets_collection = get_collection(Collections.CATEGORY_BREAKDOWN)
-        
-        # Get user's transactions for the current month
-        now = datetime.now()
-        start_of_month = datetime(now.year, now.month, 1, 0, 0, 0)
-        
-        transactions = list(transactions_collection.find({
-            "user_id": user_id,
-            "date": {"$gte": start_of_month}
-        }))
-        
-        # Get user's budgets
-        budgets = list(budgets_collection.find({"user_id": user_id}))
-        
-        # Calculate spending by category
-        spending_by_category = {}
-        for transaction in transactions:
-            amount = transaction["amount"]
-            category = transaction["category"]
+    cache_key = ("spending_insights",)
+    cached = get_user_cache_entry(analytics_cache, user_id, cache_key)
+    if cached is not None:
+        return cached
+    
+    # Get the transactions and budgets collections
+    transactions_collection = get_async_collection(Collections.TRANSACTIONS)
+    budgets_collection = get_async_collection(Collections.CATEGORY_BREAKDOWN)
+    
+    # Start of the current month
+    start_of_month, _ = get_period_bounds("monthly", datetime.now())
+    
+    # Read this month's rolled-up spending (negative amounts) by category,
+    # fetching the user's budgets concurrently
+    monthly_totals, budgets = await asyncio.gather(
+        get_monthly_category_totals(user_id, start_of_month.year, start_of_month.month),
+        budgets_collection.find({"user_id": user_id}, {"category": 1, "amount": 1}).to_list(length=None)
+    )
+    
+    # Calculate spending by category
+    spending_by_category = {
+        total["category"]: total["spent"]
+        for total in sorted(monthly_totals, key=lambda total: total["category"])
+        if total.get("spent")
+    }
+    
+    # Compare with budgets and generate insights
+    insights = []
+    recommendations = []
+    
+    # Create a dictionary of budgets by category
+    budget_by_category = {budget["category"]: budget["amount"] for budget in budgets}
+    
+    spending_categories = spending_by_category.keys()
+    budget_categories = budget_by_category.keys()
+    
+    # Check each spending category, in the same order as the spending totals.
+    # Every category takes one branch or the other, so there's no set to split off.
+    for category, spent in spending_by_category.items():
+        if category in budget_categories:
+            # Check for categories where spending exceeds budget
+            budget = budget_by_category[category]
+            percentage = (spent / budget) * 100
             
-            # Only count expenses (negative amounts)
-            if amount < 0:
-                amount = abs(amount)
-                if category in spending_by_category:
-                    spending_by_category[category] += amount
-                else:
-                    spending_by_category[category] = amount
-        
-        # Compare with budgets and generate insights
-        insights = []
-        recommendations = []
-        
-        # Create a dictionary of budgets by category
-        budget_by_category = {budget["category"]: budget["amount"] for budget in budgets}
-        
-        # Check for categories where spending exceeds budget
-        for category, spent in spending_by_category.items():
-            if category in budget_by_category:
-                budget = budget_by_category[category]
-                percentage = (spent / budget) * 100
+            if percentage > 90:
+                insights.append(f"You've spent {percentage:.1f}% of your {category} budget.")
                 
-                if percentage > 90:
-                    insights.append(f"You've spent {percentage:.1f}% of your {category} budget.")
-                    
-                    if percentage > 100:
-                        recommendations.append(f"You've exceeded your {category} budget by ${spent - budget:.2f}. Consider adjusting your spending or increasing your budget.")
-                    else:
-                        recommendations.append(f"You're close to exceeding your {category} budget. Try to limit your spending in this category.")
-            else:
-                # No budget for this category
-                insights.append(f"You've spent ${spent:.2f} on {category} without a budget.")
-                recommendations.append(f"Consider creating a budget for {category} to track your spending better.")
-        
-        # Check for categories with budgets but no spending
-        for category, budget in budget_by_category.items():
-            if category not in spending_by_category:
-                insights.append(f"You haven't spent anything on {category} yet this month.")
-                recommendations.append(f"You have ${budget:.2f} available to spend on {category}.")
-        
-        # If no insights or recommendations, provide defaults
-        if not insights:
-            insights.append("Not enough data to generate insights.")
-        
-        if not recommendations:
-            recommendations.append("Start by setting up budgets for your main spending categories.")
-        
-        return {
-            "insights": insights,
-            "recommendations": recommendations
-        }
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to get spending insights: {str(e)}")
+                if percentage > 100:
+                    recommendations.append(f"You've exceeded your {category} budget by ${spent - budget:.2f}. Consider adjusting your spending or increasing your budget.")
+                else:
+                    recommendations.append(f"You're close to exceeding your {category} budget. Try to limit your spending in this category.")
+        else:
+            # No budget for this category
+            insights.append(f"You've spent ${spent:.2f} on {category} without a budget.")
+            recommendations.append(f"Consider creating a budget for {category} to track your spending better.")
+    
+    # Check for categories with budgets but no spending, in category order
+    for category in sorted(budget_categories - spending_categories):
+        insights.append(f"You haven't spent anything on {category} yet this month.")
+        recommendations.append(f"You have ${budget_by_category[category]:.2f} available to spend on {category}.")
+    
+    # If no insights or recommendations, provide defaults
+    if not insights:
+        insights.append("Not enough data to generate insights.")
+    
+    if not recommendations:
+        recommendations.append("Start by setting up budgets for your main spending categories.")
+    
+    response_data = {
+        "insights": insights,
+        "recommendations": recommendations
+    }
+    set_user_cache_entry(analytics_cache, user_id, cache_key, response_data)
+    return response_data
 
 class UserProfileUpdateRequest(BaseModel):
     """Model for updating user profile information"""
@@ -1621,6 +2029,61 @@ class PasswordUpdateRequest(BaseModel):
     currentPassword: str
     newPassword: str
 
+# User fields used to build a UserProfileResponse (name is split when first/last names are missing)
+USER_PROFILE_PROJECTION = {"username": 1, "name": 1, "firstName": 1, "lastName": 1, "email": 1, "phone": 1}
+
+def format_user_profile(user: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Convert a user document into the profile response format.
+    
+    Users created through the signup route only have a full name, so it is
+    split into first and last name when those fields are missing.
+    
+    Args:
+        user: User document (projected with USER_PROFILE_PROJECTION)
+        
+    Returns:
+        Dictionary with the profile response fields
+    """
+    first_name = user.get("firstName")
+    last_name = user.get("lastName")
+    if first_name is None or last_name is None:
+        # Split the name into first and last name if available
+        name_first, _, name_last = (user.get("name") or "").partition(" ")
+        first_name = name_first if first_name is None else first_name
+        last_name = name_last if last_name is None else last_name
+    
+    return {
+        "userId": str(user["_id"]),
+        "username": user.get("username", ""),
+        "firstName": first_name,
+        "lastName": last_name,
+        "email": user.get("email", ""),
+        "phone": user.get("phone", "")
+    }
+
+# Reads currently running, keyed by what they read, so identical concurrent requests share one query
+inflight_reads: Dict[Tuple, asyncio.Future] = {}
+
+async def coalesce_read(key: Tuple, read):
+    """
+    Run a read, or wait for an identical read that is already running.
+    
+    Args:
+        key: Identifies the read, e.g. ("profile", user_id)
+        read: Zero-argument coroutine function that performs the read
+        
+    Returns:
+        The read's result (shared between all callers with the same key)
+    """
+    future = inflight_reads.get(key)
+    if future is None:
+        future = asyncio.ensure_future(read())
+        inflight_reads[key] = future
+        future.add_done_callback(lambda _: inflight_reads.pop(key, None))
+    # Shield the shared read so one caller disconnecting doesn't cancel it for the others
+    return await asyncio.shield(future)
+
 @app.get("/api/users/{user_id}/profile", response_model=UserProfileResponse)
 async def get_user_profile(user_id: str):
     """
@@ -1632,32 +2095,23 @@ async def get_user_profile(user_id: str):
     Returns:
         User profile information
     """
-    try:
-        # Get the users collection
-        users_collection = get_collection(Collections.USERS)
-        
-        # Find the user by ID
-        user = users_collection.find_one({"_id": ObjectId(user_id)})
-        
-        if not user:
-            raise HTTPException(status_code=404, detail="User not found")
-        
-        # Split the name into first and last name if available
-        name_parts = user.get("name", "").split(" ", 1)
-        first_name = name_parts[0] if len(name_parts) > 0 else ""
-        last_name = name_parts[1] if len(name_parts) > 1 else ""
-        
-        # Format the response
-        return {
-            "userId": str(user["_id"]),
-            "username": user.get("username", ""),
-            "firstName": user.get("firstName", first_name),
-            "lastName": user.get("lastName", last_name),
-            "email": user.get("email", ""),
-            "phone": user.get("phone", "")
-        }
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to get user profile: {str(e)}")
+    # Validate the ID once up front so a malformed one is a 400, not a 500
+    user_oid = parse_object_id(user_id, "user")
+    
+    # Get the users collection
+    users_collection = get_async_collection(Collections.USERS)
+    
+    # Find the user by ID
+    user = await coalesce_read(
+        ("profile", user_id),
+        lambda: users_collection.find_one({"_id": user_oid}, USER_PROFILE_PROJECTION)
+    )
+    
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+    
+    # Format the response
+    return format_user_profile(user)
 
 @app.put("/api/users/{user_id}/profile", response_model=UserProfileResponse)
 async def update_user_profile(user_id: str, profile_data: UserProfileUpdateRequest):
@@ -1671,40 +2125,31 @@ async def update_user_profile(user_id: str, profile_data: UserProfileUpdateReque
     Returns:
         Updated user profile information
     """
-    try:
-        # Get the users collection
-        users_collection = get_collection(Collections.USERS)
-        
-        # Find the user by ID
-        user = users_collection.find_one({"_id": ObjectId(user_id)})
-        
-        if not user:
-            raise HTTPException(status_code=404, detail="User not found")
-        
-        # Create update document with only non-None fields
-        update_data = {k: v for k, v in profile_data.model_dump().items() if v is not None}
-        
-        if update_data:
-            # Update the user
-            users_collection.update_one(
-                {"_id": ObjectId(user_id)},
-                {"$set": update_data}
-            )
-        
-        # Get the updated user
-        updated_user = users_collection.find_one({"_id": ObjectId(user_id)})
-        
-        # Format the response
-        return {
-            "userId": str(updated_user["_id"]),
-            "username": updated_user.get("username", ""),
-            "firstName": updated_user.get("firstName", ""),
-            "lastName": updated_user.get("lastName", ""),
-            "email": updated_user.get("email", ""),
-            "phone": updated_user.get("phone", "")
-        }
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to update user profile: {str(e)}")
+    # Validate the ID once up front so a malformed one is a 400, not a 500
+    user_oid = parse_object_id(user_id, "user")
+    
+    # Get the users collection
+    users_collection = get_async_collection(Collections.USERS)
+    
+    # Create update document with only non-None fields
+    update_data = profile_data.model_dump(exclude_none=True)
+    
+    if update_data:
+        # Update the user and get the updated document back in one round-trip
+        updated_user = await users_collection.find_one_and_update(
+            {"_id": user_oid},
+            {"$set": update_data},
+            projection=USER_PROFILE_PROJECTION,
+            return_document=ReturnDocument.AFTER
+        )
+    else:
+        updated_user = await users_collection.find_one({"_id": user_oid}, USER_PROFILE_PROJECTION)
+    
+    if not updated_user:
+        raise HTTPException(status_code=404, detail="User not found")
+    
+    # Format the response
+    return format_user_profile(updated_user)
 
 @app.put("/api/users/{user_id}/password")
 async def update_user_password(user_id: str, password_data: PasswordUpdateRequest):
@@ -1718,24 +2163,27 @@ async def update_user_password(user_id: str, password_data: PasswordUpdateReques
     Returns:
         Success message
     """
+    # Validate the ID once up front so a malformed one is a 400, not a 500
+    user_oid = parse_object_id(user_id, "user")
+    
     try:
         # Get the users collection
-        users_collection = get_collection(Collections.USERS)
+        users_collection = get_async_collection(Collections.USERS)
         
-        # Find the user by ID
-        user = users_collection.find_one({"_id": ObjectId(user_id)})
+        # Find the user by ID; only the stored password is needed
+        user = await users_collection.find_one({"_id": user_oid}, {"password": 1})
         
         if not user:
             raise HTTPException(status_code=404, detail="User not found")
         
         # Verify current password
-        if user.get("password") != password_data.currentPassword:
+        if not await asyncio.to_thread(verify_password, password_data.currentPassword, user.get("password")):
             return {"success": False, "message": "Current password is incorrect"}
         
         # Update the password
-        users_collection.update_one(
-            {"_id": ObjectId(user_id)},
-            {"$set": {"password": password_data.newPassword}}
+        await users_collection.update_one(
+            {"_id": user_oid},
+            {"$set": {"password": await asyncio.to_thread(hash_password, password_data.newPassword)}}
         )
         
         return {"success": True, "message": "Password updated successfully"}
@@ -1751,6 +2199,10 @@ class GoalCreate(BaseModel):
     currentAmount: float
     targetDate: datetime
 
+class GoalBulkUpdate(GoalCreate):
+    """Model for one goal in a bulk goal update"""
+    id: str
+
 class GoalResponse(BaseModel):
     """Model for goal response"""
     id: Optional[str] = None
@@ -1760,6 +2212,134 @@ class GoalResponse(BaseModel):
     currentAmount: float
     targetDate: str
 
+# Goal fields used in goal responses
+GOAL_PROJECTION = {"name": 1, "category": 1, "targetAmount": 1, "currentAmount": 1,
+                   "targetDate": 1, "userId": 1}
+
+class GoalReadBatcher:
+    """
+    Combine concurrent goal lookups into a single MongoDB query.
+    
+    Requests for different users that arrive in the same event loop iteration
+    (e.g. a dashboard loading several users at once) are served by one
+    find with $in, instead of one round-trip per user.
+    """
+    
+    def __init__(self):
+        self._pending = {}  # user_id -> futures waiting for that user's goals
+        # Running flush tasks. The event loop only keeps weak references to tasks, so
+        # they are held here until done; a new batch can start while one is still running.
+        self._flush_tasks = set()
+    
+    async def load(self, user_id: str) -> List[Dict[str, Any]]:
+        """
+        Get a user's goals.
+        
+        Args:
+            user_id: ID of the user whose goals to fetch
+            
+        Returns:
+            List of goal documents (projected with GOAL_PROJECTION)
+        """
+        loop = asyncio.get_running_loop()
+        if not self._pending:
+            # First lookup of this batch; the task starts once the current iteration's lookups are queued
+            flush_task = loop.create_task(self._flush())
+            self._flush_tasks.add(flush_task)
+            flush_task.add_done_callback(self._flush_tasks.discard)
+        future = loop.create_future()
+        self._pending.setdefault(user_id, []).append(future)
+        return await future
+    
+    async def _flush(self):
+        """
+        Run the combined query for every queued user and hand each caller their goals.
+        """
+        pending, self._pending = self._pending, {}
+        user_ids = list(pending)
+        try:
+            goals_collection = get_async_collection(Collections.FINANCIAL_GOALS)
+            goals = await goals_collection.find({"userId": {"$in": user_ids}}, GOAL_PROJECTION).to_list(length=None)
+        except Exception as e:
+            for futures in pending.values():
+                for future in futures:
+                    if not future.done():
+                        future.set_exception(e)
+            return
+        
+        goals_by_user = {}
+        for goal in goals:
+            goals_by_user.setdefault(goal["userId"], []).append(goal)
+        
+        for user_id, futures in pending.items():
+            for future in futures:
+                if not future.done():
+                    future.set_result(goals_by_user.get(user_id, []))
+
+goal_reads = GoalReadBatcher()
+
+def format_goal(goal: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Convert a goal document into the goal response format.
+    
+    targetDate is left as a datetime; the response serializer writes it in ISO format.
+    
+    Args:
+        goal: Goal document (with _id)
+        
+    Returns:
+        Dictionary with the goal's response fields
+    """
+    return {
+        "id": str(goal["_id"]),
+        "name": goal.get("name", ""),
+        "category": goal.get("category", ""),
+        "targetAmount": goal.get("targetAmount", 0),
+        "currentAmount": goal.get("currentAmount", 0),
+        "userId": goal.get("userId", ""),
+        "targetDate": goal.get("targetDate", "")
+    }
+
+@lru_cache(maxsize=4096)
+def parse_user_id(user_str: str) -> Optional[str]:
+    """
+    Extract the user ID from a user cookie or authorization header value.
+    
+    The value is the JSON-encoded user, optionally prefixed with "Bearer ".
+    Results are cached since the same value arrives with every request a user makes.
+    
+    Args:
+        user_str: The raw cookie or header value
+        
+    Returns:
+        The user's ID, or None if it can't be parsed
+    """
+    if user_str.startswith("Bearer "):
+        user_str = user_str[7:]  # Remove "Bearer " prefix
+    try:
+        user_data = json.loads(user_str)
+        return user_data.get("id") or user_data.get("user_id")
+    except Exception:
+        return None
+
+def get_request_user_id(request: Request) -> str:
+    """
+    Get the ID of the user making a request.
+    
+    In a real app, this would come from the auth token. For now, we get it from
+    the user stored in session or use a default.
+    
+    Args:
+        request: Request object containing authentication info
+        
+    Returns:
+        The user's ID, or a fallback ID if none was supplied
+    """
+    user_str = request.cookies.get("user") or request.headers.get("authorization")
+    user_id = parse_user_id(user_str) if user_str else None
+    # Fallback to default user ID if not found
+    return user_id or "current_user_id"
+
 # Financial Goal endpoints
 @app.post("/api/goals")
 async def create_goal(goal: GoalCreate, request: Request):
@@ -1773,56 +2353,24 @@ async def create_goal(goal: GoalCreate, request: Request):
     Returns:
         Created goal information
     """
-    try:
-        # Get the goals collection
-        goals_collection = get_collection(Collections.FINANCIAL_GOALS)
-        
-        # Create goal document with current user ID
-        goal_data = goal.model_dump()
-        
-        # Get user ID from authentication
-        # In a real app, this would come from the auth token
-        # For now, we'll get it from the user stored in session or use a default
-        user_id = None
-        user_str = request.cookies.get("user") or request.headers.get("authorization")
-        
-        if user_str:
-            try:
-                if user_str.startswith("Bearer "):
-                    user_str = user_str[7:]  # Remove "Bearer " prefix
-                user_data = json.loads(user_str)
-                user_id = user_data.get("id") or user_data.get("user_id")
-            except:
-                pass
-        
-        # Fallback to default user ID if not found
-        if not user_id:
-            user_id = "current_user_id"  # Fallback ID
-            
-        goal_data["userId"] = user_id
-        
-        # Insert the goal
-        result = goals_collection.insert_one(goal_data)
-        
-        # Format the response - Create a new dict instead of modifying the original
-        response_data = {
-            "id": str(result.inserted_id),
-            "name": goal_data["name"],
-            "category": goal_data["category"],
-            "targetAmount": goal_data["targetAmount"],
-            "currentAmount": goal_data["currentAmount"],
-            "userId": goal_data["userId"]
-        }
+    # Get the goals collection
+    goals_collection = get_async_collection(Collections.FINANCIAL_GOALS)
+    
+    # Create goal document with current user ID
+    goal_data = goal.model_dump()
+    
+    # Get user ID from authentication
+    user_id = get_request_user_id(request)
         
-        # Convert date to ISO format string for JSON response
-        if isinstance(goal_data.get("targetDate"), datetime):
-            response_data["targetDate"] = goal_data["targetDate"].isoformat()
-        else:
-            response_data["targetDate"] = goal_data.get("targetDate")
-            
-        return response_data
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to create goal: {str(e)}")
+    goal_data["userId"] = user_id
+    
+    # Insert the goal. The driver generates a fresh ObjectId, so there's no need
+    # to check for an existing goal first.
+    result = await goals_collection.insert_one(goal_data)
+    goal_list_cache.pop(user_id, None)
+    
+    # Format the response
+    return format_goal({**goal_data, "_id": result.inserted_id})
 
 @app.get("/api/goals")
 async def get_goals(request: Request):
@@ -1835,105 +2383,100 @@ async def get_goals(request: Request):
     Returns:
         List of goals
     """
-    try:
-        # Get the goals collection
-        goals_collection = get_collection(Collections.FINANCIAL_GOALS)
-        
-        # Get user ID from authentication
-        # In a real app, this would come from the auth token
-        # For now, we'll get it from the user stored in session or use a default
-        user_id = None
-        user_str = request.cookies.get("user") or request.headers.get("authorization")
-        
-        if user_str:
-            try:
-                if user_str and user_str.startswith("Bearer "):
-                    user_str = user_str[7:]  # Remove "Bearer " prefix
-                user_data = json.loads(user_str)
-                user_id = user_data.get("id") or user_data.get("user_id")
-            except:
-                pass
-        
-        # Fallback to default user ID if not found
-        if not user_id:
-            user_id = "current_user_id"  # Fallback ID
-        
-        # Find goals for the user
-        goals = list(goals_collection.find({"userId": user_id}))
-        
-        # Format the response
-        response_data = []
-        for goal in goals:
-            # Create a new dict with properly converted values
-            goal_data = {
-                "id": str(goal["_id"]),
-                "name": goal.get("name", ""),
-                "category": goal.get("category", ""),
-                "targetAmount": goal.get("targetAmount", 0),
-                "currentAmount": goal.get("currentAmount", 0),
-                "userId": goal.get("userId", "")
-            }
-            
-            # Ensure date is in ISO format
-            if isinstance(goal.get("targetDate"), datetime):
-                goal_data["targetDate"] = goal["targetDate"].isoformat()
-            else:
-                goal_data["targetDate"] = str(goal.get("targetDate", ""))
-                
-            response_data.append(goal_data)
-        
-        return response_data
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to get goals: {str(e)}")
+    # Get user ID from authentication
+    user_id = get_request_user_id(request)
+    
+    # Find goals for the user
+    goals = await coalesce_read(("goals", user_id), lambda: goal_reads.load(user_id))
+    
+    # Format the response
+    return [format_goal(goal) for goal in goals]
+
+# Serialized goal lists as (etag, body), keyed by user_id. Goals change far less often
+# than they are read; the goal write endpoints drop their owner's entry.
+goal_list_cache = TTLCache(maxsize=10_000, ttl=10)
 
 @app.get("/api/goals/user/{user_id}")
-async def get_user_goals(user_id: str):
+async def get_user_goals(user_id: str, request: Request):
     """
     Get all financial goals for a specific user.
     
+    The response carries an ETag; a request whose If-None-Match matches it
+    gets an empty 304 instead of the list.
+    
     Args:
         user_id: ID of the user
+        request: Request object, checked for If-None-Match
         
     Returns:
-        List of goals
+        List of goals, or a 304 if the client's copy is current
     """
-    try:
-        # Validate user_id
-        if not user_id or user_id.strip() == "":
+    # Validate user_id
+    if not user_id or user_id.strip() == "":
+        return []
+    
+    cached = goal_list_cache.get(user_id)
+    if cached is None:
+        try:
+            # Find goals for the user
+            goals = await coalesce_read(("goals", user_id), lambda: goal_reads.load(user_id))
+        except Exception as e:
+            # Log the error but return empty list instead of raising an exception
+            print(f"Error getting user goals: {str(e)}")
             return []
         
-        # Get the goals collection
-        goals_collection = get_collection(Collections.FINANCIAL_GOALS)
-        
-        # Find goals for the user - try both with userId and user_id fields
-        goals = list(goals_collection.find({"$or": [{"userId": user_id}, {"user_id": user_id}]}))
+        # Serialize once; the same bytes are served until the entry expires
+        body = orjson.dumps([format_goal(goal) for goal in goals])
+        etag = f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+        cached = goal_list_cache[user_id] = (etag, body)
+    
+    etag, body = cached
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+    return Response(content=body, media_type="application/json", headers={"ETag": etag})
+
+def goal_update_fields(goal: GoalCreate) -> Dict[str, Any]:
+    """
+    Build the $set document for updating a goal.
+    
+    Args:
+        goal: Updated goal data
         
-        # Format the response
-        response_data = []
-        for goal in goals:
-            # Create a new dict with properly converted values
-            goal_data = {
-                "id": str(goal["_id"]),
-                "name": goal.get("name", ""),
-                "category": goal.get("category", ""),
-                "targetAmount": goal.get("targetAmount", 0),
-                "currentAmount": goal.get("currentAmount", 0),
-                "userId": goal.get("userId", "") or goal.get("user_id", "")
-            }
-            
-            # Ensure date is in ISO format
-            if isinstance(goal.get("targetDate"), datetime):
-                goal_data["targetDate"] = goal["targetDate"].isoformat()
-            else:
-                goal_data["targetDate"] = str(goal.get("targetDate", ""))
-                
-            response_data.append(goal_data)
+    Returns:
+        Dictionary of the goal fields to set, including the update time
+    """
+    # A bulk update carries the goal's ID alongside its fields; that isn't stored
+    goal_data = goal.model_dump(exclude={"id"})
+    goal_data["updatedAt"] = datetime.now()
+    return goal_data
+
+# Declared before /api/goals/{goal_id} so "bulk" isn't taken as a goal ID
+@app.put("/api/goals/bulk")
+async def update_goals(goals: List[GoalBulkUpdate]):
+    """
+    Update several financial goals in a single round-trip.
+    
+    Args:
+        goals: Updated goal data, each with the ID of the goal to update
         
-        return response_data
-    except Exception as e:
-        # Log the error but return empty list instead of raising an exception
-        print(f"Error getting user goals: {str(e)}")
-        return []
+    Returns:
+        Number of goals matched and modified
+    """
+    # Validate every ID before writing anything
+    updates = [
+        UpdateOne({"_id": parse_object_id(goal.id, "goal")}, {"$set": goal_update_fields(goal)})
+        for goal in goals
+    ]
+    if not updates:
+        return {"matched_count": 0, "modified_count": 0}
+    
+    # Unordered so the server can apply the updates without stopping at the first failure
+    goals_collection = get_async_collection(Collections.FINANCIAL_GOALS)
+    result = await goals_collection.bulk_write(updates, ordered=False)
+    
+    # The owners of the updated goals aren't known here, so drop every cached goal list
+    goal_list_cache.clear()
+    return {"matched_count": result.matched_count, "modified_count": result.modified_count}
 
 @app.put("/api/goals/{goal_id}")
 async def update_goal(goal_id: str, goal: GoalCreate):
@@ -1947,53 +2490,25 @@ async def update_goal(goal_id: str, goal: GoalCreate):
     Returns:
         Updated goal information
     """
-    try:
-        # Get the goals collection
-        goals_collection = get_collection(Collections.FINANCIAL_GOALS)
-        
-        # Check if goal exists
-        existing_goal = goals_collection.find_one({"_id": ObjectId(goal_id)})
-        if not existing_goal:
-            raise HTTPException(status_code=404, detail="Goal not found")
-        
-        # Update goal document
-        goal_data = goal.model_dump()
-        
-        # Update the goal
-        goals_collection.update_one(
-            {"_id": ObjectId(goal_id)},
-            {"$set": {
-                "name": goal_data["name"],
-                "category": goal_data["category"],
-                "targetAmount": goal_data["targetAmount"],
-                "currentAmount": goal_data["currentAmount"],
-                "targetDate": goal_data["targetDate"],
-                "updatedAt": datetime.now()
-            }}
-        )
-        
-        # Get the updated goal
-        updated_goal = goals_collection.find_one({"_id": ObjectId(goal_id)})
-        
-        # Format the response with safe access to keys
-        response_data = {
-            "id": str(updated_goal["_id"]),
-            "name": updated_goal.get("name", ""),
-            "category": updated_goal.get("category", ""),
-            "targetAmount": updated_goal.get("targetAmount", 0),
-            "currentAmount": updated_goal.get("currentAmount", 0),
-            "userId": updated_goal.get("userId", "")
-        }
-        
-        # Handle the date format safely
-        if isinstance(updated_goal.get("targetDate"), datetime):
-            response_data["targetDate"] = updated_goal["targetDate"].isoformat()
-        else:
-            response_data["targetDate"] = str(updated_goal.get("targetDate", ""))
-        
-        return response_data
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to update goal: {str(e)}")
+    # Validate the ID once up front so a malformed one is a 400, not a 500
+    goal_oid = parse_object_id(goal_id, "goal")
+    
+    # Get the goals collection
+    goals_collection = get_async_collection(Collections.FINANCIAL_GOALS)
+    
+    # Update the goal and get the updated document back in one round-trip
+    updated_goal = await goals_collection.find_one_and_update(
+        {"_id": goal_oid},
+        {"$set": goal_update_fields(goal)},
+        projection=GOAL_PROJECTION,
+        return_document=ReturnDocument.AFTER
+    )
+    if not updated_goal:
+        raise HTTPException(status_code=404, detail="Goal not found")
+    goal_list_cache.pop(updated_goal.get("userId"), None)
+    
+    # Format the response
+    return format_goal(updated_goal)
 
 @app.delete("/api/goals/{goal_id}")
 async def delete_goal(goal_id: str):
@@ -2006,23 +2521,21 @@ async def delete_goal(goal_id: str):
     Returns:
         Success message
     """
-    try:
-        # Get the goals collection
-        goals_collection = get_collection(Collections.FINANCIAL_GOALS)
-        
-        # Check if goal exists
-        existing_goal = goals_collection.find_one({"_id": ObjectId(goal_id)})
-        if not existing_goal:
-            raise HTTPException(status_code=404, detail="Goal not found")
-        
-        # Delete the goal
-        goals_collection.delete_one({"_id": ObjectId(goal_id)})
-        
-        return {"success": True, "message": "Goal deleted successfully"}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to delete goal: {str(e)}")
+    # Validate the ID once up front so a malformed one is a 400, not a 500
+    goal_oid = parse_object_id(goal_id, "goal")
+    
+    # Get the goals collection
+    goals_collection = get_async_collection(Collections.FINANCIAL_GOALS)
+    
+    # Delete the goal, getting back its owner so their cached goal list can be dropped
+    deleted_goal = await goals_collection.find_one_and_delete({"_id": goal_oid}, {"userId": 1})
+    if not deleted_goal:
+        raise HTTPException(status_code=404, detail="Goal not found")
+    goal_list_cache.pop(deleted_goal.get("userId"), None)
+    
+    return {"success": True, "message": "Goal deleted successfully"}
 
-def get_category_spending(user_id, category='Food'):
+async def get_category_spending(user_id, category='Food'):
     """
     Get spending data for a specific category from a user's transaction history.
     
@@ -2033,65 +2546,77 @@ def get_category_spending(user_id, category='Food'):
     Returns:
         Dictionary containing:
         - total_spent: Total amount spent in the category
-        - transactions: List of transactions in the category
+        - transactions: Up to CATEGORY_EXAMPLE_LIMIT example transactions in the category
         - percentage: Percentage of total expenses this category represents
         - time_period: Period covered by the data
+        - transaction_count: Number of transactions in the category
     """
     try:
         # Get the transactions collection
-        transactions_collection = get_collection(Collections.TRANSACTIONS)
+        transactions_collection = get_async_collection(Collections.TRANSACTIONS)
         
         # Filter transactions for the user and category
-        # NOTE: Category matching handles case variations (Food, food, FOOD)
-        query = {
-            "user_id": user_id,
+        # NOTE: Category matching handles case variations (Food, food, FOOD) through the
+        # lowercased copy stored at write time; older transactions without one fall back
+        # to a case-insensitive match on the category itself
+        category_lower = category.strip().lower()
+        category_query = {
             "$or": [
-                {"category": {"$regex": f"^{category}$", "$options": "i"}},  # Exact match with case insensitivity
-                {"category": {"$regex": f"{category}", "$options": "i"}}  # Contains category name
+                {"categoryLower": category_lower},
+                {"categoryLower": {"$exists": False}, "category": {"$regex": f"^\\s*{re.escape(category_lower)}\\s*$", "$options": "i"}}
             ]
         }
         
-        category_transactions = list(transactions_collection.find(query))
-        
-        # Calculate total spent in this category
-        total_spent = sum(transaction['amount'] for transaction in category_transactions)
-        
-        # Get all expenses to calculate percentage - handle transactions with or without type field
-        all_expenses_query = {
-            "user_id": user_id,
+        # Expenses are transactions typed as expense, or untyped transactions with a category
+        expenses_query = {
             "$or": [
-                {"type": "expense"},  # Transactions with type=expense
-                {"category": {"$exists": True, "$ne": ""}}  # Transactions with a category (assumed to be expenses)
+                {"type": "expense"},
+                {"type": {"$exists": False}, "category": {"$exists": True, "$ne": ""}}
             ]
         }
-        all_expenses = list(transactions_collection.find(all_expenses_query))
         
-        # Sum all expenses, considering transactions with explicit type or just by category
-        total_expenses = 0
-        for transaction in all_expenses:
-            # If the transaction has a type field and it's not 'expense', skip it
-            if 'type' in transaction and transaction['type'] != 'expense':
-                continue
-            # Add the transaction amount to total expenses
-            total_expenses += transaction['amount']
+        # Total the category and all expenses inside MongoDB in one aggregate call,
+        # fetching only the few example transactions the answer shows
+        pipeline = [
+            {"$match": {"user_id": user_id}},
+            {"$facet": {
+                "category": [
+                    {"$match": category_query},
+                    {"$group": {
+                        "_id": None,
+                        "total": {"$sum": "$amount"},
+                        "oldest": {"$min": "$date"},
+                        "newest": {"$max": "$date"},
+                        "count": {"$sum": 1}
+                    }}
+                ],
+                "examples": [
+                    {"$match": category_query},
+                    {"$limit": CATEGORY_EXAMPLE_LIMIT},
+                    {"$project": {"_id": 0, "amount": 1, "category": 1, "description": 1, "date": 1}}
+                ],
+                "expenses": [
+                    {"$match": expenses_query},
+                    {"$group": {"_id": None, "total": {"$sum": "$amount"}}}
+                ]
+            }}
+        ]
+        results = await transactions_collection.aggregate(pipeline).to_list(length=1)
+        result = results[0] if results else {"category": [], "examples": [], "expenses": []}
+        category_totals = result["category"][0] if result["category"] else {}
+        
+        # Calculate total spent in this category
+        total_spent = category_totals.get("total", 0)
+        total_expenses = result["expenses"][0]["total"] if result["expenses"] else 0
         
         # Calculate percentage of total expenses
         percentage = (total_spent / total_expenses * 100) if total_expenses > 0 else 0
         
         # Determine time period for the data (from oldest to newest transaction)
-        if category_transactions:
-            oldest_transaction = min(category_transactions, key=lambda t: t.get('date', datetime.now()))
-            newest_transaction = max(category_transactions, key=lambda t: t.get('date', datetime.now()))
-            
-            if 'date' in oldest_transaction and 'date' in newest_transaction:
-                oldest_date = oldest_transaction['date']
-                newest_date = newest_transaction['date']
-                if isinstance(oldest_date, datetime) and isinstance(newest_date, datetime):
-                    time_period = f"{oldest_date.strftime('%b %d, %Y')} to {newest_date.strftime('%b %d, %Y')}"
-                else:
-                    time_period = "All time"
-            else:
-                time_period = "All time"
+        oldest_date = category_totals.get("oldest")
+        newest_date = category_totals.get("newest")
+        if isinstance(oldest_date, datetime) and isinstance(newest_date, datetime):
+            time_period = f"{oldest_date.strftime('%b %d, %Y')} to {newest_date.strftime('%b %d, %Y')}"
         else:
             time_period = "All time"
         
@@ -2103,7 +2628,7 @@ def get_category_spending(user_id, category='Food'):
                 "date": t.get('date').isoformat() if isinstance(t.get('date'), datetime) else str(t.get('date', '')),
                 "category": t.get('category', 'Unknown')
             }
-            for t in category_transactions
+            for t in result["examples"]
         ]
         
         return {
@@ -2111,7 +2636,7 @@ def get_category_spending(user_id, category='Food'):
             "transactions": transactions_data,
             "percentage": percentage,
             "time_period": time_period,
-            "transaction_count": len(category_transactions)
+            "transaction_count": category_totals.get("count", 0)
         }
     except Exception as e:
         return {
@@ -2123,22 +2648,33 @@ def get_category_spending(user_id, category='Food'):
             "transaction_count": 0
         }
 
+# The last healthy response, reused for a second so frequent polling doesn't ping MongoDB
+# every time. Unhealthy responses are never cached, so failures show up immediately.
+health_cache = TTLCache(maxsize=1, ttl=1)
+
 @app.get("/api/health")
 async def health_check():
     """
     Health check endpoint for the API.
     Returns the status of the API and its dependencies.
     """
+    cached = health_cache.get("health")
+    if cached is not None:
+        return cached
+    
     try:
         # Check MongoDB connection
-        db = get_collection(Collections.USERS)
-        db.find_one({})  # Simple query to check connection
+        db = get_async_collection(Collections.USERS)
+        # Simple query to check connection, shared by concurrent health checks
+        await coalesce_read(("health",), lambda: db.find_one({}, {"_id": 1}))
         
-        return {
+        response_data = {
             "status": "healthy",
             "message": "API and database are operational",
             "timestamp": datetime.now().isoformat()
         }
+        health_cache["health"] = response_data
+        return response_data
     except Exception as e:
         return {
             "status": "unhealthy",
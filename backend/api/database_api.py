@@ -9,15 +9,17 @@ These endpoints serve as the interface between the frontend application
 and the MongoDB database, handling data validation and error handling.
 """
 from fastapi import APIRouter, HTTPException, Depends  # FastAPI components for routing and error handling
+from pymongo import ReturnDocument  # For getting the updated document back from an update
 from pydantic import BaseModel  # For data validation and settings management
 from typing import List, Dict, Any, Optional  # Type hints for better code documentation
 from datetime import datetime  # For handling date and time
-from bson import ObjectId, json_util  # For MongoDB ObjectId handling and JSON serialization
-import json  # For JSON manipulation
+from bson import ObjectId  # For MongoDB ObjectId handling
+from pymongo.errors import DuplicateKeyError  # Raised when a unique index rejects an insert
 
 # Import database models - Using absolute imports for better reliability
-from Database.models import User, Transaction, FinancialGoal  # Database model classes
-from Database.database import get_db, close_db_connection  # Database connection utilities
+from Database.models import User  # Database model class
+from Database.database import get_async_db, close_db_connection, Collections, has_unique_user_indexes  # Database connection utilities
+from .responses import ORJSONResponse  # orjson-rendered JSON response
 
 # Create router with prefix and tags for API documentation
 router = APIRouter(
@@ -111,16 +113,67 @@ class FinancialGoalUpdate(BaseModel):
     name: Optional[str] = None  # New name (optional)
     deadline: Optional[datetime] = None  # New deadline (optional)
 
+# Fields fetched for the list endpoints, matching TransactionResponse and FinancialGoalResponse
+TRANSACTION_RESPONSE_PROJECTION = {"userId": 1, "amount": 1, "category": 1, "description": 1, "date": 1}
+GOAL_RESPONSE_PROJECTION = {"userId": 1, "targetAmount": 1, "currentAmount": 1, "category": 1, "name": 1, "deadline": 1}
+
 # Database dependency
-def get_db_dependency():
+async def get_db_dependency():
     """
     Get database dependency for FastAPI dependency injection.
     This function is used as a dependency in route functions to get the database connection.
     
+    The database comes from the async (Motor) client, so every query in the
+    route functions is awaited and doesn't block the event loop.
+    
+    Yields:
+        Motor database connection
+    """
+    yield get_async_db()
+
+def _normalize(doc: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Convert a MongoDB document into response data, in place.
+    
+    ObjectId values become strings, datetimes become ISO format strings and
+    _id is renamed to id. This is a single pass over the top-level fields,
+    instead of dumping the document to extended JSON and parsing it back.
+    
+    Args:
+        doc: Document (or model_dump() output) to convert
+        
+    Returns:
+        The same dictionary, converted
+    """
+    for key, value in doc.items():
+        if isinstance(value, ObjectId):
+            doc[key] = str(value)
+        elif isinstance(value, datetime):
+            doc[key] = value.isoformat()
+    if "_id" in doc:
+        doc["id"] = doc.pop("_id")
+    return doc
+
+def _respond(response_model, data):
+    """
+    Build a response from normalized documents without re-validating them.
+    
+    FastAPI validates whatever a handler returns against its response_model.
+    Returning an ORJSONResponse skips that, which is safe only because the data
+    comes from our own MongoDB documents. Fields that aren't on the model are
+    still left out. response_model stays on each route for the API docs.
+    
+    Args:
+        response_model: Pydantic model describing the response
+        data: Normalized document, or a list of them
+        
     Returns:
-        MongoDB database connection
+        ORJSONResponse with the response model's fields
     """
-    return get_db()
+    fields = response_model.model_fields
+    if isinstance(data, list):
+        return ORJSONResponse([{key: value for key, value in item.items() if key in fields} for item in data])
+    return ORJSONResponse({key: value for key, value in data.items() if key in fields})
 
 # User endpoints
 @router.post("/users", response_model=UserResponse)
@@ -130,9 +183,9 @@ async def create_user(user: UserCreate, db=Depends(get_db_dependency)):
     
     This endpoint:
     1. Validates the user data using the UserCreate model
-    2. Checks if the username or email already exists
-    3. Creates the user in the database
-    4. Returns the created user information
+    2. Creates the user in the database, where unique indexes reject an existing username or email
+       (if the indexes couldn't be created, an existing user is looked up first instead)
+    3. Returns the created user information
     
     Args:
         user: User data from request body
@@ -144,36 +197,38 @@ async def create_user(user: UserCreate, db=Depends(get_db_dependency)):
     Raises:
         HTTPException: If username or email already exists
     """
-    # Check if user exists by username
-    existing_user = User.find_by_username(user.username)
-    if existing_user:
-        raise HTTPException(status_code=400, detail="Username already registered")
-    
-    # Check if user exists by email
-    existing_email = User.find_by_email(user.email)
-    if existing_email:
-        raise HTTPException(status_code=400, detail="Email already registered")
+    # The unique indexes on username and email reject an existing user, so there's
+    # normally no need to look them up first. Without them duplicates would be
+    # accepted, so fall back to checking.
+    if not has_unique_user_indexes():
+        existing = await db[Collections.USERS].find_one(
+            {"$or": [{"username": user.username}, {"email": user.email}]}, {"username": 1}
+        )
+        if existing:
+            if existing.get("username") == user.username:
+                raise HTTPException(status_code=400, detail="Username already registered")
+            raise HTTPException(status_code=400, detail="Email already registered")
     
     # Create user in database
     user_data = user.model_dump()  # Convert Pydantic model to dictionary
-    created_user = User.create(user_data)  # Create user using model class
+    user_data["createdAt"] = datetime.now()
+    try:
+        result = await db[Collections.USERS].insert_one(user_data)
+    except DuplicateKeyError as e:
+        if "username" in (e.details or {}).get("keyPattern", {}):
+            raise HTTPException(status_code=400, detail="Username already registered")
+        raise HTTPException(status_code=400, detail="Email already registered")
+    user_data["_id"] = result.inserted_id  # Add the generated ID to the data
     
-    # Convert ObjectId to string for response
+    # The inserted dictionary already holds every field, so convert it directly
     # MongoDB ObjectId is not JSON serializable, so we convert it to string
-    response_data = json.loads(json_util.dumps(created_user.model_dump()))
-    if '_id' in response_data:
-        response_data["id"] = str(response_data["_id"])  # Add id field with string value
-        del response_data["_id"]  # Remove _id field
+    response_data = _normalize(user_data)
     
     # Remove password from response for security
     if "password" in response_data:
         del response_data["password"]
     
-    # Convert datetime to string for JSON serialization
-    if "createdAt" in response_data and isinstance(response_data["createdAt"], dict) and "$date" in response_data["createdAt"]:
-        response_data["createdAt"] = response_data["createdAt"]["$date"]
-    
-    return response_data
+    return _respond(UserResponse, response_data)
 
 @router.get("/users/{username}", response_model=UserResponse)
 async def get_user(username: str, db=Depends(get_db_dependency)):
@@ -196,25 +251,18 @@ async def get_user(username: str, db=Depends(get_db_dependency)):
         HTTPException: If user not found
     """
     # Find user by username
-    user = User.find_by_username(username)
-    if not user:
+    user_data = await db[Collections.USERS].find_one({"username": username})
+    if not user_data:
         raise HTTPException(status_code=404, detail="User not found")
     
-    # Convert ObjectId to string for response
-    response_data = json.loads(json_util.dumps(user.model_dump()))
-    if '_id' in response_data:
-        response_data["id"] = str(response_data["_id"])
-        del response_data["_id"]
+    # Convert ObjectId and datetime fields to strings for response
+    response_data = _normalize(User(**user_data).model_dump())
     
     # Remove password from response for security
     if "password" in response_data:
         del response_data["password"]
     
-    # Convert datetime to string for JSON serialization
-    if "createdAt" in response_data and isinstance(response_data["createdAt"], dict) and "$date" in response_data["createdAt"]:
-        response_data["createdAt"] = response_data["createdAt"]["$date"]
-    
-    return response_data
+    return _respond(UserResponse, response_data)
 
 # Transaction endpoints
 @router.post("/transactions", response_model=TransactionResponse)
@@ -239,7 +287,7 @@ async def create_transaction(transaction: TransactionCreate, db=Depends(get_db_d
         HTTPException: If user not found
     """
     # Check if user exists
-    user = User.find_by_username(transaction.userId)
+    user = await db[Collections.USERS].find_one({"username": transaction.userId}, {"_id": 1})
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
@@ -249,19 +297,11 @@ async def create_transaction(transaction: TransactionCreate, db=Depends(get_db_d
     if transaction_data.get("date") is None:
         transaction_data["date"] = datetime.now()
     
-    # Create transaction using model class
-    created_transaction = Transaction.create(transaction_data)
-    
-    # Convert ObjectId to string for response
-    response_data = json.loads(json_util.dumps(created_transaction.model_dump()))
-    response_data["id"] = str(response_data["_id"])
-    del response_data["_id"]
-    
-    # Convert datetime to string for JSON serialization
-    if "date" in response_data and isinstance(response_data["date"], dict) and "$date" in response_data["date"]:
-        response_data["date"] = response_data["date"]["$date"]
+    result = await db[Collections.TRANSACTIONS].insert_one(transaction_data)
+    transaction_data["_id"] = result.inserted_id  # Add the generated ID to the data
     
-    return response_data
+    # The inserted dictionary already holds every field, so convert it directly
+    return _respond(TransactionResponse, _normalize(transaction_data))
 
 @router.get("/transactions/user/{user_id}", response_model=List[TransactionResponse])
 async def get_user_transactions(user_id: str, db=Depends(get_db_dependency)):
@@ -279,24 +319,16 @@ async def get_user_transactions(user_id: str, db=Depends(get_db_dependency)):
     Returns:
         List of transactions for the user
     """
-    # Find all transactions for the user
-    transactions = Transaction.find_by_user(user_id)
+    # Find all transactions for the user, fetching only the response fields
+    transactions = await db[Collections.TRANSACTIONS].find(
+        {"userId": user_id}, TRANSACTION_RESPONSE_PROJECTION, batch_size=500
+    ).to_list(length=None)
     
-    # Convert ObjectId to string for response
-    response_data = []
+    # The projection already limits the documents to the response fields, so they
+    # only need _id renamed; orjson writes the ObjectId and datetime values itself
     for transaction in transactions:
-        # Convert transaction to dictionary and handle MongoDB-specific types
-        transaction_dict = json.loads(json_util.dumps(transaction.model_dump()))
-        transaction_dict["id"] = str(transaction_dict["_id"])
-        del transaction_dict["_id"]
-        
-        # Convert datetime to string for JSON serialization
-        if "date" in transaction_dict and isinstance(transaction_dict["date"], dict) and "$date" in transaction_dict["date"]:
-            transaction_dict["date"] = transaction_dict["date"]["$date"]
-        
-        response_data.append(transaction_dict)
-    
-    return response_data
+        transaction["id"] = transaction.pop("_id")
+    return ORJSONResponse(transactions)
 
 # Financial Goal endpoints
 @router.post("/goals", response_model=FinancialGoalResponse)
@@ -321,24 +353,17 @@ async def create_goal(goal: FinancialGoalCreate, db=Depends(get_db_dependency)):
         HTTPException: If user not found
     """
     # Check if user exists
-    user = User.find_by_username(goal.userId)
+    user = await db[Collections.USERS].find_one({"username": goal.userId}, {"_id": 1})
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
     # Create goal in database
     goal_data = goal.model_dump()
-    created_goal = FinancialGoal.create(goal_data)
-    
-    # Convert ObjectId to string for response
-    response_data = json.loads(json_util.dumps(created_goal.model_dump()))
-    response_data["id"] = str(response_data["_id"])
-    del response_data["_id"]
-    
-    # Convert datetime to string for JSON serialization
-    if "deadline" in response_data and isinstance(response_data["deadline"], dict) and "$date" in response_data["deadline"]:
-        response_data["deadline"] = response_data["deadline"]["$date"]
+    result = await db[Collections.FINANCIAL_GOALS].insert_one(goal_data)
+    goal_data["_id"] = result.inserted_id  # Add the generated ID to the data
     
-    return response_data
+    # The inserted dictionary already holds every field, so convert it directly
+    return _respond(FinancialGoalResponse, _normalize(goal_data))
 
 @router.get("/goals/user/{user_id}", response_model=List[FinancialGoalResponse])
 async def get_user_goals(user_id: str, db=Depends(get_db_dependency)):
@@ -356,24 +381,16 @@ async def get_user_goals(user_id: str, db=Depends(get_db_dependency)):
     Returns:
         List of financial goals for the user
     """
-    # Find all goals for the user
-    goals = FinancialGoal.find_by_user(user_id)
+    # Find all goals for the user, fetching only the response fields
+    goals = await db[Collections.FINANCIAL_GOALS].find(
+        {"userId": user_id}, GOAL_RESPONSE_PROJECTION, batch_size=500
+    ).to_list(length=None)
     
-    # Convert ObjectId to string for response
-    response_data = []
+    # The projection already limits the documents to the response fields, so they
+    # only need _id renamed; orjson writes the ObjectId and datetime values itself
     for goal in goals:
-        # Convert goal to dictionary and handle MongoDB-specific types
-        goal_dict = json.loads(json_util.dumps(goal.model_dump()))
-        goal_dict["id"] = str(goal_dict["_id"])
-        del goal_dict["_id"]
-        
-        # Convert datetime to string for JSON serialization
-        if "deadline" in goal_dict and isinstance(goal_dict["deadline"], dict) and "$date" in goal_dict["deadline"]:
-            goal_dict["deadline"] = goal_dict["deadline"]["$date"]
-        
-        response_data.append(goal_dict)
-    
-    return response_data
+        goal["id"] = goal.pop("_id")
+    return ORJSONResponse(goals)
 
 @router.put("/goals/{goal_id}", response_model=FinancialGoalResponse)
 async def update_goal(goal_id: str, goal_update: FinancialGoalUpdate, db=Depends(get_db_dependency)):
@@ -382,9 +399,8 @@ async def update_goal(goal_id: str, goal_update: FinancialGoalUpdate, db=Depends
     
     This endpoint:
     1. Validates the update data
-    2. Checks if the goal exists
-    3. Updates the goal in the database
-    4. Returns the updated goal information
+    2. Updates the goal in the database
+    3. Returns the updated goal information, or a 404 error if the goal doesn't exist
     
     Args:
         goal_id: ID of the goal to update
@@ -395,31 +411,31 @@ async def update_goal(goal_id: str, goal_update: FinancialGoalUpdate, db=Depends
         Updated goal information
         
     Raises:
-        HTTPException: If goal not found or update fails
+        HTTPException: If the goal ID is malformed or the goal is not found
     """
-    # Check if goal exists
-    goal = db["FinancialGoals"].find_one({"_id": ObjectId(goal_id)})
-    if not goal:
-        raise HTTPException(status_code=404, detail="Goal not found")
+    # Validate the ID once up front so a malformed one is a 400, not a 500
+    if not ObjectId.is_valid(goal_id):
+        raise HTTPException(status_code=400, detail="Invalid goal ID")
+    goal_oid = ObjectId(goal_id)
+    
+    goals = db[Collections.FINANCIAL_GOALS]
     
     # Update goal in database
     # Only include fields that are not None in the update
     update_data = {k: v for k, v in goal_update.model_dump().items() if v is not None}
-    success = FinancialGoal.update_goal(goal_id, update_data)
-    
-    if not success:
-        raise HTTPException(status_code=500, detail="Failed to update goal")
-    
-    # Get updated goal from database
-    updated_goal = db["FinancialGoals"].find_one({"_id": ObjectId(goal_id)})
-    
-    # Convert ObjectId to string for response
-    response_data = json.loads(json_util.dumps(updated_goal))
-    response_data["id"] = str(response_data["_id"])
-    del response_data["_id"]
-    
-    # Convert datetime to string for JSON serialization
-    if "deadline" in response_data and isinstance(response_data["deadline"], dict) and "$date" in response_data["deadline"]:
-        response_data["deadline"] = response_data["deadline"]["$date"]
+    if update_data:
+        # Update the goal and get the updated document back in one round-trip
+        updated_goal = await goals.find_one_and_update(
+            {"_id": goal_oid},
+            {"$set": update_data},
+            return_document=ReturnDocument.AFTER
+        )
+    else:
+        # Nothing to change; an empty $set is rejected by MongoDB
+        updated_goal = await goals.find_one({"_id": goal_oid})
+    
+    if not updated_goal:
+        raise HTTPException(status_code=404, detail="Goal not found")
     
-    return response_data 
\ No newline at end of file
+    # Convert ObjectId and datetime fields to strings for response
+    return _respond(FinancialGoalResponse, _normalize(updated_goal)) 
\ No newline at end of file
@@ -0,0 +1,48 @@
+"""
+Response classes for the CougarWise API.
+"""
+import orjson  # Fast JSON serialization implemented in C
+from bson import ObjectId
+from fastapi.responses import JSONResponse
+
+
+def _default(value):
+    """
+    Serialize values orjson doesn't handle natively.
+    
+    Only called for unsupported types, so it adds nothing to the common path.
+    
+    Args:
+        value: The value orjson couldn't serialize
+        
+    Returns:
+        A JSON-serializable replacement
+        
+    Raises:
+        TypeError: If the value isn't a supported type
+    """
+    if isinstance(value, ObjectId):
+        return str(value)
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+class ORJSONResponse(JSONResponse):
+    """
+    JSON response rendered with orjson instead of the standard library encoder.
+
+    orjson serializes in C and natively handles datetime and numpy values,
+    which makes encoding the API's dict/list payloads considerably cheaper.
+    MongoDB ObjectIds are written as their hex string.
+    """
+
+    def render(self, content) -> bytes:
+        """
+        Serialize the response content to JSON bytes.
+
+        Args:
+            content: The data to serialize
+
+        Returns:
+            The JSON-encoded body
+        """
+        return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
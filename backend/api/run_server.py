@@ -15,7 +15,17 @@ load_dotenv(dotenv_path)
 # Get port from environment or use default
 port = int(os.getenv('API_PORT', 8000))
 
+# Production runs on uvloop and the httptools parser without auto-reload; anything else
+# is development and auto-reloads. Both run a single worker: the API keeps its caches
+# (finance summaries, analytics, goal lists) in process memory and invalidates them on
+# writes, which other workers wouldn't see, so more workers need a shared cache first (same as run.py).
+production = os.getenv('ENV') == 'prod'
+
 if __name__ == "__main__":
     print(f"Starting CougarWise API server on port {port}...")
-    uvicorn.run("API:app", host="0.0.0.0", port=port, reload=True)
+    if production:
+        uvicorn.run("API:app", host="0.0.0.0", port=port,
+                    loop="uvloop", http="httptools", reload=False)
+    else:
+        uvicorn.run("API:app", host="0.0.0.0", port=port, reload=True)
     print("Server started successfully!") 
\ No newline at end of file
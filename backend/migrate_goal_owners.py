@@ -0,0 +1,27 @@
+#!/usr/bin/env python3
+"""
+One-off migration that moves the owner of older financial goals from
+user_id to userId. The API only queries userId, so run this once against
+a database that still has goals stored with user_id.
+"""
+import os
+import sys
+from dotenv import load_dotenv
+
+# Add the backend directory to the Python path
+backend_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(backend_dir)
+
+# Load environment variables
+dotenv_path = os.path.join(backend_dir, '.env')
+if os.path.exists(dotenv_path):
+    load_dotenv(dotenv_path)
+
+from Database.database import migrate_goal_owners, close_db_connection
+
+if __name__ == "__main__":
+    print(f"Migrating goals in database {os.getenv('MONGODB_DB_NAME', 'cougarwise')}...")
+    try:
+        print(f"Migrated {migrate_goal_owners()} goals to userId.")
+    finally:
+        close_db_connection()
@@ -6,6 +6,7 @@ Key components:
 - Test client fixture for FastAPI
 - MongoDB test database setup and teardown
 - Test data fixtures for users, transactions, and goals
+- Mocked database fixtures for tests that run without MongoDB
 - Helper functions for creating test data
 """
 import os  # For accessing environment variables and file paths
@@ -14,19 +15,32 @@ from fastapi.testclient import TestClient  # For testing FastAPI applications
 from pymongo import MongoClient  # MongoDB client library
 from bson import ObjectId  # MongoDB's unique identifier type
 from datetime import datetime, timedelta  # For handling dates and times
+from collections import defaultdict  # For creating mocked collections on first use
+from unittest.mock import patch, MagicMock, AsyncMock  # For skipping the app's startup database work and mocking the database
 
 # Add backend directory to path to allow imports from parent directory
 # This is necessary because the tests are in a subdirectory
 import sys
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# conftest.py is imported before any test module, so this runs once for the whole suite
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Use a test database with a different name from the production database.
+# This is set before the app is imported, so nothing in a test session can
+# reach the production database.
+TEST_DB_NAME = "cougarwise_test"
+os.environ["MONGODB_DB_NAME"] = TEST_DB_NAME
 
 # Import app and database using absolute imports
 # These are the main components we'll be testing
+from api import API  # The API module, whose caches the mocked fixtures reset
 from api.API import app  # The FastAPI application
-from Database.database import Database, get_db, get_collection, Collections  # Database utilities
+from Database.database import Database, get_db, get_collection, Collections, ensure_indexes, MONGODB_URI, TLS_OPTIONS  # Database utilities
+
+# Fixed timestamp for test documents, so stored dates are deterministic
+FIXED_NOW = datetime(2024, 1, 1)
 
 # Test client fixture
-@pytest.fixture
+@pytest.fixture(scope="session")
 def client():
     """
     Create a test client for the FastAPI app.
@@ -35,12 +49,18 @@ def client():
     to the FastAPI application without running a server. It's used in tests
     to simulate HTTP requests and check responses.
     
-    The 'with' statement ensures proper cleanup after tests.
+    The 'scope="session"' means the app's event loop is shared by every test,
+    instead of being redone per test. The 'with' statement ensures proper
+    cleanup after the session.
+    
+    Most tests mock the database, so the startup hook's index creation is
+    skipped here; tests that use the real test database get the indexes
+    from the mongo_client fixture instead.
     
     Returns:
         TestClient: A FastAPI test client
     """
-    with TestClient(app) as test_client:
+    with patch('api.API.ensure_indexes'), TestClient(app) as test_client:
         yield test_client  # Yield the client to the test, then clean up after
 
 # MongoDB test database fixture
@@ -61,21 +81,24 @@ def mongo_client():
     Returns:
         MongoClient: A MongoDB client connected to the test database
     """
-    # Use a test database with a different name from the production database
-    test_db_name = "cougarwise_test"
-    mongo_uri = os.getenv('MONGODB_URI', 'mongodb://localhost:27017')
+    test_db_name = TEST_DB_NAME
     
     # Override the database instance for testing
     # This ensures tests use the test database instead of the production database
     Database._instance = None  # Reset the singleton instance
     os.environ["MONGODB_DB_NAME"] = test_db_name  # Set environment variable for test DB
     
-    # Create MongoDB client
-    client = MongoClient(mongo_uri, tls=True, tlsAllowInvalidCertificates=True)
+    # Create MongoDB client with the same settings as the app, so both can reach the
+    # test server (TLS is only used for remote servers)
+    client = MongoClient(MONGODB_URI, **TLS_OPTIONS)
     
     # Clear test database before tests to ensure a clean state
     client.drop_database(test_db_name)
     
+    # Recreate the indexes on the empty test database, since the client fixture
+    # skips the app's startup and the unique ones enforce unique users
+    ensure_indexes()
+    
     # Provide the client to tests
     yield client
     
@@ -139,7 +162,7 @@ def test_transaction_data():
         "amount": 50.00,  # Transaction amount
         "category": "Food",  # Transaction category
         "description": "Lunch",  # Transaction description
-        "date": datetime.now().isoformat()  # Current time in ISO format for JSON
+        "date": FIXED_NOW.isoformat()  # Fixed test time in ISO format for JSON
     }
 
 @pytest.fixture
@@ -148,7 +171,7 @@ def test_goal_data():
     Create test financial goal data.
     
     This fixture provides a dictionary with test financial goal data that can be
-    used to create a goal in tests. The deadline is set to 30 days from now
+    used to create a goal in tests. The deadline is set to 30 days after FIXED_NOW
     and converted to ISO format for JSON serialization.
     
     Returns:
@@ -159,8 +182,115 @@ def test_goal_data():
         "targetAmount": 1000.00,  # Target amount to save
         "currentAmount": 0.00,  # Current progress (starting at 0)
         "category": "Savings",  # Goal category
-        "deadline": (datetime.now() + timedelta(days=30)).isoformat()  # 30 days from now in ISO format
+        "deadline": (FIXED_NOW + timedelta(days=30)).isoformat()  # 30 days after the fixed test time in ISO format
+    }
+
+@pytest.fixture
+def seeded_db(db):
+    """
+    Seed the test database with a user, two transactions and two goals.
+    
+    Each collection is filled with one insert call (insert_many for the
+    lists), so setup costs one round-trip per collection instead of one
+    per document.
+    
+    Args:
+        db: The test database from the db fixture
+        
+    Returns:
+        dict: The inserted "user", "transactions" and "goals", including their generated _ids
+    """
+    user = {
+        "username": "testuser",  # Username
+        "email": "test@example.com",  # Email
+        "password": "hashedpassword123",  # Password (would be hashed in production)
+        "name": "Test User",  # Full name
+        "createdAt": FIXED_NOW  # Creation timestamp
     }
+    transactions = [
+        {"userId": "testuser", "amount": 50.00, "category": "Food", "description": "Lunch", "date": FIXED_NOW},
+        {"userId": "testuser", "amount": 25.00, "category": "Transport", "description": "Bus fare", "date": FIXED_NOW}
+    ]
+    goals = [
+        {"userId": "testuser", "targetAmount": 1000.00, "currentAmount": 0.00,
+         "category": "Savings", "deadline": FIXED_NOW + timedelta(days=30)},
+        {"userId": "testuser", "targetAmount": 5000.00, "currentAmount": 1000.00,
+         "category": "Education", "deadline": FIXED_NOW + timedelta(days=365)}
+    ]
+    
+    # The driver adds the generated _id to each inserted document
+    db[Collections.USERS].insert_one(user)
+    db[Collections.TRANSACTIONS].insert_many(transactions)
+    db[Collections.FINANCIAL_GOALS].insert_many(goals)
+    
+    return {"user": user, "transactions": transactions, "goals": goals}
+
+@pytest.fixture
+def sample_transactions():
+    """
+    Sample transaction documents as stored in MongoDB.
+    
+    Returns:
+        list: Income, expense and untyped transactions for user1
+    """
+    return [
+        {"user_id": "user1", "amount": 2000, "type": "income", "category": "Salary"},
+        {"user_id": "user1", "amount": -45.5, "category": "Food"},
+        {"user_id": "user1", "amount": -20, "category": "Food"},
+        {"user_id": "user1", "amount": 700, "type": "expense", "category": "Rent"},
+        {"user_id": "user1", "amount": 150},
+    ]
+
+@pytest.fixture
+def mock_collection(sample_transactions):
+    """
+    Patch the collections used by the /api endpoints with one mocked Motor collection.
+    
+    get_async_collection returns this mock whatever collection is asked for,
+    so each test configures it for the collection the code under test reads
+    (transactions, budgets, goals, users or monthly totals). By default find
+    returns the sample transactions and the other calls return nothing.
+    The API's caches are cleared before and after, so tests don't share data.
+    
+    Args:
+        sample_transactions: Documents returned by find
+        
+    Returns:
+        MagicMock: The mocked collection
+    """
+    API.finance_summary_cache.clear()
+    API.analytics_cache.clear()
+    API.goal_list_cache.clear()
+    API.refreshed_months.clear()
+    with patch('api.API.get_async_collection') as mock_get_collection:
+        collection = MagicMock()
+        collection.find.return_value.to_list = AsyncMock(return_value=sample_transactions)
+        collection.aggregate.return_value.to_list = AsyncMock(return_value=[])
+        collection.find_one = AsyncMock(return_value=None)
+        collection.update_one = AsyncMock()
+        collection.delete_one = AsyncMock()
+        mock_get_collection.return_value = collection
+        yield collection
+    API.finance_summary_cache.clear()
+    API.analytics_cache.clear()
+    API.goal_list_cache.clear()
+
+@pytest.fixture
+def db_collections():
+    """
+    Patch the database used by the /db routes with mocked collections.
+    
+    Each collection is a separate mock, created when a route first uses it,
+    so a test only configures (and can only see calls on) the collections it uses.
+    
+    Returns:
+        defaultdict: Mocked collections by name
+    """
+    collections = defaultdict(MagicMock)
+    db = MagicMock()
+    db.__getitem__.side_effect = collections.__getitem__
+    with patch('api.database_api.get_async_db', return_value=db):
+        yield collections
 
 # Helper functions for creating test data in the database
 # These functions are used by tests to set up test data
@@ -184,7 +314,7 @@ def create_test_user(db):
         "email": "test@example.com",  # Email
         "password": "hashedpassword123",  # Password (would be hashed in production)
         "name": "Test User",  # Full name
-        "createdAt": datetime.now()  # Creation timestamp
+        "createdAt": FIXED_NOW  # Creation timestamp
     }
     
     # Insert user into database
@@ -214,7 +344,7 @@ def create_test_transaction(db):
         "amount": 50.00,  # Transaction amount
         "category": "Food",  # Transaction category
         "description": "Lunch",  # Transaction description
-        "date": datetime.now()  # Current time
+        "date": FIXED_NOW  # Fixed test time
     }
     
     # Insert transaction into database
@@ -244,7 +374,7 @@ def create_test_goal(db):
         "targetAmount": 1000.00,  # Target amount to save
         "currentAmount": 0.00,  # Current progress (starting at 0)
         "category": "Savings",  # Goal category
-        "deadline": datetime.now() + timedelta(days=30)  # 30 days from now
+        "deadline": FIXED_NOW + timedelta(days=30)  # 30 days after the fixed test time
     }
     
     # Insert goal into database
@@ -5,136 +5,183 @@ These tests verify that the AI API endpoints correctly interact with the AI comp
 and handle various scenarios including success cases and error handling.
 """
 
-import sys
-import os
 import pytest
-from fastapi.testclient import TestClient
-from unittest.mock import patch, MagicMock
+from unittest.mock import patch, Mock, MagicMock
 import json
 
-# Add parent directory to path to allow importing from the backend package
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from api import API as api_module
 
-# Import the API module for testing
-from api.API import app
+# The backend directory is put on sys.path, and the session-scoped client fixture
+# is provided, by conftest.py
 
-# Create test client
-client = TestClient(app)
-
-@pytest.fixture
-def mock_ai_assistant():
-    """Create a mock AI assistant for testing."""
-    with patch('api.API.ai_assistant') as mock_assistant:
-        # Configure success responses for each method
-        mock_assistant.process_user_query.return_value = {
-            'status': 'success',
-            'response': 'Here are some budgeting tips for college students...'
+# Canned AI assistant responses, built once rather than for every test.
+# Each test still gets its own mock configured from them, so call history isn't shared.
+AI_ASSISTANT_RESPONSES = {
+    'process_user_query.return_value': {
+        'status': 'success',
+        'response': 'Here are some budgeting tips for college students...'
+    },
+    
+    # A list rather than an iterator, so it can be streamed by every test
+    'stream_user_query.return_value': [
+        'Here are some ', 'budgeting tips for college students...'
+    ],
+    
+    'get_spending_advice.return_value': {
+        'status': 'success',
+        'predictions': {
+            'total': 1500,
+            'categories': {'food': 400, 'housing': 700, 'other': 400}
+        },
+        'advice': {
+            'advice': 'You should try to reduce your food expenses.',
+            'savings_tips': ['Cook at home', 'Use student discounts'],
+            'budget_allocation': {'food': '25%', 'housing': '45%', 'other': '30%'}
         }
-        
-        mock_assistant.get_spending_advice.return_value = {
-            'status': 'success',
-            'predictions': {
-                'total': 1500,
-                'categories': {'food': 400, 'housing': 700, 'other': 400}
+    },
+    
+    'generate_budget_template.return_value': {
+        'status': 'success',
+        'template': {
+            'income': {
+                'monthly_income': 1800,
+                'financial_aid': 625  # Monthly equivalent of $7500/year
             },
-            'advice': {
-                'advice': 'You should try to reduce your food expenses.',
-                'savings_tips': ['Cook at home', 'Use student discounts'],
-                'budget_allocation': {'food': '25%', 'housing': '45%', 'other': '30%'}
+            'expenses': {
+                'housing': 700,
+                'food': 350,
+                'transportation': 150,
+                'entertainment': 100,
+                'education': 200,
+                'savings': 300
             }
         }
-        
-        mock_assistant.generate_budget_template.return_value = {
-            'status': 'success',
-            'template': {
-                'income': {
-                    'monthly_income': 1800,
-                    'financial_aid': 625  # Monthly equivalent of $7500/year
-                },
-                'expenses': {
-                    'housing': 700,
-                    'food': 350,
-                    'transportation': 150,
-                    'entertainment': 100,
-                    'education': 200,
-                    'savings': 300
-                }
+    },
+    
+    'analyze_financial_goals.return_value': {
+        'status': 'success',
+        'analysis': [
+            {
+                'goal': 'Save $5000 for a new laptop',
+                'feasibility': 'Achievable in 17 months',
+                'recommendations': ['Save $300 per month', 'Consider part-time work']
+            },
+            {
+                'goal': 'Pay off $2000 in credit card debt',
+                'feasibility': 'Achievable in 7 months',
+                'recommendations': ['Pay $300 per month', 'Reduce interest by transferring balance']
             }
-        }
-        
-        mock_assistant.analyze_financial_goals.return_value = {
-            'status': 'success',
-            'analysis': [
-                {
-                    'goal': 'Save $5000 for a new laptop',
-                    'feasibility': 'Achievable in 17 months',
-                    'recommendations': ['Save $300 per month', 'Consider part-time work']
-                },
-                {
-                    'goal': 'Pay off $2000 in credit card debt',
-                    'feasibility': 'Achievable in 7 months',
-                    'recommendations': ['Pay $300 per month', 'Reduce interest by transferring balance']
-                }
-            ]
-        }
-        
+        ]
+    }
+}
+
+# Errors raised by every AI assistant method, for testing error handling
+AI_ASSISTANT_ERRORS = {
+    'process_user_query.side_effect': Exception("Error processing query"),
+    'stream_user_query.side_effect': Exception("Error streaming query"),
+    'get_spending_advice.side_effect': Exception("Error generating spending advice"),
+    'generate_budget_template.side_effect': Exception("Error generating budget template"),
+    'analyze_financial_goals.side_effect': Exception("Error analyzing financial goals")
+}
+
+@pytest.fixture
+def mock_ai_assistant():
+    """Create a mock AI assistant for testing."""
+    # Configure success responses for each method. A plain Mock is enough since the
+    # tests only check top-level calls; its child methods are plain Mocks too.
+    with patch.object(api_module, 'ai_assistant', new_callable=Mock, **AI_ASSISTANT_RESPONSES) as mock_assistant:
         yield mock_assistant
 
 @pytest.fixture
 def mock_ai_assistant_error():
     """Create a mock AI assistant that raises exceptions for testing error handling."""
-    with patch('api.API.ai_assistant') as mock_assistant:
-        # Configure all methods to raise exceptions
-        mock_assistant.process_user_query.side_effect = Exception("Error processing query")
-        mock_assistant.get_spending_advice.side_effect = Exception("Error generating spending advice")
-        mock_assistant.generate_budget_template.side_effect = Exception("Error generating budget template")
-        mock_assistant.analyze_financial_goals.side_effect = Exception("Error analyzing financial goals")
-        
+    # Configure all methods to raise exceptions
+    with patch.object(api_module, 'ai_assistant', new_callable=Mock, **AI_ASSISTANT_ERRORS) as mock_assistant:
         yield mock_assistant
 
-@pytest.fixture
-def sample_user_profile():
-    """Sample user profile data for testing."""
-    return {
-        "year_in_school": "Junior",
-        "major": "Engineering",
+# Sample user profile with only the required fields. No test asserts on the optional
+# ones, so leaving them out keeps request parsing and validation to a minimum.
+MIN_PROFILE = {
+    "year_in_school": "Junior",
+    "major": "Engineering",
+    "monthly_income": 1800,
+    "financial_aid": 7500
+}
+
+QUERY_DATA = {
+    "query": "What are some good budgeting tips for college students?",
+    "user_context": {
+        "year_in_school": "Sophomore",
+        "major": "Computer Science"
+    }
+}
+
+GOALS_DATA = {
+    "goals": [
+        "Save $5000 for a new laptop",
+        "Pay off $2000 in credit card debt"
+    ],
+    "user_context": {
         "monthly_income": 1800,
-        "financial_aid": 7500,
-        "age": 21,
-        "gender": "Female",
-        "preferred_payment_method": "Debit Card"
+        "monthly_expenses": 1200
     }
+}
 
-class TestAIQueryEndpoint:
-    """Test suite for the /ai/query endpoint."""
+# Each AI endpoint with its request, the keys its success response must contain,
+# the assistant method it calls, and the arguments that call must get (None to skip the check)
+AI_ENDPOINTS = [
+    ("/ai/query", QUERY_DATA, ("response",), "process_user_query",
+     (QUERY_DATA["query"], QUERY_DATA["user_context"])),
+    ("/ai/spending-advice", MIN_PROFILE, ("predictions", "advice"), "get_spending_advice", None),
+    ("/ai/budget-template", MIN_PROFILE, ("template",), "generate_budget_template", None),
+    ("/ai/analyze-goals", GOALS_DATA, ("analysis",), "analyze_financial_goals",
+     (GOALS_DATA["goals"], GOALS_DATA["user_context"])),
+]
+
+# Each AI endpoint with its request and the message its 500 response must contain
+AI_ENDPOINT_ERRORS = [
+    ("/ai/query", {"query": "What's the best way to save money?"}, "Error processing query"),
+    ("/ai/spending-advice", MIN_PROFILE, "Error getting spending advice"),
+    ("/ai/budget-template", MIN_PROFILE, "Error generating budget template"),
+    ("/ai/analyze-goals", {"goals": ["Build an emergency fund"], "user_context": {"monthly_income": 1500}},
+     "Error analyzing financial goals"),
+]
+
+class TestAIEndpoints:
+    """Test suite for the request/response AI endpoints."""
     
-    def test_process_query_success(self, mock_ai_assistant):
-        """Test successful query processing."""
-        # Test data
-        query_data = {
-            "query": "What are some good budgeting tips for college students?",
-            "user_context": {
-                "year_in_school": "Sophomore",
-                "major": "Computer Science"
-            }
-        }
-        
+    @pytest.mark.parametrize("endpoint, payload, keys, method, expected_args", AI_ENDPOINTS)
+    def test_success(self, client, mock_ai_assistant, endpoint, payload, keys, method, expected_args):
+        """Test that each endpoint passes its request to the assistant and returns the result."""
         # Send request to the endpoint
-        response = client.post("/ai/query", json=query_data)
+        response = client.post(endpoint, json=payload)
         
         # Assertions
         assert response.status_code == 200
-        assert response.json()['status'] == 'success'
-        assert 'response' in response.json()
-        assert "budgeting tips" in response.json()['response'].lower()
+        data = response.json()
+        assert data['status'] == 'success'
+        assert all(key in data for key in keys)
+        
+        # Verify the mock was called (with the right arguments, where they pass straight through)
+        if expected_args is None:
+            getattr(mock_ai_assistant, method).assert_called_once()
+        else:
+            getattr(mock_ai_assistant, method).assert_called_once_with(*expected_args)
+    
+    @pytest.mark.parametrize("endpoint, payload, message", AI_ENDPOINT_ERRORS)
+    def test_error(self, client, mock_ai_assistant_error, endpoint, payload, message):
+        """Test that assistant errors are reported as a 500 with the endpoint's message."""
+        # Send request to the endpoint
+        response = client.post(endpoint, json=payload)
         
-        # Verify the mock was called with the right arguments
-        mock_ai_assistant.process_user_query.assert_called_once_with(
-            query_data['query'], 
-            query_data['user_context']
-        )
+        # Assertions
+        assert response.status_code == 500
+        assert message in response.json()['detail']
+
+class TestAIQueryEndpoint:
+    """Test suite for the /ai/query endpoint."""
     
-    def test_process_query_with_no_context(self, mock_ai_assistant):
+    def test_process_query_with_no_context(self, client, mock_ai_assistant):
         """Test query processing with no user context."""
         # Test data
         query_data = {
@@ -153,169 +200,75 @@ class TestAIQueryEndpoint:
             query_data['query'], 
             None
         )
+
+class TestAIQueryStreamEndpoint:
+    """Test suite for the /ai/query/stream endpoint."""
     
-    def test_process_query_error(self, mock_ai_assistant_error):
-        """Test error handling in query processing."""
+    def test_stream_query_success(self, client, mock_ai_assistant):
+        """Test that the answer is streamed as server-sent events."""
         # Test data
         query_data = {
-            "query": "What's the best way to save money?"
+            "query": "What are some good budgeting tips for college students?"
         }
         
         # Send request to the endpoint
-        response = client.post("/ai/query", json=query_data)
-        
-        # Assertions
-        assert response.status_code == 500
-        assert "Error processing query" in response.json()['detail']
-
-class TestAISpendingAdviceEndpoint:
-    """Test suite for the /ai/spending-advice endpoint."""
-    
-    def test_spending_advice_success(self, mock_ai_assistant, sample_user_profile):
-        """Test successful spending advice generation."""
-        # Send request to the endpoint
-        response = client.post("/ai/spending-advice", json=sample_user_profile)
-        
-        # Assertions
-        assert response.status_code == 200
-        assert response.json()['status'] == 'success'
-        assert 'predictions' in response.json()
-        assert 'advice' in response.json()
-        
-        # Verify the mock was called with the right arguments
-        mock_ai_assistant.get_spending_advice.assert_called_once()
-    
-    def test_spending_advice_error(self, mock_ai_assistant_error, sample_user_profile):
-        """Test error handling in spending advice generation."""
-        # Send request to the endpoint
-        response = client.post("/ai/spending-advice", json=sample_user_profile)
-        
-        # Assertions
-        assert response.status_code == 500
-        assert "Error getting spending advice" in response.json()['detail']
-
-class TestAIBudgetTemplateEndpoint:
-    """Test suite for the /ai/budget-template endpoint."""
-    
-    def test_budget_template_success(self, mock_ai_assistant, sample_user_profile):
-        """Test successful budget template generation."""
-        # Send request to the endpoint
-        response = client.post("/ai/budget-template", json=sample_user_profile)
+        response = client.post("/ai/query/stream", json=query_data)
         
         # Assertions
         assert response.status_code == 200
-        assert response.json()['status'] == 'success'
-        assert 'template' in response.json()
+        assert response.headers['content-type'].startswith('text/event-stream')
+        events = [event for event in response.text.split("\n\n") if event]
+        chunks = [json.loads(event[len("data: "):])['chunk'] for event in events if event.startswith("data: ")]
+        assert "".join(chunks) == 'Here are some budgeting tips for college students...'
+        assert events[-1].startswith("event: done")
         
         # Verify the mock was called with the right arguments
-        mock_ai_assistant.generate_budget_template.assert_called_once()
+        mock_ai_assistant.stream_user_query.assert_called_once_with(query_data['query'], None)
     
-    def test_budget_template_error(self, mock_ai_assistant_error, sample_user_profile):
-        """Test error handling in budget template generation."""
-        # Send request to the endpoint
-        response = client.post("/ai/budget-template", json=sample_user_profile)
-        
-        # Assertions
-        assert response.status_code == 500
-        assert "Error generating budget template" in response.json()['detail']
-
-class TestAIFinancialGoalsEndpoint:
-    """Test suite for the /ai/analyze-goals endpoint."""
-    
-    def test_analyze_goals_success(self, mock_ai_assistant):
-        """Test successful financial goals analysis."""
+    def test_stream_query_error(self, client, mock_ai_assistant_error):
+        """Test that generation errors are reported as an error event."""
         # Test data
-        goals_data = {
-            "goals": [
-                "Save $5000 for a new laptop",
-                "Pay off $2000 in credit card debt"
-            ],
-            "user_context": {
-                "monthly_income": 1800,
-                "monthly_expenses": 1200
-            }
+        query_data = {
+            "query": "What's the best way to save money?"
         }
         
         # Send request to the endpoint
-        response = client.post("/ai/analyze-goals", json=goals_data)
+        response = client.post("/ai/query/stream", json=query_data)
         
         # Assertions
         assert response.status_code == 200
-        assert response.json()['status'] == 'success'
-        assert 'analysis' in response.json()
-        assert len(response.json()['analysis']) == 2
-        
-        # Verify the mock was called with the right arguments
-        mock_ai_assistant.analyze_financial_goals.assert_called_once_with(
-            goals_data['goals'],
-            goals_data['user_context']
-        )
-    
-    def test_analyze_goals_error(self, mock_ai_assistant_error):
-        """Test error handling in financial goals analysis."""
-        # Test data
-        goals_data = {
-            "goals": ["Build an emergency fund"],
-            "user_context": {"monthly_income": 1500}
-        }
-        
-        # Send request to the endpoint
-        response = client.post("/ai/analyze-goals", json=goals_data)
-        
-        # Assertions
-        assert response.status_code == 500
-        assert "Error analyzing financial goals" in response.json()['detail']
+        assert "event: error" in response.text
+        assert "Error streaming query" in response.text
+        assert "event: done" in response.text
 
-@pytest.mark.parametrize("endpoint", [
-    "/ai/query",
-    "/ai/spending-advice",
-    "/ai/budget-template",
-    "/ai/analyze-goals"
-])
-@patch('api.API.AI_AVAILABLE', False)
-def test_ai_endpoints_when_ai_unavailable(endpoint):
+def test_ai_endpoints_when_ai_unavailable(client, monkeypatch):
     """Test that AI endpoints return appropriate error when AI is not available."""
+    # Every endpoint checks the same flag, so patch it once for all of them
+    monkeypatch.setattr(api_module, 'AI_AVAILABLE', False)
+    
     # Sample data for each endpoint
     sample_data = {
         "/ai/query": {"query": "How do I save money?"},
-        "/ai/spending-advice": {"year_in_school": "Junior", "major": "Engineering", "monthly_income": 1800, "financial_aid": 7500},
-        "/ai/budget-template": {"year_in_school": "Junior", "major": "Engineering", "monthly_income": 1800, "financial_aid": 7500},
+        "/ai/spending-advice": MIN_PROFILE,
+        "/ai/budget-template": MIN_PROFILE,
         "/ai/analyze-goals": {"goals": ["Save money"], "user_context": {"monthly_income": 1500}}
     }
     
-    # Send request to the endpoint
-    response = client.post(endpoint, json=sample_data[endpoint])
-    
-    # Assertions
-    assert response.status_code == 503
-    assert response.json()['detail'] == "AI features are not available"
+    for endpoint, data in sample_data.items():
+        # Send request to the endpoint
+        response = client.post(endpoint, json=data)
+        
+        # Assertions
+        assert response.status_code == 503, endpoint
+        assert response.json()['detail'] == "AI features are not available", endpoint
 
 class TestOpenAIConfigBehavior:
     """Test class for verifying endpoint behavior based on OpenAI configuration."""
     
-    @patch('api.API.AI_AVAILABLE', True)
-    def test_ai_query_endpoint_with_ai_available(self, mock_ai_assistant):
-        """Test that AI query endpoint works when AI is available."""
-        # Arrange
-        query = "How do I create a budget?"
-        user_context = {"year_in_school": "Freshman", "monthly_income": 1000}
-        
-        # Act
-        response = client.post(
-            "/ai/query",
-            json={"query": query, "user_context": user_context}
-        )
-        
-        # Assert
-        assert response.status_code == 200
-        data = response.json()
-        assert data["status"] == "success"
-        assert "response" in data
-        
-    @patch('api.API.AI_AVAILABLE', False)
-    def test_ai_query_endpoint_with_ai_unavailable(self):
+    def test_ai_query_endpoint_with_ai_unavailable(self, client, monkeypatch):
         """Test that AI query endpoint returns appropriate message when AI is disabled."""
         # Arrange
+        monkeypatch.setattr(api_module, 'AI_AVAILABLE', False)
         query = "How do I create a budget?"
         
         # Act
@@ -331,41 +284,36 @@ class TestOpenAIConfigBehavior:
         assert "detail" in data
         assert "AI features are not available" in data["detail"]
     
-    @patch('api.API.AI_AVAILABLE', True)
-    @patch('api.API.ai_assistant.openai_api_key', None)  # Simulate missing API key
-    def test_ai_query_endpoint_with_missing_api_key(self):
+    def test_ai_query_endpoint_with_missing_api_key(self, client, monkeypatch):
         """Test that AI query endpoint handles missing API key correctly."""
-        # Arrange - mock the process_user_query to return an error response
-        with patch('api.API.ai_assistant.process_user_query') as mock_process_query:
-            mock_process_query.return_value = {
-                "status": "error",
-                "error": "OpenAI API key not set",
-                "response": "Sorry, I'm not able to process your request at the moment."
-            }
-            
-            # Act
-            query = "How do I create a budget?"
-            response = client.post(
-                "/ai/query",
-                json={"query": query}
-            )
-            
-            # Assert - the server should not return 500 but instead pass through the error from the AI component
-            assert response.status_code == 200
-            data = response.json()
-            assert data["status"] == "error"
-            assert "OpenAI API key not set" in data["error"]
+        # Arrange - simulate a missing API key, and mock the process_user_query to return an error response
+        monkeypatch.setattr(api_module, 'AI_AVAILABLE', True)
+        monkeypatch.setattr(api_module.ai_assistant, 'openai_api_key', None)
+        monkeypatch.setattr(api_module.ai_assistant, 'process_user_query', MagicMock(return_value={
+            "status": "error",
+            "error": "OpenAI API key not set",
+            "response": "Sorry, I'm not able to process your request at the moment."
+        }))
+        
+        # Act
+        query = "How do I create a budget?"
+        response = client.post(
+            "/ai/query",
+            json={"query": query}
+        )
+        
+        # Assert - the server should not return 500 but instead pass through the error from the AI component
+        assert response.status_code == 200
+        data = response.json()
+        assert data["status"] == "error"
+        assert "OpenAI API key not set" in data["error"]
     
-    @patch('api.API.AI_AVAILABLE', True)
-    @patch('openai.OpenAI')
-    def test_ai_endpoint_with_rate_limit_error(self, mock_openai_client, mock_ai_assistant):
+    def test_ai_endpoint_with_rate_limit_error(self, client, monkeypatch, mock_ai_assistant):
         """Test AI endpoint behavior when OpenAI rate limit is exceeded."""
         # Arrange
-        mock_client = MagicMock()
-        mock_openai_client.return_value = mock_client
-        mock_client.chat.completions.create.side_effect = Exception("Rate limit exceeded")
+        monkeypatch.setattr(api_module, 'AI_AVAILABLE', True)
         
-        # Override the mock_ai_assistant to use our custom mock - but return a properly formatted error
+        # The assistant is mocked, so OpenAI is never called; have it report the rate limit error it would return
         mock_ai_assistant.process_user_query.return_value = {
             "status": "error",
             "error": "Rate limit exceeded",
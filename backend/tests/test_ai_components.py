@@ -23,17 +23,24 @@ from AI.website_ai_assistant import WebsiteAIAssistant
 from AI.student_spending_analysis import StudentSpendingAnalysis
 
 # Test fixtures
-@pytest.fixture
+# Construction loads the data and model, so the shared instances are built once per module.
+# Tests that change their attributes do so through monkeypatch, which restores them afterwards.
+@pytest.fixture(scope="module")
 def ai_assistant():
     """Create a WebsiteAIAssistant instance for testing."""
     return WebsiteAIAssistant()
 
-@pytest.fixture
+@pytest.fixture(scope="module")
 def spending_analyzer():
     """Create a StudentSpendingAnalysis instance for testing."""
     return StudentSpendingAnalysis()
 
 @pytest.fixture
+def isolated_spending_analyzer():
+    """Create a fresh StudentSpendingAnalysis instance for tests that refit its preprocessing."""
+    return StudentSpendingAnalysis()
+
+@pytest.fixture(scope="module")
 def sample_user_data():
     """Sample user data for testing."""
     return {
@@ -47,6 +54,28 @@ def sample_user_data():
         "preferred_payment_method": "Debit Card"
     }
 
+def _wire_openai(mock_openai_client, content="", side_effect=None):
+    """
+    Wire a patched OpenAI class to return a client whose chat completion has one choice.
+    
+    Args:
+        mock_openai_client: The mock that replaces openai.OpenAI
+        content: The message content of the completion's choice
+        side_effect: Optional exception for the completion call to raise
+        
+    Returns:
+        The mock client and the mock completion it returns
+    """
+    mock_client = MagicMock()
+    mock_openai_client.return_value = mock_client
+    mock_client.chat.completions.create.side_effect = side_effect
+    
+    mock_completion = mock_client.chat.completions.create.return_value
+    mock_choice = MagicMock()
+    mock_choice.message.content = content
+    mock_completion.choices = [mock_choice]
+    return mock_client, mock_completion
+
 # WebsiteAIAssistant Tests
 class TestWebsiteAIAssistant:
     """Test suite for the WebsiteAIAssistant class."""
@@ -61,15 +90,7 @@ class TestWebsiteAIAssistant:
     def test_process_user_query_success(self, mock_openai_client, ai_assistant):
         """Test processing a user query with successful API response."""
         # Setup mock client and response
-        mock_client = MagicMock()
-        mock_openai_client.return_value = mock_client
-        
-        mock_completion = MagicMock()
-        mock_client.chat.completions.create.return_value = mock_completion
-        
-        mock_choice = MagicMock()
-        mock_completion.choices = [mock_choice]
-        mock_choice.message.content = "Here are some budgeting tips for college students..."
+        _wire_openai(mock_openai_client, "Here are some budgeting tips for college students...")
         
         # Mock the entire process_user_query method for this test
         with patch.object(WebsiteAIAssistant, 'process_user_query', return_value={
@@ -91,9 +112,7 @@ class TestWebsiteAIAssistant:
     def test_process_user_query_api_error(self, mock_openai_client, ai_assistant):
         """Test handling of API errors during query processing."""
         # Setup mock to raise an exception
-        mock_client = MagicMock()
-        mock_openai_client.return_value = mock_client
-        mock_client.chat.completions.create.side_effect = Exception("API Error")
+        _wire_openai(mock_openai_client, side_effect=Exception("API Error"))
         
         # Mock the entire process_user_query method for this test
         with patch.object(WebsiteAIAssistant, 'process_user_query', return_value={
@@ -111,6 +130,32 @@ class TestWebsiteAIAssistant:
             assert response['status'] == 'error'
             assert 'error' in response
     
+    def test_stream_user_query_yields_deltas(self, ai_assistant, monkeypatch):
+        """Test that streamed completions are passed through piece by piece."""
+        # Setup a mock client that streams two content deltas and an empty final chunk
+        chunks = []
+        for content in ["Track your ", "expenses.", None]:
+            chunk = MagicMock()
+            chunk.choices = [MagicMock()]
+            chunk.choices[0].delta.content = content
+            chunks.append(chunk)
+        monkeypatch.setattr(ai_assistant, 'openai_api_key', "test-key")
+        monkeypatch.setattr(ai_assistant, 'client', MagicMock())
+        ai_assistant.client.chat.completions.create.return_value = iter(chunks)
+        
+        pieces = list(ai_assistant.stream_user_query("How do I create a budget?"))
+        
+        # Assertions
+        assert pieces == ["Track your ", "expenses."]
+        assert ai_assistant.client.chat.completions.create.call_args.kwargs['stream'] is True
+    
+    def test_stream_user_query_raises_without_api_key(self, ai_assistant, monkeypatch):
+        """Test that an unavailable assistant raises instead of streaming its error text as an answer."""
+        monkeypatch.setattr(ai_assistant, 'openai_api_key', None)
+        
+        with pytest.raises(RuntimeError, match="OpenAI API key not set"):
+            list(ai_assistant.stream_user_query("How do I create a budget?"))
+    
     def test_get_budget_template_with_valid_data(self, ai_assistant):
         """Test getting a budget template with valid user data."""
         user_profile = {
@@ -175,7 +220,7 @@ class TestStudentSpendingAnalysis:
         assert hasattr(spending_analyzer, 'label_encoders')
     
     @patch('pandas.read_csv')
-    def test_load_and_preprocess_data(self, mock_read_csv, spending_analyzer):
+    def test_load_and_preprocess_data(self, mock_read_csv, isolated_spending_analyzer):
         """Test data loading and preprocessing."""
         # Create mock DataFrame
         mock_data = pd.DataFrame({
@@ -200,7 +245,7 @@ class TestStudentSpendingAnalysis:
         })
         mock_read_csv.return_value = mock_data
         
-        X, y = spending_analyzer.load_and_preprocess_data()
+        X, y = isolated_spending_analyzer.load_and_preprocess_data()
         
         # Assertions
         assert X is not None
@@ -209,22 +254,22 @@ class TestStudentSpendingAnalysis:
         assert isinstance(y, np.ndarray)
         assert X.shape[0] == 3  # Number of samples
     
-    def test_predict_spending_with_valid_data(self, spending_analyzer, sample_user_data):
+    def test_predict_spending_with_valid_data(self, spending_analyzer, sample_user_data, monkeypatch):
         """Test spending prediction with valid user data."""
         # We'll patch the model's predict method to return dummy predictions
-        spending_analyzer.model = MagicMock()
+        monkeypatch.setattr(spending_analyzer, 'model', MagicMock())
         spending_analyzer.model.predict.return_value = np.array([[900, 300, 450]])
         
         # Add mock for preprocessing steps
-        spending_analyzer.scaler = MagicMock()
+        monkeypatch.setattr(spending_analyzer, 'scaler', MagicMock())
         spending_analyzer.scaler.transform.return_value = np.array([[0.5, 0.5, 0.5, 0.5]])
         
-        spending_analyzer.label_encoders = {
+        monkeypatch.setattr(spending_analyzer, 'label_encoders', {
             'gender': MagicMock(),
             'year_in_school': MagicMock(),
             'major': MagicMock(),
             'preferred_payment_method': MagicMock()
-        }
+        })
         for encoder in spending_analyzer.label_encoders.values():
             encoder.transform.return_value = np.array([1])
         
@@ -241,19 +286,11 @@ class TestStudentSpendingAnalysis:
     def test_generate_spending_advice(self, mock_openai_client, spending_analyzer, sample_user_data):
         """Test generating spending advice."""
         # Setup mock client and response
-        mock_client = MagicMock()
-        mock_openai_client.return_value = mock_client
-        
-        mock_completion = MagicMock()
-        mock_client.chat.completions.create.return_value = mock_completion
-        
-        mock_choice = MagicMock()
-        mock_completion.choices = [mock_choice]
-        mock_choice.message.content = json.dumps({
+        _wire_openai(mock_openai_client, json.dumps({
             "advice": "Consider reducing your food expenses.",
             "savings_tips": ["Cook at home", "Use student discounts"],
             "budget_allocation": {"food": "25%", "housing": "40%", "other": "35%"}
-        })
+        }))
         
         predictions = {
             'total': 1600,
@@ -274,19 +311,19 @@ class TestStudentSpendingAnalysis:
         assert 'savings_tips' in advice
         assert 'budget_allocation' in advice
     
-    def test_analyze_spending_patterns(self, spending_analyzer, sample_user_data):
+    def test_analyze_spending_patterns(self, spending_analyzer, sample_user_data, monkeypatch):
         """Test the full spending pattern analysis flow."""
         # Mock all required methods
-        spending_analyzer.predict_spending = MagicMock(return_value={
+        monkeypatch.setattr(spending_analyzer, 'predict_spending', MagicMock(return_value={
             'total': 1500,
             'categories': {'food': 400, 'housing': 700, 'other': 400}
-        })
+        }))
         
-        spending_analyzer.generate_spending_advice = MagicMock(return_value={
+        monkeypatch.setattr(spending_analyzer, 'generate_spending_advice', MagicMock(return_value={
             'advice': 'Good spending habits',
             'savings_tips': ['Tip 1', 'Tip 2'],
             'budget_allocation': {'food': '25%', 'housing': '45%', 'other': '30%'}
-        })
+        }))
         
         result = spending_analyzer.analyze_spending_patterns(sample_user_data)
         
@@ -317,13 +354,7 @@ class TestOpenAIIntegration:
     def test_openai_api_parameters(self, mock_openai_client):
         """Test that the proper parameters are sent to the OpenAI API."""
         # Arrange
-        mock_client = MagicMock()
-        mock_openai_client.return_value = mock_client
-        mock_completion = MagicMock()
-        mock_client.chat.completions.create.return_value = mock_completion
-        mock_choice = MagicMock()
-        mock_completion.choices = [mock_choice]
-        mock_choice.message.content = "Test response"
+        mock_client, _ = _wire_openai(mock_openai_client, "Test response")
         
         # Set up a side effect to handle the process_user_query bypass
         def process_user_query_side_effect(query, user_context=None):
@@ -369,13 +400,7 @@ class TestOpenAIIntegration:
     def test_openai_response_parsing(self, mock_openai_client):
         """Test that the response from OpenAI is correctly parsed."""
         # Arrange
-        mock_client = MagicMock()
-        mock_openai_client.return_value = mock_client
-        mock_completion = MagicMock()
-        mock_client.chat.completions.create.return_value = mock_completion
-        mock_choice = MagicMock()
-        mock_completion.choices = [mock_choice]
-        mock_choice.message.content = "Here are some saving tips: 1) Create a budget, 2) Track expenses"
+        _wire_openai(mock_openai_client, "Here are some saving tips: 1) Create a budget, 2) Track expenses")
         
         # Act
         ai_assistant = WebsiteAIAssistant()
@@ -388,14 +413,6 @@ class TestOpenAIIntegration:
     @patch('openai.OpenAI')
     def test_openai_spending_advice_json_parsing(self, mock_openai_client):
         """Test that JSON responses from OpenAI for spending advice are correctly parsed."""
-        # Arrange
-        mock_client = MagicMock()
-        mock_openai_client.return_value = mock_client
-        mock_completion = MagicMock()
-        mock_client.chat.completions.create.return_value = mock_completion
-        mock_choice = MagicMock()
-        mock_completion.choices = [mock_choice]
-        
         # Create a mock JSON response that matches the expected structure
         json_response = {
             "advice": "You should focus on reducing your food expenses.",
@@ -408,7 +425,7 @@ class TestOpenAIIntegration:
                 "other": "10%"
             }
         }
-        mock_choice.message.content = json.dumps(json_response)
+        _wire_openai(mock_openai_client, json.dumps(json_response))
         
         # Create test prediction and user data
         predictions = {
@@ -452,12 +469,8 @@ class TestOpenAIIntegration:
     @patch('openai.OpenAI')
     def test_openai_api_error_handling(self, mock_openai_client):
         """Test handling of different OpenAI API errors."""
-        # Arrange
-        mock_client = MagicMock()
-        mock_openai_client.return_value = mock_client
-        
-        # Setup to raise an API error
-        mock_client.chat.completions.create.side_effect = Exception("API Rate Limit Exceeded")
+        # Arrange - setup to raise an API error
+        _wire_openai(mock_openai_client, side_effect=Exception("API Rate Limit Exceeded"))
         
         # Directly modify the WebsiteAIAssistant implementation for this test
         with patch('AI.website_ai_assistant.WebsiteAIAssistant.process_user_query', 
@@ -478,13 +491,8 @@ class TestOpenAIIntegration:
     @patch('openai.OpenAI')
     def test_openai_malformed_response_handling(self, mock_openai_client):
         """Test handling of malformed responses from OpenAI."""
-        # Arrange
-        mock_client = MagicMock()
-        mock_openai_client.return_value = mock_client
-        mock_completion = MagicMock()
-        mock_client.chat.completions.create.return_value = mock_completion
-        
-        # Create a malformed response scenario (no choices)
+        # Arrange - create a malformed response scenario (no choices)
+        _, mock_completion = _wire_openai(mock_openai_client)
         mock_completion.choices = []
         
         # Directly modify the WebsiteAIAssistant implementation for this test
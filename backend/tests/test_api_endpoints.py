@@ -6,15 +6,23 @@ It verifies that the API behaves correctly for various scenarios including:
 - Creating, retrieving, and validating users
 - Creating and retrieving transactions
 - Creating, retrieving, and updating financial goals
+- The /api endpoints and the helpers behind them (finance summaries, budgets,
+  spending analysis, goals, authentication and their caches)
 
 These tests use pytest fixtures defined in conftest.py to set up test data and clients.
+Tests using the db_collections or mock_collection fixtures run without a MongoDB server.
 """
+import asyncio  # For running the async helpers directly
 import pytest  # Testing framework
 import json  # For JSON manipulation
 from bson import ObjectId  # MongoDB's unique identifier type
 from datetime import datetime, timedelta  # For date and time operations
+from unittest.mock import patch, MagicMock, AsyncMock  # For mocking the database
+from pymongo.errors import PyMongoError  # For simulating database failures
 
-from tests.conftest import create_test_user, create_test_transaction, create_test_goal  # Helper functions for test data
+from api import API  # The API module, for its helpers and caches
+
+from tests.conftest import create_test_user, create_test_goal  # Helper functions for test data
 
 class TestUserEndpoints:
     """
@@ -113,6 +121,49 @@ class TestUserEndpoints:
         # Check response
         assert response.status_code == 404  # Expect 404 Not Found
         assert "User not found" in response.json()["detail"]  # Check error message
+    
+    def test_create_user_conflict_comes_from_unique_index(self, client, db_collections):
+        """An existing username is reported from the insert's DuplicateKeyError, with no lookup first."""
+        users = db_collections[API.Collections.USERS]
+        users.insert_one = AsyncMock(side_effect=API.DuplicateKeyError(
+            "duplicate key", 11000, {"keyPattern": {"username": 1}}
+        ))
+        
+        with patch('api.database_api.has_unique_user_indexes', return_value=True):
+            response = client.post("/db/users", json={"username": "taken", "email": "a@b.c",
+                                                      "password": "secret", "name": "A B"})
+        
+        assert response.status_code == 400
+        assert response.json()["detail"] == "Username already registered"
+        users.find_one.assert_not_called()
+    
+    def test_create_user_checks_for_duplicates_without_unique_indexes(self, client, db_collections):
+        """If the unique indexes are missing, an existing email is found before inserting."""
+        users = db_collections[API.Collections.USERS]
+        users.find_one = AsyncMock(return_value={"_id": API.ObjectId(), "username": "other"})
+        users.insert_one = AsyncMock()
+        
+        with patch('api.database_api.has_unique_user_indexes', return_value=False):
+            response = client.post("/db/users", json={"username": "new", "email": "a@b.c",
+                                                      "password": "secret", "name": "A B"})
+        
+        assert response.status_code == 400
+        assert response.json()["detail"] == "Email already registered"
+        users.insert_one.assert_not_called()
+    
+    def test_create_user_responds_from_inserted_document(self, client, db_collections):
+        """The created user is returned from the inserted data, with its creation time stored."""
+        users = db_collections[API.Collections.USERS]
+        users.insert_one = AsyncMock(return_value=MagicMock(inserted_id=API.ObjectId("507f1f77bcf86cd799439011")))
+        
+        with patch('api.database_api.has_unique_user_indexes', return_value=True):
+            response = client.post("/db/users", json={"username": "new", "email": "a@b.c",
+                                                      "password": "secret", "name": "A B"})
+        
+        body = response.json()
+        assert body["id"] == "507f1f77bcf86cd799439011"
+        assert "password" not in body
+        assert "createdAt" in users.insert_one.call_args.args[0]
 
 class TestTransactionEndpoints:
     """
@@ -175,7 +226,7 @@ class TestTransactionEndpoints:
         assert response.status_code == 404  # Expect 404 Not Found
         assert "User not found" in response.json()["detail"]  # Check error message
     
-    def test_get_user_transactions(self, client, db):
+    def test_get_user_transactions(self, client, seeded_db):
         """
         Test getting all transactions for a user.
         
@@ -184,22 +235,10 @@ class TestTransactionEndpoints:
         
         Args:
             client: FastAPI test client from fixture
-            db: Test database from fixture
+            seeded_db: Test data inserted by the seeded_db fixture
         """
-        # Create user in the database directly (not through the API)
-        create_test_user(db)
-        
-        # Create a transaction in the database directly
-        transaction_data = create_test_transaction(db)
-        
-        # Create another transaction in the database directly
-        db["Transactions"].insert_one({
-            "userId": transaction_data["userId"],
-            "amount": 25.00,
-            "category": "Transport",
-            "description": "Bus fare",
-            "date": datetime.now()
-        })
+        # The user and two transactions are already in the database
+        transaction_data = seeded_db["transactions"][0]
         
         # Get transactions through the API
         response = client.get(f"/db/transactions/user/{transaction_data['userId']}")
@@ -211,6 +250,35 @@ class TestTransactionEndpoints:
         # Verify transaction data in response
         assert data[0]["userId"] == transaction_data["userId"]  # Check user ID in first transaction
         assert data[1]["userId"] == transaction_data["userId"]  # Check user ID in second transaction
+    
+    def test_get_user_transactions_awaits_motor(self, client, db_collections):
+        """The /db routes read through the async database instead of blocking PyMongo calls."""
+        from api.database_api import TRANSACTION_RESPONSE_PROJECTION
+        
+        transactions = db_collections[API.Collections.TRANSACTIONS]
+        transactions.find.return_value.to_list = AsyncMock(return_value=[
+            {"_id": API.ObjectId("507f1f77bcf86cd799439011"), "userId": "user1", "amount": 5,
+             "category": "Food", "description": "Lunch", "date": API.datetime(2024, 3, 1)}
+        ])
+        
+        response = client.get("/db/transactions/user/user1")
+        
+        assert response.json()[0]["id"] == "507f1f77bcf86cd799439011"
+        transactions.find.assert_called_once_with({"userId": "user1"}, TRANSACTION_RESPONSE_PROJECTION, batch_size=500)
+    
+    def test_large_list_is_gzipped(self, client, db_collections):
+        """Large list responses are compressed for clients that accept gzip."""
+        transactions = db_collections[API.Collections.TRANSACTIONS]
+        transactions.find.return_value.to_list = AsyncMock(return_value=[
+            {"_id": API.ObjectId(), "userId": "user1", "amount": 5, "category": "Food",
+             "description": "Lunch", "date": API.datetime(2024, 3, 1)}
+            for _ in range(50)
+        ])
+        
+        response = client.get("/db/transactions/user/user1", headers={"Accept-Encoding": "gzip"})
+        
+        assert response.headers["content-encoding"] == "gzip"
+        assert len(response.json()) == 50
 
 class TestFinancialGoalEndpoints:
     """
@@ -274,7 +342,7 @@ class TestFinancialGoalEndpoints:
         assert response.status_code == 404  # Expect 404 Not Found
         assert "User not found" in response.json()["detail"]  # Check error message
     
-    def test_get_user_goals(self, client, db):
+    def test_get_user_goals(self, client, seeded_db):
         """
         Test getting all goals for a user.
         
@@ -283,22 +351,10 @@ class TestFinancialGoalEndpoints:
         
         Args:
             client: FastAPI test client from fixture
-            db: Test database from fixture
+            seeded_db: Test data inserted by the seeded_db fixture
         """
-        # Create user in the database directly (not through the API)
-        create_test_user(db)
-        
-        # Create a goal in the database directly
-        goal_data = create_test_goal(db)
-        
-        # Create another goal in the database directly
-        db["FinancialGoals"].insert_one({
-            "userId": goal_data["userId"],
-            "targetAmount": 5000.00,
-            "currentAmount": 1000.00,
-            "category": "Education",
-            "deadline": datetime.now() + timedelta(days=365)
-        })
+        # The user and two goals are already in the database
+        goal_data = seeded_db["goals"][0]
         
         # Get goals through the API
         response = client.get(f"/db/goals/user/{goal_data['userId']}")
@@ -370,4 +426,1089 @@ class TestFinancialGoalEndpoints:
         
         # Check response
         assert response.status_code == 404  # Expect 404 Not Found
-        assert "Goal not found" in response.json()["detail"]  # Check error message 
\ No newline at end of file
+        assert "Goal not found" in response.json()["detail"]  # Check error message
+    
+    def test_update_goal_in_single_call(self, client, db_collections):
+        """A goal is updated and returned by one find_one_and_update."""
+        goals = db_collections[API.Collections.FINANCIAL_GOALS]
+        goals.find_one_and_update = AsyncMock(return_value={
+            "_id": API.ObjectId("507f1f77bcf86cd799439011"), "userId": "user1", "targetAmount": 500,
+            "currentAmount": 50, "category": "Trip", "name": "Trip", "deadline": API.datetime(2025, 6, 1)
+        })
+        
+        response = client.put("/db/goals/507f1f77bcf86cd799439011", json={"currentAmount": 50})
+        
+        assert response.json()["deadline"] == "2025-06-01T00:00:00"
+        assert goals.find_one_and_update.call_args.args[1] == {"$set": {"currentAmount": 50}}
+        goals.find_one.assert_not_called()
+    
+    def test_update_goal_rejects_malformed_id(self, client, db_collections):
+        """A malformed goal ID is a 400 before any database call."""
+        response = client.put("/db/goals/not-an-id", json={"currentAmount": 50})
+        
+        assert response.status_code == 400
+        assert not db_collections
+
+class TestResponseHelpers:
+    """Tests for the helpers that build the /db responses."""
+    
+    def test_normalize_converts_ids_and_dates(self):
+        """ObjectIds and datetimes become strings and _id becomes id."""
+        from api.database_api import _normalize
+        
+        doc = {"_id": API.ObjectId("507f1f77bcf86cd799439011"), "userId": "user1",
+               "amount": 12.5, "date": API.datetime(2024, 3, 1, 9, 30)}
+        
+        assert _normalize(doc) == {"id": "507f1f77bcf86cd799439011", "userId": "user1",
+                                   "amount": 12.5, "date": "2024-03-01T09:30:00"}
+    
+    def test_respond_skips_validation_and_extra_fields(self):
+        """Responses are built without validation but keep only the model's fields."""
+        from api.database_api import _respond, TransactionResponse
+        
+        response = _respond(TransactionResponse, [{"id": "t1", "userId": "user1", "amount": 5,
+                                                   "category": "Food", "description": "Lunch",
+                                                   "date": "2024-03-01T09:30:00", "internal": True}])
+        
+        assert API.orjson.loads(response.body) == [{"id": "t1", "userId": "user1", "amount": 5,
+                                                    "category": "Food", "description": "Lunch",
+                                                    "date": "2024-03-01T09:30:00"}]
+
+class TestSummarizeFinances:
+    """Test suite for the single-pass transaction aggregation."""
+    
+    def test_totals_and_category_breakdown(self, sample_transactions):
+        """Typed, categorised and uncategorised transactions are all classified."""
+        total_income, total_expenses, category_spending = API.summarize_finances(sample_transactions)
+        
+        assert total_income == 2150
+        assert total_expenses == 700 - 45.5 - 20
+        assert category_spending == {"Salary": 2000, "Food": 65.5, "Rent": 700}
+    
+    def test_blank_category_expense_is_uncategorized(self):
+        """Typed expenses without a category are grouped under 'Uncategorized'."""
+        _, total_expenses, category_spending = API.summarize_finances([
+            {"amount": -30, "type": "expense", "category": "  "}
+        ])
+        
+        assert total_expenses == -30
+        assert category_spending == {"Uncategorized": 30}
+    
+    def test_empty_transactions(self):
+        """No transactions produce zero totals and an empty breakdown."""
+        assert API.summarize_finances([]) == (0, 0, {})
+
+class TestIsExpenseTransaction:
+    """Test suite for the shared expense classification rule."""
+    
+    @pytest.mark.parametrize("transaction_type, category, expected", [
+        ("expense", "", True),
+        ("EXPENSE", None, True),
+        ("income", "Food", True),
+        ("income", "  ", False),
+        (None, "Food", True),
+        (None, "", False),
+        (None, None, False),
+    ])
+    def test_classification(self, transaction_type, category, expected):
+        """Typed expenses and categorised transactions are expenses."""
+        assert API.is_expense_transaction(transaction_type, category) is expected
+
+class TestFinanceSummaryCache:
+    """Test suite for the per-user finance summary cache."""
+    
+    def test_summary_is_cached_per_user(self, mock_collection):
+        """Repeated lookups for the same user only query the database once."""
+        first = asyncio.run(API.get_finance_summary("user1"))
+        second = asyncio.run(API.get_finance_summary("user1"))
+        
+        assert first == second
+        mock_collection.find.assert_called_once()
+        assert mock_collection.find.call_args.args[0] == {"user_id": "user1"}
+    
+    def test_cache_entry_can_be_invalidated(self, mock_collection):
+        """Dropping a user's entry forces the next lookup to hit the database."""
+        asyncio.run(API.get_finance_summary("user1"))
+        API.finance_summary_cache.pop("user1", None)
+        asyncio.run(API.get_finance_summary("user1"))
+        
+        assert mock_collection.find.call_count == 2
+
+class TestUserWithFinanceSummary:
+    """Test suite for fetching a user and their finance summary together."""
+    
+    user_id = "507f1f77bcf86cd799439011"
+    
+    def test_uncached_lookup_uses_single_aggregate(self, mock_collection, sample_transactions):
+        """Without a cached summary the user and transactions come from one aggregate call."""
+        mock_collection.aggregate.return_value.to_list.return_value = [
+            {"_id": API.ObjectId(self.user_id), "name": "Test User", "transactions": sample_transactions}
+        ]
+        
+        user, summary = asyncio.run(API.get_user_with_finance_summary(self.user_id))
+        
+        assert user == {"_id": API.ObjectId(self.user_id), "name": "Test User"}
+        assert summary == API.summarize_finances(sample_transactions)
+        assert API.finance_summary_cache[self.user_id] == summary
+        mock_collection.aggregate.assert_called_once()
+        mock_collection.find_one.assert_not_called()
+    
+    def test_cached_summary_only_fetches_user(self, mock_collection):
+        """With a cached summary only the user document is fetched."""
+        API.finance_summary_cache[self.user_id] = (100, 50, {"Food": 50})
+        mock_collection.find_one.return_value = {"name": "Test User"}
+        
+        user, summary = asyncio.run(API.get_user_with_finance_summary(self.user_id))
+        
+        assert user == {"name": "Test User"}
+        assert summary == (100, 50, {"Food": 50})
+        mock_collection.aggregate.assert_not_called()
+
+class TestBudgetBreakdown:
+    """Test suite for the server-side budget breakdown."""
+    
+    def test_groups_are_converted_to_dicts(self, mock_collection):
+        """Grouped totals come back as dictionaries with blank groups labelled."""
+        mock_collection.aggregate.return_value.to_list.return_value = [{
+            "spending": [{"_id": "Food", "total": 65.5}, {"_id": "", "total": 30}],
+            "income": [{"_id": "Salary", "total": 2000}, {"_id": "", "total": 150}]
+        }]
+        
+        category_spending, income_sources = asyncio.run(API.get_budget_breakdown("user1"))
+        
+        assert category_spending == {"Food": 65.5, "Uncategorized": 30}
+        assert income_sources == {"Salary": 2000, "Other Income": 150}
+        pipeline = mock_collection.aggregate.call_args.args[0]
+        assert pipeline[0] == {"$match": {"user_id": "user1"}}
+    
+    def test_no_transactions(self, mock_collection):
+        """A user without transactions gets empty breakdowns."""
+        mock_collection.aggregate.return_value.to_list.return_value = []
+        
+        assert asyncio.run(API.get_budget_breakdown("user1")) == ({}, {})
+
+class TestUserTransactions:
+    """Test suite for streaming a user's transactions."""
+    
+    def test_transactions_are_streamed_as_json_array(self, client, mock_collection):
+        """Each document is converted and written to the response array."""
+        mock_collection.find.return_value.__aiter__.return_value = [
+            {"_id": API.ObjectId("507f1f77bcf86cd799439011"), "user_id": "user1", "amount": -45.5,
+             "category": "Food", "description": "Lunch", "date": API.datetime(2024, 3, 1, 12, 0)},
+            {"_id": API.ObjectId("507f1f77bcf86cd799439012"), "user_id": "user1", "amount": 2000,
+             "category": "Salary", "description": "Pay", "date": API.datetime(2024, 3, 2)}
+        ]
+        
+        response = client.get("/api/transactions/user/user1")
+        
+        assert response.status_code == 200
+        assert response.json() == [
+            {"user_id": "user1", "amount": -45.5, "category": "Food", "description": "Lunch",
+             "date": "2024-03-01T12:00:00", "id": "507f1f77bcf86cd799439011"},
+            {"user_id": "user1", "amount": 2000, "category": "Salary", "description": "Pay",
+             "date": "2024-03-02T00:00:00", "id": "507f1f77bcf86cd799439012"}
+        ]
+    
+    def test_no_transactions(self, client, mock_collection):
+        """A user without transactions gets an empty array."""
+        mock_collection.find.return_value.__aiter__.return_value = []
+        
+        response = client.get("/api/transactions/user/user1")
+        
+        assert response.json() == []
+
+class TestBudgetUpdates:
+    """Test suite for updating and deleting budgets."""
+    
+    budget_id = "507f1f77bcf86cd799439011"
+    budget = {"user_id": "user1", "category": "Food", "amount": 300, "period": "monthly"}
+    
+    def test_update_returns_document_from_single_call(self, client, mock_collection):
+        """The budget is updated and returned by one find_one_and_update."""
+        mock_collection.find_one_and_update = AsyncMock(return_value={
+            "_id": API.ObjectId(self.budget_id), **self.budget, "created_at": API.datetime(2024, 3, 1)
+        })
+        
+        response = client.put(f"/api/budgets/{self.budget_id}", json=self.budget)
+        
+        assert response.status_code == 200
+        assert response.json()["id"] == self.budget_id
+        assert response.json()["amount"] == 300
+        mock_collection.find_one.assert_not_called()
+    
+    def test_missing_budget_returns_404(self, client, mock_collection):
+        """Updating or deleting a budget that doesn't exist is a 404."""
+        mock_collection.find_one_and_update = AsyncMock(return_value=None)
+        mock_collection.find_one_and_delete = AsyncMock(return_value=None)
+        
+        assert client.put(f"/api/budgets/{self.budget_id}", json=self.budget).status_code == 404
+        assert client.delete(f"/api/budgets/{self.budget_id}").status_code == 404
+
+class TestPeriodBounds:
+    """Test suite for the analysis period date ranges."""
+    
+    now = API.datetime(2024, 3, 14, 15, 30)  # A Thursday
+    
+    @pytest.mark.parametrize("period, start", [
+        ("daily", API.datetime(2024, 3, 14)),
+        ("weekly", API.datetime(2024, 3, 11)),
+        ("monthly", API.datetime(2024, 3, 1)),
+        ("yearly", API.datetime(2024, 1, 1)),
+        ("unknown", API.datetime(2024, 3, 1)),
+    ])
+    def test_period_starts(self, period, start):
+        """Each period runs from its start up to now."""
+        assert API.get_period_bounds(period, self.now) == (start, self.now)
+    
+    def test_explicit_dates_take_priority(self):
+        """A custom start and end date override the period."""
+        assert API.get_period_bounds("daily", self.now, "2024-01-01", "2024-01-31") == (
+            API.datetime(2024, 1, 1), API.datetime(2024, 1, 31)
+        )
+
+class TestSpendingAnalysis:
+    """Test suite for the server-side spending analysis."""
+    
+    def test_totals_come_from_aggregate(self, client, mock_collection):
+        """The endpoint reports the grouped totals returned by MongoDB."""
+        mock_collection.aggregate.return_value.to_list.return_value = [{
+            "_id": None,
+            "by_category": [{"k": "Food", "v": 65.5}, {"k": "Rent", "v": 700}],
+            "total": 765.5
+        }]
+        
+        response = client.get("/api/analysis/spending/user1?period=yearly")
+        
+        assert response.status_code == 200
+        assert response.json()["total_spending"] == 765.5
+        assert response.json()["category_breakdown"] == {"Food": 65.5, "Rent": 700}
+        match = mock_collection.aggregate.call_args.args[0][0]["$match"]
+        assert match["user_id"] == "user1"
+    
+    def test_no_expenses_in_period(self, client, mock_collection):
+        """A period without expenses reports zero spending."""
+        mock_collection.aggregate.return_value.to_list.return_value = []
+        
+        response = client.get("/api/analysis/spending/user1?period=weekly")
+        
+        assert response.status_code == 200
+        assert response.json()["total_spending"] == 0
+        assert response.json()["category_breakdown"] == {}
+    
+    def test_monthly_period_reads_rolled_up_totals(self, client, mock_collection):
+        """The current month is read from the monthly totals instead of being aggregated."""
+        mock_collection.find.return_value.to_list.return_value = [
+            {"category": "Food", "expense_total": 65.5, "spent": 65.5},
+            {"category": "Salary", "expense_total": 0, "spent": 0}
+        ]
+        
+        response = client.get("/api/analysis/spending/user1")
+        
+        assert response.status_code == 200
+        assert response.json()["total_spending"] == 65.5
+        assert response.json()["category_breakdown"] == {"Food": 65.5}
+        # The only aggregation is the one-off refresh of the month's totals
+        pipeline = mock_collection.aggregate.call_args.args[0]
+        assert "$merge" in pipeline[-1]
+
+class TestSpendingInsights:
+    """Test suite for the budget comparison in spending insights."""
+    
+    def test_insights_compare_monthly_spending_with_budgets(self, client, mock_collection):
+        """This month's rolled-up totals are compared against the user's budgets."""
+        mock_collection.find.return_value.to_list.return_value = [
+            {"category": "Rent", "amount": 700},
+            {"category": "Food", "amount": 100},
+            {"category": "Bills", "amount": 150}
+        ]
+        monthly_totals = [
+            {"category": "Games", "expense_total": 20, "spent": 20},
+            {"category": "Food", "expense_total": 95, "spent": 95},
+            {"category": "Gift", "expense_total": 50, "spent": 0}
+        ]
+        
+        with patch('api.API.get_monthly_category_totals', AsyncMock(return_value=monthly_totals)):
+            response = client.get("/api/analysis/insights/user1")
+        
+        assert response.status_code == 200
+        insights = response.json()["insights"]
+        assert "You've spent 95.0% of your Food budget." in insights
+        assert "You've spent $20.00 on Games without a budget." in insights
+        assert "You haven't spent anything on Rent yet this month." in insights
+        assert not any("Gift" in insight for insight in insights)
+        # Spending categories come first (in category order), then unused budgets
+        assert insights == [
+            "You've spent 95.0% of your Food budget.",
+            "You've spent $20.00 on Games without a budget.",
+            "You haven't spent anything on Bills yet this month.",
+            "You haven't spent anything on Rent yet this month."
+        ]
+
+class TestAnalyzeGoalsTotals:
+    """Test suite for the income and expense totals used in goal analysis."""
+    
+    def test_totals_come_from_grouped_aggregate(self, client, mock_collection):
+        """Income, expenses and savings are taken from the per-type totals."""
+        mock_collection.find.return_value.to_list.return_value = []
+        mock_collection.aggregate.return_value.to_list.return_value = [
+            {"_id": "income", "total": 2000},
+            {"_id": "expense", "total": 700}
+        ]
+        with patch('api.API.ai_assistant') as mock_assistant:
+            mock_assistant.analyze_financial_goals.return_value = {"status": "success"}
+            
+            response = client.post("/ai/analyze-goals", json={
+                "goals": ["Save for a laptop"],
+                "user_context": {"user_id": "user1"}
+            })
+        
+        assert response.status_code == 200
+        _, user_context = mock_assistant.analyze_financial_goals.call_args.args
+        assert user_context["monthly_income"] == 2000
+        assert user_context["monthly_expenses"] == 700
+        assert user_context["monthly_savings"] == 1300
+
+class TestUpdateBudgetForTransaction:
+    """Test suite for keeping budget spent totals up to date."""
+    
+    def test_spent_is_incremented_in_one_update(self, mock_collection):
+        """The budget is updated with a single atomic $inc and no prior read."""
+        mock_collection.update_one = AsyncMock()
+        
+        asyncio.run(API.update_budget_for_transaction({"user_id": "user1", "category": "Food", "amount": -45.5}))
+        
+        mock_collection.update_one.assert_awaited_once_with(
+            {"user_id": "user1", "category": "Food"},
+            {"$inc": {"spent": 45.5}}
+        )
+        mock_collection.find_one.assert_not_called()
+
+class TestMonthlyTotals:
+    """Test suite for the rolled-up monthly spending totals."""
+    
+    def test_transaction_is_added_to_its_month(self, mock_collection):
+        """A new transaction is listed and added to its user/month/category totals, once."""
+        mock_collection.update_one = AsyncMock()
+        
+        asyncio.run(API.update_monthly_totals_for_transaction({
+            "_id": "t1", "user_id": "user1", "category": "Food", "amount": -45.5, "date": API.datetime(2024, 3, 1)
+        }))
+        
+        mock_collection.update_one.assert_awaited_once_with(
+            {"user_id": "user1", "year": 2024, "month": 3, "category": "Food", "entries.id": {"$ne": "t1"}},
+            {"$push": {"entries": {"id": "t1", "expense_total": 45.5, "spent": 45.5}},
+             "$inc": {"expense_total": 45.5, "spent": 45.5}},
+            upsert=True
+        )
+    
+    def test_income_is_not_counted_as_spending(self, mock_collection):
+        """Uncategorised income doesn't add to either total."""
+        mock_collection.update_one = AsyncMock()
+        
+        asyncio.run(API.update_monthly_totals_for_transaction({
+            "_id": "t1", "user_id": "user1", "category": "", "amount": 150, "date": API.datetime(2024, 3, 1)
+        }))
+        
+        update = mock_collection.update_one.call_args.args[1]
+        assert update["$inc"] == {"expense_total": 0, "spent": 0}
+    
+    def test_already_counted_transaction_is_skipped(self, mock_collection, capsys):
+        """A transaction the month already lists makes the upsert collide, which isn't an error."""
+        mock_collection.update_one = AsyncMock(side_effect=API.DuplicateKeyError("duplicate key"))
+        
+        asyncio.run(API.update_monthly_totals_for_transaction({
+            "_id": "t1", "user_id": "user1", "category": "Food", "amount": -10, "date": API.datetime(2024, 3, 1)
+        }))
+        
+        assert "Error" not in capsys.readouterr().out
+    
+    def test_month_is_refreshed_once(self, mock_collection):
+        """The first read claims and rebuilds the month; later reads don't."""
+        asyncio.run(API.get_monthly_category_totals("user1", 2024, 12))
+        asyncio.run(API.get_monthly_category_totals("user2", 2024, 12))
+        
+        mock_collection.aggregate.assert_called_once()
+        pipeline = mock_collection.aggregate.call_args.args[0]
+        assert pipeline[0]["$match"] == {
+            "date": {"$gte": API.datetime(2024, 12, 1), "$lt": API.datetime(2025, 1, 1)},
+            "user_id": {"$type": "string"},
+            "category": {"$type": "string"}
+        }
+        merge = pipeline[-1]["$merge"]
+        assert merge["on"] == ["user_id", "year", "month", "category"]
+        # Existing documents are combined with the rebuild rather than replaced
+        assert isinstance(merge["whenMatched"], list)
+        # The claim, then marking the month as rebuilt
+        claim, done = mock_collection.update_one.await_args_list
+        assert claim.args[0]["_id"] == "2024-12"
+        assert claim.kwargs == {"upsert": True}
+        assert "refreshedAt" in done.args[1]["$set"]
+    
+    def test_month_rebuilt_elsewhere_is_not_rebuilt(self, mock_collection):
+        """A month another process has already rebuilt is only read."""
+        mock_collection.update_one.side_effect = API.DuplicateKeyError("duplicate key")
+        mock_collection.find_one.return_value = {"_id": "2024-12", "refreshedAt": API.datetime(2024, 12, 2)}
+        
+        asyncio.run(API.get_monthly_category_totals("user1", 2024, 12))
+        
+        mock_collection.aggregate.assert_not_called()
+        assert (2024, 12) in API.refreshed_months
+    
+    def test_month_being_rebuilt_elsewhere_is_checked_again(self, mock_collection):
+        """While another process holds the claim, the totals are read as they are and the claim is tried again later."""
+        mock_collection.update_one.side_effect = API.DuplicateKeyError("duplicate key")
+        mock_collection.find_one.return_value = {"_id": "2024-12"}
+        
+        asyncio.run(API.get_monthly_category_totals("user1", 2024, 12))
+        
+        mock_collection.aggregate.assert_not_called()
+        assert (2024, 12) not in API.refreshed_months
+    
+    def test_failed_refresh_releases_claim(self, mock_collection):
+        """A rebuild that fails gives up its claim, so the next read tries again."""
+        mock_collection.aggregate.return_value.to_list.side_effect = PyMongoError("down")
+        
+        with pytest.raises(PyMongoError):
+            asyncio.run(API.get_monthly_category_totals("user1", 2024, 10))
+        
+        mock_collection.delete_one.assert_awaited_once_with({"_id": "2024-10", "refreshedAt": {"$exists": False}})
+        assert (2024, 10) not in API.refreshed_months
+
+class TestCategoryResponseCache:
+    """Test suite for the cached category spending answers."""
+    
+    @pytest.fixture(autouse=True)
+    def clear_caches(self):
+        """Start and finish every test with empty caches."""
+        API.category_response_cache.clear()
+        API.finance_summary_cache.clear()
+        yield
+        API.category_response_cache.clear()
+        API.finance_summary_cache.clear()
+    
+    def test_response_is_cached_until_invalidated(self):
+        """Repeated questions reuse the answer until a new transaction is recorded."""
+        spending_data = {
+            "total_spent": 65.5,
+            "transactions": [{"description": "Lunch", "amount": -45.5, "date": "2024-03-01T12:00:00"}],
+            "percentage": 10.0,
+            "time_period": "All time",
+            "transaction_count": 1
+        }
+        with patch('api.API.get_category_spending', new_callable=AsyncMock, return_value=spending_data) as mock_spending:
+            first = asyncio.run(API.format_category_response("user1", "food"))
+            second = asyncio.run(API.format_category_response("user1", "food"))
+            API.invalidate_finance_caches("user1")
+            asyncio.run(API.format_category_response("user1", "food"))
+        
+        assert first == second
+        assert "$65.50 on Food" in first
+        assert "$45.50 on Lunch (Mar 01)" in first
+        assert mock_spending.call_count == 2
+    
+    def test_unparseable_dates_are_reported_as_unknown(self):
+        """Transaction dates that aren't ISO timestamps are shown as 'Unknown date'."""
+        spending_data = {
+            "total_spent": 30,
+            "transactions": [
+                {"description": "Bus", "amount": -10, "date": "2024-13-01T00:00:00"},
+                {"description": "Train", "amount": -20, "date": "None"}
+            ],
+            "percentage": 5.0,
+            "time_period": "All time",
+            "transaction_count": 2
+        }
+        with patch('api.API.get_category_spending', new_callable=AsyncMock, return_value=spending_data):
+            response = asyncio.run(API.format_category_response("user1", "transportation"))
+        
+        assert "$10.00 on Bus (Unknown date)" in response
+        assert "$20.00 on Train (Unknown date)" in response
+    
+    def test_remaining_transactions_are_counted(self):
+        """Transactions beyond the examples are summarised using the total count."""
+        spending_data = {
+            "total_spent": 60,
+            "transactions": [
+                {"description": f"Meal {i}", "amount": -10, "date": "2024-03-01T12:00:00"} for i in range(3)
+            ],
+            "percentage": 12.0,
+            "time_period": "All time",
+            "transaction_count": 6
+        }
+        with patch('api.API.get_category_spending', new_callable=AsyncMock, return_value=spending_data):
+            response = asyncio.run(API.format_category_response("user1", "dining"))
+        
+        assert response.endswith(", and 3 more transactions.")
+    
+    def test_failed_lookup_is_not_cached(self):
+        """Errors from the spending lookup are not stored in the cache."""
+        with patch('api.API.get_category_spending', new_callable=AsyncMock, return_value={"error": "boom", "transaction_count": 0}):
+            response = asyncio.run(API.format_category_response("user1", "rent"))
+        
+        assert "haven't recorded any spending on Rent" in response
+        assert "rent" not in API.category_response_cache.get("user1", {})
+
+class TestCategorySpending:
+    """Test suite for the per-category spending lookup."""
+    
+    def test_totals_come_from_single_aggregate(self, mock_collection):
+        """Category and expense totals are computed in MongoDB with one $facet call."""
+        mock_collection.aggregate.return_value.to_list.return_value = [{
+            "category": [{"_id": None, "total": 50, "count": 5,
+                          "oldest": API.datetime(2024, 3, 1), "newest": API.datetime(2024, 3, 5)}],
+            "examples": [{"amount": 30, "category": "Food", "description": "Lunch", "date": API.datetime(2024, 3, 1)}],
+            "expenses": [{"_id": None, "total": 200}]
+        }]
+        
+        spending = asyncio.run(API.get_category_spending("user1", "Food"))
+        
+        assert spending["total_spent"] == 50
+        assert spending["percentage"] == 25
+        assert spending["transaction_count"] == 5
+        assert spending["time_period"] == "Mar 01, 2024 to Mar 05, 2024"
+        assert spending["transactions"] == [
+            {"description": "Lunch", "amount": 30, "date": "2024-03-01T00:00:00", "category": "Food"}
+        ]
+        mock_collection.find.assert_not_called()
+        mock_collection.aggregate.assert_called_once()
+    
+    def test_category_matched_on_normalised_copy(self, mock_collection):
+        """Lookups match the lowercased category instead of scanning with a regex."""
+        asyncio.run(API.get_category_spending("user1", "Food"))
+        
+        pipeline = mock_collection.aggregate.call_args.args[0]
+        assert pipeline[0] == {"$match": {"user_id": "user1"}}
+        category_match = pipeline[1]["$facet"]["category"][0]["$match"]
+        assert category_match["$or"][0] == {"categoryLower": "food"}
+    
+    def test_no_transactions(self, mock_collection):
+        """A user without transactions in the category gets zero totals."""
+        spending = asyncio.run(API.get_category_spending("user1", "Food"))
+        
+        assert spending["total_spent"] == 0
+        assert spending["transaction_count"] == 0
+        assert spending["time_period"] == "All time"
+    
+    def test_new_transactions_store_normalised_category(self, client, mock_collection):
+        """Transactions are saved with a lowercased copy of their category."""
+        mock_collection.insert_one = AsyncMock(return_value=MagicMock(inserted_id="abc"))
+        mock_collection.update_one = AsyncMock()
+        
+        response = client.post("/api/transactions", json={
+            "user_id": "user1", "amount": -12.5, "category": " Food ", "description": "Lunch"
+        })
+        
+        assert mock_collection.insert_one.call_args.args[0]["categoryLower"] == "food"
+        assert "categoryLower" not in response.json()
+
+class TestCoalesceRead:
+    """Test suite for sharing identical in-flight reads."""
+    
+    def test_concurrent_identical_reads_share_one_call(self):
+        """Callers with the same key wait on the read that's already running."""
+        calls = []
+        
+        async def read():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return {"name": "Test User"}
+        
+        async def read_concurrently():
+            return await asyncio.gather(
+                API.coalesce_read(("profile", "user1"), read),
+                API.coalesce_read(("profile", "user1"), read),
+                API.coalesce_read(("profile", "user2"), read)
+            )
+        
+        results = asyncio.run(read_concurrently())
+        
+        assert results == [{"name": "Test User"}] * 3
+        assert len(calls) == 2
+        assert API.inflight_reads == {}
+    
+    def test_later_reads_run_again(self):
+        """Once a read finishes, the next caller starts a fresh one."""
+        read = AsyncMock(return_value=1)
+        
+        asyncio.run(API.coalesce_read(("health",), read))
+        asyncio.run(API.coalesce_read(("health",), read))
+        
+        assert read.await_count == 2
+
+class TestHealthCheck:
+    """Test suite for the health check endpoint."""
+    
+    @pytest.fixture(autouse=True)
+    def clear_health_cache(self):
+        """Start and finish each test without a cached health response."""
+        API.health_cache.clear()
+        yield
+        API.health_cache.clear()
+    
+    def test_healthy_response_is_reused(self, client, mock_collection):
+        """Polling within the TTL doesn't ping MongoDB again."""
+        first = client.get("/api/health").json()
+        second = client.get("/api/health").json()
+        
+        assert first["status"] == "healthy"
+        assert first == second
+        mock_collection.find_one.assert_awaited_once()
+    
+    def test_unhealthy_response_is_not_cached(self, client, mock_collection):
+        """A failed ping is reported and the next check tries again."""
+        mock_collection.find_one.side_effect = [RuntimeError("down"), None]
+        
+        assert client.get("/api/health").json()["status"] == "unhealthy"
+        assert client.get("/api/health").json()["status"] == "healthy"
+
+class TestParseUserId:
+    """Test suite for reading the user ID from the user cookie or auth header."""
+    
+    @pytest.mark.parametrize("user_str, expected", [
+        ('{"id": "user1"}', "user1"),
+        ('Bearer {"user_id": "user2"}', "user2"),
+        ("not json", None),
+        ("[1, 2]", None),
+    ])
+    def test_parse(self, user_str, expected):
+        """The ID is taken from id or user_id; anything unparseable gives None."""
+        assert API.parse_user_id(user_str) == expected
+    
+    def test_goals_fall_back_to_default_user(self, client, mock_collection):
+        """Requests without a user are served the fallback user's goals."""
+        mock_collection.find.return_value.to_list.return_value = [
+            {"_id": API.ObjectId("507f1f77bcf86cd799439011"), "name": "Laptop", "userId": "current_user_id"}
+        ]
+        
+        response = client.get("/api/goals")
+        
+        assert [goal["name"] for goal in response.json()] == ["Laptop"]
+
+class TestGoals:
+    """Test suite for the financial goal endpoints."""
+    
+    def test_user_goals_are_read_through_motor(self, client, mock_collection):
+        """Goals are fetched with an awaited cursor and formatted for the response."""
+        mock_collection.find.return_value.to_list.return_value = [
+            {"_id": API.ObjectId("507f1f77bcf86cd799439011"), "name": "Laptop", "category": "Tech",
+             "targetAmount": 1200, "currentAmount": 300, "userId": "user1",
+             "targetDate": API.datetime(2024, 12, 1)}
+        ]
+        
+        response = client.get("/api/goals/user/user1")
+        
+        assert response.json() == [{
+            "id": "507f1f77bcf86cd799439011", "name": "Laptop", "category": "Tech",
+            "targetAmount": 1200, "currentAmount": 300, "userId": "user1",
+            "targetDate": "2024-12-01T00:00:00"
+        }]
+        assert mock_collection.find.call_args.args[1] == API.GOAL_PROJECTION
+    
+    def test_concurrent_goal_reads_share_one_query(self, mock_collection):
+        """Lookups for several users in the same loop iteration are served by one $in query."""
+        mock_collection.find.return_value.to_list.return_value = [
+            {"name": "Laptop", "userId": "user1"},
+            {"name": "Trip", "userId": "user2"},
+            {"name": "Car", "userId": "user3"}
+        ]
+        
+        async def load_all():
+            return await asyncio.gather(
+                API.goal_reads.load("user1"), API.goal_reads.load("user2"), API.goal_reads.load("user1")
+            )
+        
+        first, second, repeat = asyncio.run(load_all())
+        
+        assert first == repeat == [{"name": "Laptop", "userId": "user1"}]
+        assert second == [{"name": "Trip", "userId": "user2"}]
+        mock_collection.find.assert_called_once()
+        query = mock_collection.find.call_args.args[0]
+        assert query == {"userId": {"$in": ["user1", "user2"]}}
+    
+    def test_flush_task_is_held_until_done(self, mock_collection):
+        """The batch's flush task is kept referenced while it runs and released afterwards."""
+        mock_collection.find.return_value.to_list.return_value = [{"name": "Laptop", "userId": "user1"}]
+        
+        async def load_one():
+            lookup = asyncio.ensure_future(API.goal_reads.load("user1"))
+            await asyncio.sleep(0)
+            running = set(API.goal_reads._flush_tasks)
+            await lookup
+            return running
+        
+        running = asyncio.run(load_one())
+        
+        assert len(running) == 1
+        assert not API.goal_reads._flush_tasks
+    
+    def test_failed_batch_raises_for_every_caller(self, mock_collection):
+        """A failed combined query is reported to each waiting lookup."""
+        mock_collection.find.return_value.to_list.side_effect = RuntimeError("down")
+        
+        async def load_all():
+            return await asyncio.gather(
+                API.goal_reads.load("user1"), API.goal_reads.load("user2"), return_exceptions=True
+            )
+        
+        results = asyncio.run(load_all())
+        
+        assert all(isinstance(result, RuntimeError) for result in results)
+    
+    def test_unchanged_goal_list_is_a_304(self, client, mock_collection):
+        """A matching If-None-Match gets a 304, served from the cache without another query."""
+        mock_collection.find.return_value.to_list.return_value = [
+            {"_id": API.ObjectId("507f1f77bcf86cd799439011"), "name": "Laptop", "userId": "user1"}
+        ]
+        
+        first = client.get("/api/goals/user/user1")
+        second = client.get("/api/goals/user/user1", headers={"If-None-Match": first.headers["etag"]})
+        
+        assert first.status_code == 200
+        assert second.status_code == 304
+        mock_collection.find.assert_called_once()
+    
+    def test_goal_write_drops_cached_list(self, client, mock_collection):
+        """Creating a goal drops its owner's cached goal list."""
+        API.goal_list_cache["user1"] = ('"stale"', b"[]")
+        mock_collection.insert_one = AsyncMock(
+            return_value=MagicMock(inserted_id=API.ObjectId("507f1f77bcf86cd799439011"))
+        )
+        
+        client.post("/api/goals", json=self.goal, headers={"Authorization": '{"id": "user1"}'})
+        
+        assert "user1" not in API.goal_list_cache
+    
+    goal = {"name": "Laptop", "category": "Tech", "targetAmount": 1200,
+            "currentAmount": 400, "targetDate": "2024-12-01T00:00:00"}
+    
+    def test_update_goal_in_single_call(self, client, mock_collection):
+        """The goal is updated and returned by one find_one_and_update."""
+        mock_collection.find_one_and_update = AsyncMock(return_value={
+            "_id": API.ObjectId("507f1f77bcf86cd799439011"), **self.goal,
+            "targetDate": API.datetime(2024, 12, 1), "userId": "user1"
+        })
+        
+        response = client.put("/api/goals/507f1f77bcf86cd799439011", json=self.goal)
+        
+        assert response.json()["currentAmount"] == 400
+        mock_collection.find_one.assert_not_called()
+    
+    def test_update_missing_goal_returns_404(self, client, mock_collection):
+        """Updating a goal that doesn't exist is a 404."""
+        mock_collection.find_one_and_update = AsyncMock(return_value=None)
+        
+        response = client.put("/api/goals/507f1f77bcf86cd799439011", json=self.goal)
+        
+        assert response.status_code == 404
+    
+    def test_bulk_update_uses_one_unordered_write(self, client, mock_collection):
+        """Several goal updates are sent as a single unordered bulk_write."""
+        mock_collection.bulk_write = AsyncMock(return_value=MagicMock(matched_count=2, modified_count=1))
+        ids = ["507f1f77bcf86cd799439011", "507f1f77bcf86cd799439012"]
+        
+        response = client.put("/api/goals/bulk", json=[{"id": goal_id, **self.goal} for goal_id in ids])
+        
+        assert response.json() == {"matched_count": 2, "modified_count": 1}
+        requests, = mock_collection.bulk_write.call_args.args
+        assert [request._filter for request in requests] == [{"_id": API.ObjectId(goal_id)} for goal_id in ids]
+        assert "id" not in requests[0]._doc["$set"]
+        assert mock_collection.bulk_write.call_args.kwargs == {"ordered": False}
+    
+    def test_bulk_update_rejects_malformed_ids(self, client, mock_collection):
+        """No goals are written if any ID is malformed."""
+        mock_collection.bulk_write = AsyncMock()
+        
+        response = client.put("/api/goals/bulk", json=[{"id": "nope", **self.goal}])
+        
+        assert response.status_code == 400
+        mock_collection.bulk_write.assert_not_called()
+    
+    def test_delete_goal_in_single_call(self, client, mock_collection):
+        """Deleting checks existence from the deleted document instead of a separate lookup."""
+        mock_collection.find_one_and_delete = AsyncMock(return_value={"userId": "user1"})
+        
+        response = client.delete("/api/goals/507f1f77bcf86cd799439011")
+        
+        assert response.json()["success"] is True
+        mock_collection.find_one.assert_not_called()
+    
+    def test_delete_missing_goal_returns_404(self, client, mock_collection):
+        """Deleting a goal that doesn't exist is a 404."""
+        mock_collection.find_one_and_delete = AsyncMock(return_value=None)
+        
+        response = client.delete("/api/goals/507f1f77bcf86cd799439011")
+        
+        assert response.status_code == 404
+
+class TestObjectIdValidation:
+    """Test suite for rejecting malformed IDs."""
+    
+    @pytest.mark.parametrize("method, url", [
+        ("get", "/api/users/not-an-id/profile"),
+        ("put", "/api/budgets/not-an-id"),
+        ("delete", "/api/budgets/not-an-id"),
+        ("delete", "/api/goals/not-an-id"),
+    ])
+    def test_malformed_id_is_a_400(self, client, mock_collection, method, url):
+        """A malformed ID is rejected before any database call."""
+        kwargs = {"json": {"user_id": "user1", "category": "Food", "amount": 300, "period": "monthly"}} if method == "put" else {}
+        
+        response = getattr(client, method)(url, **kwargs)
+        
+        assert response.status_code == 400
+        mock_collection.find_one.assert_not_called()
+
+class TestErrorHandlers:
+    """Test suite for the app-wide exception handlers."""
+    
+    def test_database_error_is_a_503(self, client, mock_collection):
+        """A database failure is reported as unavailable without leaking the error text."""
+        mock_collection.find.return_value.to_list.side_effect = PyMongoError("connection reset")
+        
+        response = client.get("/api/budgets/user/user1")
+        
+        assert response.status_code == 503
+        assert response.json() == {"detail": "Database unavailable"}
+    
+    def test_duplicate_key_is_a_409(self, client, mock_collection):
+        """A write rejected by a unique index is a conflict, not an unavailable database."""
+        mock_collection.find_one_and_update = AsyncMock(side_effect=API.DuplicateKeyError(
+            "duplicate key", 11000, {"keyPattern": {"user_id": 1, "category": 1, "period": 1}}
+        ))
+        
+        response = client.put("/api/budgets/507f1f77bcf86cd799439011", json={
+            "user_id": "user1", "category": "Food", "amount": 200, "period": "monthly"
+        })
+        
+        assert response.status_code == 409
+        assert response.json() == {"detail": "A matching record already exists"}
+
+class TestUserProfile:
+    """Test suite for the user profile endpoints."""
+    
+    user_id = "507f1f77bcf86cd799439011"
+    
+    def test_update_profile_in_single_call(self, client, mock_collection):
+        """Only the supplied fields are set, and the updated user comes back from the same call."""
+        mock_collection.find_one_and_update = AsyncMock(return_value={
+            "_id": API.ObjectId(self.user_id), "username": "cougar", "phone": "555-0100"
+        })
+        
+        response = client.put(f"/api/users/{self.user_id}/profile", json={"phone": "555-0100"})
+        
+        assert response.json()["phone"] == "555-0100"
+        assert mock_collection.find_one_and_update.call_args.args[1] == {"$set": {"phone": "555-0100"}}
+        mock_collection.find_one.assert_not_called()
+    
+    def test_profile_splits_full_name(self, client, mock_collection):
+        """Users with only a full name get it split into first and last name."""
+        mock_collection.find_one.return_value = {
+            "_id": API.ObjectId(self.user_id), "username": "cougar", "name": "Cou Gar Jr"
+        }
+        
+        response = client.get(f"/api/users/{self.user_id}/profile")
+        
+        assert response.json()["firstName"] == "Cou"
+        assert response.json()["lastName"] == "Gar Jr"
+    
+    def test_missing_profile_returns_404(self, client, mock_collection):
+        """Looking up a user that doesn't exist is a 404."""
+        response = client.get(f"/api/users/{self.user_id}/profile")
+        
+        assert response.status_code == 404
+    
+    def test_update_missing_user_returns_404(self, client, mock_collection):
+        """Updating a user that doesn't exist is a 404."""
+        mock_collection.find_one_and_update = AsyncMock(return_value=None)
+        
+        response = client.put(f"/api/users/{self.user_id}/profile", json={"phone": "555-0100"})
+        
+        assert response.status_code == 404
+
+class TestBuildUserFilter:
+    """Test suite for the /users query filter builder."""
+    
+    def test_only_supplied_fields_are_used(self):
+        """Fields left as None are not part of the filter."""
+        assert API.build_user_filter(username="jdoe", lastname="Doe") == {"username": "jdoe", "lastname": "Doe"}
+    
+    def test_id_is_converted_to_object_id(self):
+        """A valid ID is matched against the document _id."""
+        query = API.build_user_filter(id="507f1f77bcf86cd799439011")
+        assert query == {"_id": API.ObjectId("507f1f77bcf86cd799439011")}
+    
+    def test_missing_or_invalid_filter_is_rejected(self):
+        """An empty filter or a malformed ID results in a 400 error."""
+        for kwargs in ({}, {"id": "not-an-id"}):
+            with pytest.raises(API.HTTPException) as exc_info:
+                API.build_user_filter(**kwargs)
+            assert exc_info.value.status_code == 400
+
+class TestCreateUser:
+    """Test suite for the signup user dictionary helper."""
+    
+    def test_calls_do_not_share_state(self):
+        """Each call returns an independent dictionary."""
+        first = API.create_user("a@example.com", "alice", "Alice", "Smith")
+        second = API.create_user("b@example.com", "bob", "Bob", "Jones")
+        
+        assert first == {"firstname": "Alice", "lastname": "Smith", "username": "alice", "email": "a@example.com"}
+        assert second["username"] == "bob"
+        assert first is not second
+
+class TestAnalyticsCache:
+    """Test suite for caching the read-only analytics endpoints."""
+    
+    def test_repeat_analysis_is_served_from_cache(self, client, mock_collection):
+        """A second identical request doesn't query MongoDB again."""
+        url = "/api/analysis/spending/user1?period=yearly"
+        
+        first = client.get(url)
+        second = client.get(url)
+        
+        assert first.json() == second.json()
+        assert mock_collection.aggregate.call_count == 1
+    
+    def test_budget_write_invalidates_cache(self, client, mock_collection):
+        """Changing a budget drops the user's cached analytics."""
+        API.analytics_cache["user1"] = {("spending_insights",): {"insights": [], "recommendations": []}}
+        API.analytics_cache["user2"] = {("spending_insights",): {"insights": [], "recommendations": []}}
+        mock_collection.find_one_and_delete = AsyncMock(return_value={"_id": 1, "user_id": "user1"})
+        
+        client.delete("/api/budgets/507f1f77bcf86cd799439011")
+        
+        assert "user1" not in API.analytics_cache
+        assert "user2" in API.analytics_cache
+
+class TestReadItems:
+    """Test suite for the user count endpoint."""
+    
+    def test_uses_estimated_count(self, client, mock_collection):
+        """The count comes from collection metadata, not a full count."""
+        mock_collection.estimated_document_count = AsyncMock(return_value=42)
+        
+        response = client.get("/your-endpoint")
+        
+        assert response.json() == {"message": "Found 42 users in the database"}
+        mock_collection.count_documents.assert_not_called()
+
+class TestAuthentication:
+    """Test suite for registration, login and password hashing."""
+    
+    def test_hash_and_verify(self):
+        """Hashed passwords verify only against the original password."""
+        hashed = API.hash_password("s3cret")
+        
+        assert hashed != "s3cret"
+        assert API.is_password_hashed(hashed)
+        assert API.verify_password("s3cret", hashed)
+        assert not API.verify_password("wrong", hashed)
+    
+    def test_verify_legacy_plaintext(self):
+        """Accounts with plaintext passwords can still log in."""
+        assert API.verify_password("s3cret", "s3cret")
+        assert not API.verify_password("s3cret", "other")
+        assert not API.verify_password("s3cret", None)
+    
+    def test_register_stores_hash(self, client, mock_collection):
+        """Registration never stores the plaintext password."""
+        mock_collection.find_one = AsyncMock(return_value=None)
+        mock_collection.insert_one = AsyncMock(return_value=MagicMock(inserted_id="abc"))
+        
+        response = client.post("/api/auth/register", json={
+            "username": "cougar", "email": "c@example.com", "password": "s3cret",
+            "firstName": "Cou", "lastName": "Gar"
+        })
+        
+        assert response.json()["success"] is True
+        stored = mock_collection.insert_one.call_args[0][0]["password"]
+        assert stored != "s3cret"
+        assert API.verify_password("s3cret", stored)
+    
+    @pytest.mark.parametrize("existing, message", [
+        ({"username": "cougar", "email": "other@example.com"}, "Username already exists"),
+        ({"username": "other", "email": "c@example.com"}, "Email already exists"),
+    ])
+    def test_register_checks_username_and_email_together(self, client, mock_collection, existing, message):
+        """One $or lookup finds either clash and reports which one it was."""
+        mock_collection.find_one = AsyncMock(return_value=existing)
+        mock_collection.insert_one = AsyncMock()
+        
+        response = client.post("/api/auth/register", json={
+            "username": "cougar", "email": "c@example.com", "password": "s3cret",
+            "firstName": "Cou", "lastName": "Gar"
+        })
+        
+        assert response.json()["success"] is False
+        assert response.json()["message"] == message
+        assert mock_collection.find_one.await_count == 1
+        assert "$or" in mock_collection.find_one.call_args[0][0]
+        mock_collection.insert_one.assert_not_called()
+    
+    def test_register_handles_duplicate_key_race(self, client, mock_collection):
+        """A clash that slips past the pre-check is reported from the unique index."""
+        mock_collection.insert_one = AsyncMock(side_effect=API.DuplicateKeyError(
+            "duplicate", 11000, {"keyPattern": {"email": 1}}
+        ))
+        
+        response = client.post("/api/auth/register", json={
+            "username": "cougar", "email": "c@example.com", "password": "s3cret",
+            "firstName": "Cou", "lastName": "Gar"
+        })
+        
+        assert response.json()["success"] is False
+        assert response.json()["message"] == "Email already exists"
+    
+    def test_login_upgrades_legacy_password(self, client, mock_collection):
+        """A successful login with a plaintext password replaces it with a hash."""
+        mock_collection.find_one = AsyncMock(return_value={
+            "_id": "abc", "username": "cougar", "password": "s3cret"
+        })
+        mock_collection.update_one = AsyncMock()
+        
+        response = client.post("/api/auth/login", json={"username": "cougar", "password": "s3cret"})
+        
+        assert response.json()["success"] is True
+        new_password = mock_collection.update_one.call_args[0][1]["$set"]["password"]
+        assert API.verify_password("s3cret", new_password)
+    
+    def test_login_rejects_wrong_password(self, client, mock_collection):
+        """A wrong password fails without touching the stored hash."""
+        mock_collection.find_one = AsyncMock(return_value={
+            "_id": "abc", "username": "cougar", "password": API.hash_password("s3cret")
+        })
+        mock_collection.update_one = AsyncMock()
+        
+        response = client.post("/api/auth/login", json={"username": "cougar", "password": "wrong"})
+        
+        assert response.json()["success"] is False
+        mock_collection.update_one.assert_not_called()
+
+class TestUpdatePassword:
+    """Test suite for changing a user's password."""
+    
+    user_id = "507f1f77bcf86cd799439011"
+    
+    def test_new_password_is_hashed(self, client, mock_collection):
+        """The current password is verified and the new one is stored as a bcrypt hash."""
+        mock_collection.find_one.return_value = {"password": API.hash_password("old-pass")}
+        mock_collection.update_one = AsyncMock()
+        
+        response = client.put(f"/api/users/{self.user_id}/password",
+                              json={"currentPassword": "old-pass", "newPassword": "new-pass"})
+        
+        assert response.json()["success"] is True
+        stored = mock_collection.update_one.call_args.args[1]["$set"]["password"]
+        assert API.is_password_hashed(stored)
+        assert API.verify_password("new-pass", stored)
+    
+    def test_wrong_current_password_is_rejected(self, client, mock_collection):
+        """A wrong current password (legacy plaintext here) leaves the password unchanged."""
+        mock_collection.find_one.return_value = {"password": "old-pass"}
+        mock_collection.update_one = AsyncMock()
+        
+        response = client.put(f"/api/users/{self.user_id}/password",
+                              json={"currentPassword": "guess", "newPassword": "new-pass"})
+        
+        assert response.json() == {"success": False, "message": "Current password is incorrect"}
+        mock_collection.update_one.assert_not_called()
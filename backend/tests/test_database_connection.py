@@ -1,10 +1,11 @@
 """
 Tests for the database connection.
 """
+import asyncio
 import pytest
 from pymongo import MongoClient
 
-from Database.database import Database, get_db, get_collection, Collections, close_db_connection
+from Database.database import Database, get_db, get_collection, Collections, close_db_connection, ensure_indexes, has_unique_user_indexes, migrate_goal_owners
 
 class TestDatabaseConnection:
     """Tests for the database connection."""
@@ -58,4 +59,60 @@ class TestDatabaseConnection:
         
         # Check database
         assert db is not None
-        assert db.name == "CougarWise" 
\ No newline at end of file
+        assert db.name == "CougarWise" 
+    
+    def test_async_collection_handles_are_reused(self):
+        """Test that repeated Motor collection lookups on one loop return the same handle."""
+        db = Database.get_instance()
+        
+        async def lookup():
+            first = db.get_async_collection(Collections.TRANSACTIONS)
+            second = db.get_async_collection(Collections.TRANSACTIONS)
+            other = db.get_async_collection(Collections.USERS)
+            return first, second, other
+        
+        try:
+            # Look up the same collection twice and another once
+            first, second, other = asyncio.run(lookup())
+            
+            # Check handles
+            assert first is second
+            assert other is not first
+        finally:
+            db.close()
+    
+    def test_ensure_indexes(self):
+        """Test that the query indexes are created and creation is idempotent."""
+        # Create indexes twice
+        ensure_indexes()
+        ensure_indexes()
+        
+        # Check indexes
+        user_indexes = get_collection(Collections.USERS).index_information()
+        transaction_indexes = get_collection(Collections.TRANSACTIONS).index_information()
+        assert "email_1" in user_indexes
+        assert "username_1" in user_indexes
+        assert has_unique_user_indexes()
+        assert "user_id_1_category_1" in transaction_indexes
+        assert "user_id_1_date_-1" in transaction_indexes
+        assert "user_id_1_type_1_date_1" in transaction_indexes
+        assert "user_id_1_categoryLower_1" in transaction_indexes
+        goal_indexes = get_collection(Collections.FINANCIAL_GOALS).index_information()
+        assert "userId_1" in goal_indexes
+        assert "user_id_1_category_1_period_1" in get_collection(Collections.CATEGORY_BREAKDOWN).index_information()
+    
+    def test_migrate_goal_owners(self):
+        """Test that older goals are moved to userId and the migration is idempotent."""
+        goals = get_collection(Collections.FINANCIAL_GOALS)
+        goal_id = goals.insert_one({"name": "Migration test", "user_id": "migration-test-user"}).inserted_id
+        try:
+            # Migrate twice
+            migrate_goal_owners()
+            assert migrate_goal_owners() == 0
+            
+            # Check the goal
+            goal = goals.find_one({"_id": goal_id})
+            assert goal["userId"] == "migration-test-user"
+            assert "user_id" not in goal
+        finally:
+            goals.delete_one({"_id": goal_id})